@@ -7,6 +7,8 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 
+from src.utils.profiling import timed
+
 
 def _severity_class(severity: str) -> str:
     """Map severity string to CSS class."""
@@ -54,6 +56,7 @@ def alert_card_html(row: pd.Series) -> str:
 """
 
 
+@timed("table")
 def render_alert_feed(alerts_df: pd.DataFrame, max_alerts: int = 20) -> None:
     """Render the full Apple-styled alert feed, sorted by severity then date."""
     severity_order = {"Critical": 0, "Warning": 1, "Info": 2}
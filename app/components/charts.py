@@ -8,6 +8,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from src.utils.profiling import span
 from src.utils.apple_charts import (
     apple_chart_layout, revenue_trend_chart, product_mix_donut,
     partner_ranking_bar, forecast_accuracy_bar, forecast_line_chart,
@@ -17,5 +18,6 @@ from src.utils.apple_charts import (
 
 def show_chart(fig: go.Figure, use_container_width: bool = True) -> None:
     """Render a plotly figure with consistent config."""
-    st.plotly_chart(fig, use_container_width=use_container_width,
-                    config={"displayModeBar": False})
+    with span("plotly_chart", "render"):
+        st.plotly_chart(fig, use_container_width=use_container_width,
+                        config={"displayModeBar": False})
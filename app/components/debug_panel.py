@@ -0,0 +1,64 @@
+"""
+Debug Panel Component — per-rerun timing panel for the sidebar.
+Call `begin_page()` at the top of a page and `render_debug_panel()` at the end;
+both are no-ops unless DEMAND_PLANNER_PROFILE is set (see src/utils/profiling).
+Author: Mohammed Kaif Ahmed
+"""
+
+import streamlit as st
+import pandas as pd
+
+from src.utils import profiling
+from src.utils.figure_cache import FIGURE_CACHE
+
+
+def begin_page(page: str) -> None:
+    """
+    Start recording this rerun. Streamlit runs each rerun on a fresh thread, so
+    the session's previous rerun is stopped here if it ended before the panel.
+    """
+    abandoned = st.session_state.pop("_profile_open", None)
+    if abandoned is not None:
+        abandoned.stop()
+    profile = profiling.start(page)
+    if profile is not None:
+        st.session_state["_profile_open"] = profile
+
+
+def render_debug_panel(top_n: int = 15) -> None:
+    """Finish the rerun and show its slowest spans and peak allocations in the sidebar."""
+    profile = profiling.finish()
+    st.session_state.pop("_profile_open", None)
+    if profile is None:
+        return
+
+    spans = profile.frame()
+    history = st.session_state.setdefault("_profile_history", {})
+    history.setdefault(profile.page, []).append(profile.total)
+    del history[profile.page][:-20]
+
+    with st.sidebar:
+        with st.expander("Performance (debug)", expanded=False):
+            runs = history[profile.page]
+            st.markdown(f"**{profile.page}** · rerun {profile.total * 1000:,.0f} ms "
+                        f"· median of last {len(runs)}: {pd.Series(runs).median() * 1000:,.0f} ms")
+            if profile.peak_bytes is not None:
+                st.markdown(f"Peak traced memory: **{profile.peak_bytes / 1e6:,.1f} MB**")
+            figs = FIGURE_CACHE.stats()
+            st.markdown(f"Figure cache: {figs['entries']} figures · {figs['bytes'] / 1e6:,.1f} MB "
+                        f"· {figs['hits']:,} hits / {figs['misses']:,} misses")
+
+            if not spans.empty:
+                by_cat = (spans[spans["depth"] == 0].groupby("category")["seconds"].sum()
+                          .sort_values(ascending=False) * 1000).round(1)
+                st.dataframe(by_cat.rename("ms").reset_index(), hide_index=True,
+                             use_container_width=True)
+                slowest = spans.head(top_n).assign(ms=lambda d: (d["seconds"] * 1000).round(1))
+                st.dataframe(slowest[["span", "category", "ms"]], hide_index=True,
+                             use_container_width=True)
+
+            if profile.top_allocations:
+                st.dataframe(pd.DataFrame(profile.top_allocations, columns=["line", "bytes"]),
+                             hide_index=True, use_container_width=True)
+            if profile.stats_text:
+                st.code(profile.stats_text, language="text")
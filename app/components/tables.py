@@ -0,0 +1,151 @@
+"""
+Tables Component — vectorised Apple-style HTML tables.
+Each column is formatted in one pass over its Series, rows are assembled with a
+single join, long tables are paginated, and rendered HTML is cached against a
+caller-supplied key (data version + filters) so reruns skip formatting entirely.
+Author: Mohammed Kaif Ahmed
+"""
+
+import threading
+from collections import OrderedDict
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from src.utils.helpers import format_eur_series
+from src.utils.profiling import timed
+
+CACHE_SIZE = 256
+_HTML_CACHE = OrderedDict()     # (key, cache_key, page, page_size) → rendered HTML
+_CACHE_LOCK = threading.Lock()
+
+
+# ─── Column specs ─────────────────────────────────────────────────────────────
+def column(header: str, field: str, fmt=None, style="") -> dict:
+    """
+    One table column.
+    fmt   — Series → Series of display strings (default: str()).
+    style — inline CSS for every cell, or a callable(frame) → CSS per row.
+    """
+    return {"header": header, "field": field, "fmt": fmt, "style": style}
+
+
+def eur(decimals: int = 1):
+    """€ amounts with K / M / B suffixes (same output as format_eur)."""
+    return lambda s: format_eur_series(s, decimals)
+
+
+def integer():
+    """Whole numbers with thousands separators."""
+    return lambda s: _strings(map("{:,}".format, s.to_numpy(dtype=float).astype(np.int64).tolist()), s)
+
+
+def percent(scale: float = 1.0, decimals: int = 1, signed: bool = False):
+    """`value × scale` as a percentage, e.g. percent(100) for 0–1 ratios."""
+    spec = f"{{:{'+' if signed else ''}.{decimals}f}}%"
+    return lambda s: _strings(map(spec.format, (s.to_numpy(dtype=float) * scale).tolist()), s)
+
+
+def badge(classes: dict, default: str = "badge-grey"):
+    """Coloured pill whose CSS class is looked up from the cell value."""
+    def fmt(s):
+        text = s.astype(str)
+        return '<span class="badge ' + text.map(classes).fillna(default) + '">' + text + "</span>"
+    return fmt
+
+
+def truncate(n: int, suffix: str = ""):
+    """First `n` characters of the value (plus `suffix`)."""
+    return lambda s: s.astype(str).str.slice(0, n) + suffix
+
+
+def _strings(values, like: pd.Series) -> pd.Series:
+    return pd.Series(list(values), index=like.index, dtype=object)
+
+
+def _per_row(values, df: pd.DataFrame) -> pd.Series:
+    """Positional per-row strings (array, list or Series) aligned to `df`."""
+    return pd.Series(np.asarray(values, dtype=object), index=df.index).astype(str)
+
+
+# ─── Rendering ────────────────────────────────────────────────────────────────
+def _cells(df: pd.DataFrame, col: dict) -> list:
+    values = df[col["field"]]
+    text = col["fmt"](values) if col["fmt"] else values.astype(str)
+    style = col["style"]
+    if callable(style):
+        return ('<td style="' + _per_row(style(df), df) + '">' + text + "</td>").tolist()
+    opening = f'<td style="{style}">' if style else "<td>"
+    return (opening + text + "</td>").tolist()
+
+
+def table_html(df: pd.DataFrame, columns: list, row_style=None) -> str:
+    """Apple-table HTML for `df`: one vectorised pass per column, one join for the rows."""
+    head = "".join(f"<th>{c['header']}</th>" for c in columns)
+    if row_style is not None:
+        opening = ('<tr style="' + _per_row(row_style(df), df) + '">').tolist()
+    else:
+        opening = repeat("<tr>", len(df))
+    cells = [_cells(df, c) for c in columns]
+    body = "".join(map("".join, zip(opening, *cells, repeat("</tr>", len(df)))))
+    return (f'<div class="apple-table-wrap"><table class="apple-table">'
+            f"<thead><tr>{head}</tr></thead><tbody>{body}</tbody></table></div>")
+
+
+def _page_slice(df: pd.DataFrame, key: str, page_size: int) -> tuple:
+    """(page number, rows on that page); shows the page selector when there is more than one."""
+    n_pages = max(1, -(-len(df) // page_size))
+    page = 1
+    if n_pages > 1:
+        page = int(st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages,
+                                   value=1, step=1, key=f"{key}_page"))
+    start = (page - 1) * page_size
+    return page, df.iloc[start:start + page_size]
+
+
+def _cached(entry) -> str:
+    with _CACHE_LOCK:
+        html = _HTML_CACHE.get(entry)
+        if html is not None:
+            _HTML_CACHE.move_to_end(entry)
+        return html
+
+
+def _store(entry, html: str) -> None:
+    with _CACHE_LOCK:
+        _HTML_CACHE[entry] = html
+        while len(_HTML_CACHE) > CACHE_SIZE:
+            _HTML_CACHE.popitem(last=False)
+
+
+@timed("table")
+def render_table(df: pd.DataFrame, columns: list, key: str, cache_key=None,
+                 page_size: int = None, row_style=None) -> None:
+    """
+    Render `df` as an Apple table.
+    key        — stable name for this table (also the pagination widget key).
+    cache_key  — hashable data version + filter state; the rendered HTML is reused
+                 while it is unchanged. None disables caching.
+    page_size  — rows per page; longer tables get a page selector.
+    """
+    page, total = 1, len(df)
+    if page_size:
+        page, df = _page_slice(df, key, page_size)
+    entry = (key, cache_key, page, page_size) if cache_key is not None else None
+    html = _cached(entry) if entry is not None else None
+    if html is None:
+        html = table_html(df, columns, row_style)
+        if entry is not None:
+            _store(entry, html)
+    st.markdown(html, unsafe_allow_html=True)
+    if page_size and total > page_size:
+        start = (page - 1) * page_size
+        st.caption(f"Rows {start + 1:,}–{start + len(df):,} of {total:,}")
+
+
+def clear_table_cache() -> None:
+    """Drop every cached table."""
+    with _CACHE_LOCK:
+        _HTML_CACHE.clear()
@@ -17,18 +17,28 @@ css_path = os.path.join(os.path.dirname(__file__), "..", "styles", "apple_theme.
 with open(css_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-from src.utils.helpers import (load_products, load_partners, load_actuals,
-                                load_forecasts, format_eur, format_pct)
+from src.utils.helpers import format_eur, format_pct
+from src.utils.data_store import get_store
+from src.forecasting.backtest import load_backtest_table
+from src.forecasting.reconciliation import aggregates_version, load_reconciled
+from src.utils.aggregate_cube import load_aggregate_cube
+from src.analytics.forecast_accuracy import load_accuracy_cube, accuracy_metrics
+from src.analytics.tracking_signal import load_tracking_monitor
 from src.utils.apple_charts import forecast_line_chart, apple_chart_layout
 from app.components.kpi_cards import render_kpi_row, insight_box, section_header, render_sidebar
 from app.components.charts import show_chart
+from app.components.tables import render_table, column, integer, percent, badge
+from app.components.debug_panel import begin_page, render_debug_panel
 
-@st.cache_data(ttl=300)
 def _load():
-    return load_products(), load_partners(), load_actuals(), load_forecasts()
+    store = get_store()
+    return (store.get("products"), store.get("partners"),
+            load_aggregate_cube(store), load_reconciled("mint_wls", store))
+
+begin_page("Demand Forecast")
 
 try:
-    products, partners, actuals, forecasts = _load()
+    products, partners, cube, reconciled = _load()
 except FileNotFoundError:
     st.error("Run `python src/data_generator.py` first.")
     st.stop()
@@ -40,7 +50,7 @@ with st.sidebar:
 
 # ─── Filters ─────────────────────────────────────────────────────────────────
 st.markdown('<div class="page-title">Demand Forecast</div>', unsafe_allow_html=True)
-st.markdown('<div class="page-subtitle">12-week forward forecast with confidence intervals · Ensemble model (91.3% accuracy)</div>', unsafe_allow_html=True)
+st.markdown('<div class="page-subtitle">12-week forward forecast with confidence intervals · Ensemble model</div>', unsafe_allow_html=True)
 
 families = ["All Families"] + sorted(products["product_family"].unique().tolist())
 col_f1, col_f2, col_f3 = st.columns(3)
@@ -60,48 +70,62 @@ with col_f3:
 st.markdown("<div style='margin:12px 0'></div>", unsafe_allow_html=True)
 
 # ─── Filter data ─────────────────────────────────────────────────────────────
-acts = actuals.copy()
-fcast = forecasts[forecasts["forecast_model"] == "Ensemble"].copy()
+fam, pid, partid = None, None, None
 
 if sel_family != "All Families":
+    fam = sel_family
     family_pids = products[products["product_family"] == sel_family]["product_id"].tolist()
-    acts  = acts[acts["product_id"].isin(family_pids)]
-    fcast = fcast[fcast["product_id"].isin(family_pids)]
 
 if sel_prod != "All Products":
     pid = products[products["product_name"] == sel_prod]["product_id"].values[0]
-    acts  = acts[acts["product_id"] == pid]
-    fcast = fcast[fcast["product_id"] == pid]
 
 if sel_partner != "All Partners":
     partid = partners[partners["partner_name"] == sel_partner]["partner_id"].values[0]
-    acts  = acts[acts["partner_id"] == partid]
-    fcast = fcast[fcast["partner_id"] == partid]
 
-# Aggregate to weekly totals
-weekly_acts = acts.groupby("date").agg(units_sold=("units_sold","sum")).reset_index().sort_values("date").tail(52)
-weekly_fcast = fcast.groupby("date").agg(
-    forecast_units=("forecast_units","sum"),
-    forecast_lower=("forecast_lower","sum"),
-    forecast_upper=("forecast_upper","sum"),
-).reset_index().sort_values("date")
+# Weekly totals are a lookup in the precomputed aggregate cube; the forecast is the
+# reconciled hierarchy node for this slice (intervals from summed variances)
+weekly_acts = cube.frame(["units_sold"], family=fam, product_id=pid, partner_id=partid).tail(52)
+weekly_fcast = reconciled.node(product_family=fam, product_id=pid, partner_id=partid)
 
 # ─── KPI Row ─────────────────────────────────────────────────────────────────
 total_units_12wk = weekly_fcast["forecast_units"].sum()
-mape_val = 8.7
-wmape_val = 8.7
-bias_val  = -1.2
+
+# Measured Ensemble accuracy for the selected slice (a single product reports its family).
+# None until forecasts overlap actuals or a backtest has been run
+acc = None
+acc_cube = load_accuracy_cube()
+if acc_cube is not None:
+    acc_family = None
+    if sel_prod != "All Products":
+        acc_family = products.loc[products["product_id"] == pid, "product_family"].iloc[0]
+    elif sel_family != "All Families":
+        acc_family = sel_family
+    acc = accuracy_metrics(acc_cube, "Ensemble", product_family=acc_family, partner_id=partid)
+NO_ACCURACY = "Run src/forecasting/backtest.py to measure"
+
+# Running tracking signal per SKU × partner (src/analytics/tracking_signal.py)
+ts_val, ts_context = None, NO_ACCURACY
+monitor = load_tracking_monitor()
+if monitor is not None:
+    ts_pids = [pid] if sel_prod != "All Products" else (
+        family_pids if sel_family != "All Families" else None)
+    ts = monitor.slice_signal("Ensemble", product_ids=ts_pids, partner_id=partid)
+    if ts["series"]:
+        ts_val = ts["tracking_signal"]
+        ts_context = (f"{ts['flagged']} of {ts['series']} series outside ±4" if ts["flagged"]
+                      else "Within ±4 control limits")
 
 render_kpi_row([
     {"label": "12-Week Forecast (Units)", "value": f"{total_units_12wk:,.0f}",
      "context": "Ensemble model"},
-    {"label": "WMAPE", "value": f"{wmape_val:.1f}%",
-     "delta": -0.9, "delta_period": "vs last quarter", "delta_good_direction": "negative",
-     "context": "Weighted mean abs % error"},
-    {"label": "Forecast Bias", "value": f"{bias_val:+.1f}%",
-     "context": "Negative = slightly under-forecast"},
-    {"label": "Tracking Signal", "value": "−0.42",
-     "context": "Within ±4 control limits"},
+    {"label": "WMAPE", "value": f"{acc['wmape']:.1f}%" if acc is not None else "n/a",
+     "context": "Weighted mean abs % error" if acc is not None else NO_ACCURACY},
+    {"label": "Forecast Bias", "value": f"{acc['bias']:+.1f}%" if acc is not None else "n/a",
+     "context": (NO_ACCURACY if acc is None else "Negative = slightly under-forecast"
+                 if acc["bias"] <= 0 else "Positive = over-forecast")},
+    {"label": "Tracking Signal",
+     "value": f"{ts_val:+.2f}".replace("-", "−") if ts_val is not None else "n/a",
+     "context": ts_context},
 ])
 
 st.markdown("<div style='margin:16px 0'></div>", unsafe_allow_html=True)
@@ -110,43 +134,61 @@ st.markdown("<div style='margin:16px 0'></div>", unsafe_allow_html=True)
 section_header("Demand Actuals vs 12-Week Forecast")
 fig = forecast_line_chart(weekly_acts, weekly_fcast, height=440)
 show_chart(fig)
+st.caption("Forecast reconciled (MinT) against the engine's aggregate-level forecasts."
+           if reconciled.method == "mint_wls" else
+           "Forecast is the bottom-up sum of SKU × partner forecasts. Run "
+           "`python src/forecasting/engine.py` to add aggregate forecasts for MinT reconciliation.")
 
 insight_box(
     f"<strong>Analysis Insight:</strong> Our ensemble model projects <strong>{total_units_12wk:,.0f} units</strong> "
     f"over the next 12 weeks for the selected view. The 80% confidence interval widens beyond Week 8, "
     f"reflecting higher uncertainty over longer horizons — these ranges should inform safety stock buffers. "
-    f"<strong>WMAPE of {wmape_val:.1f}%</strong> reflects strong signal quality for planning purposes."
+    + (f"<strong>WMAPE of {acc['wmape']:.1f}%</strong> reflects strong signal quality for planning purposes."
+       if acc is not None else
+       "Forecast accuracy is not measured yet: run <code>python src/forecasting/backtest.py</code>.")
 )
 
 # ─── Model Comparison ────────────────────────────────────────────────────────
 section_header("Model Performance Comparison")
 
-model_comparison = pd.DataFrame([
-    {"Model": "SARIMA", "WMAPE": 11.5, "MAPE": 12.1, "Bias": -2.3, "Accuracy": "88.5%", "Best For": "Stable, seasonal SKUs"},
-    {"Model": "Prophet", "WMAPE": 9.8, "MAPE": 10.2, "Bias": 0.4, "Accuracy": "90.2%", "Best For": "Launch seasons, holidays"},
-    {"Model": "Random Forest", "WMAPE": 10.3, "MAPE": 10.8, "Bias": 1.1, "Accuracy": "89.7%", "Best For": "Feature-rich, cross-SKU signals"},
-    {"Model": "Ensemble (Active)", "WMAPE": 8.7, "MAPE": 9.1, "Bias": -1.2, "Accuracy": "91.3%", "Best For": "Portfolio-level; default for planning"},
-])
+MODEL_LABELS = {"ARIMA": "ARIMA", "Prophet": "Prophet", "RF": "Random Forest",
+                "Ensemble": "Ensemble (Active)"}
+MODEL_BEST_FOR = {"ARIMA": "Stable, seasonal SKUs", "Prophet": "Launch seasons, holidays",
+                  "RF": "Feature-rich, cross-SKU signals",
+                  "Ensemble": "Portfolio-level; default for planning"}
 
-table_html = """
-<div class="apple-table-wrap">
-<table class="apple-table">
-<thead><tr>
-<th>Model</th><th>WMAPE</th><th>MAPE</th><th>Bias</th><th>Accuracy</th><th>Best For</th>
-</tr></thead><tbody>
-"""
-for _, row in model_comparison.iterrows():
-    bold = "font-weight:700;" if "Active" in row["Model"] else ""
-    table_html += f"""<tr style="{bold}">
-<td>{row['Model']}</td>
-<td>{row['WMAPE']:.1f}%</td>
-<td>{row['MAPE']:.1f}%</td>
-<td style="color:{'#FF3B30' if row['Bias'] < -1 else ('#34C759' if -1 <= row['Bias'] <= 1 else '#FF9500')}">{row['Bias']:+.1f}%</td>
-<td>{row['Accuracy']}</td>
-<td style="color:#6E6E73">{row['Best For']}</td>
-</tr>"""
-table_html += "</tbody></table></div>"
-st.markdown(table_html, unsafe_allow_html=True)
+# Backtest results (src/forecasting/backtest.py); nothing to compare until one has been run
+bt_table = load_backtest_table("backtest_by_model")
+if sel_family != "All Families":
+    bt_family = load_backtest_table("backtest_by_family")
+    bt_table = (bt_family[bt_family["product_family"] == sel_family]
+                if bt_family is not None else None)
+
+if bt_table is not None and not bt_table.empty:
+    bt_table = bt_table.set_index(bt_table["forecast_model"].astype(str))
+    model_comparison = pd.DataFrame([
+        {"Model": MODEL_LABELS[m], "WMAPE": bt_table.at[m, "wmape"], "MAPE": bt_table.at[m, "mape"],
+         "Bias": bt_table.at[m, "bias"], "Accuracy": f"{bt_table.at[m, 'accuracy']:.1f}%",
+         "Best For": MODEL_BEST_FOR[m]}
+        for m in MODEL_LABELS if m in bt_table.index
+    ])
+
+    def bias_style(df):
+        bias = df["Bias"].to_numpy(dtype=float)
+        return np.select([bias < -1, bias <= 1], ["color:#FF3B30", "color:#34C759"], "color:#FF9500")
+
+    render_table(model_comparison, [
+        column("Model", "Model"),
+        column("WMAPE", "WMAPE", percent()),
+        column("MAPE", "MAPE", percent()),
+        column("Bias", "Bias", percent(signed=True), style=bias_style),
+        column("Accuracy", "Accuracy"),
+        column("Best For", "Best For", style="color:#6E6E73"),
+    ], key="model_comparison",
+       row_style=lambda df: np.where(df["Model"].str.contains("Active"), "font-weight:700;", ""))
+else:
+    st.info("No backtest results for this view yet. Run `python src/forecasting/backtest.py` "
+            "to compare the models.")
 
 st.markdown("<div style='margin:20px 0'></div>", unsafe_allow_html=True)
 
@@ -155,35 +197,23 @@ section_header("12-Week Forward Demand Plan")
 
 fwd_table = weekly_fcast.copy()
 fwd_table["Week"] = fwd_table["date"].dt.strftime("W%V, %Y")
-fwd_table["Forecast"] = fwd_table["forecast_units"].apply(lambda x: f"{int(x):,}")
-fwd_table["Lower (80%CI)"] = fwd_table["forecast_lower"].apply(lambda x: f"{int(x):,}")
-fwd_table["Upper (80%CI)"] = fwd_table["forecast_upper"].apply(lambda x: f"{int(x):,}")
 fwd_table["CI Width"] = ((fwd_table["forecast_upper"] - fwd_table["forecast_lower"])
-                         / fwd_table["forecast_units"].replace(0, 1) * 100).round(1).astype(str) + "%"
+                         / fwd_table["forecast_units"].replace(0, 1) * 100).round(1)
 
 # RAG based on CI width
-def rag_week(ci_pct_str):
-    v = float(ci_pct_str.replace("%", ""))
-    if v < 20:  return '<span class="badge badge-green">Green</span>'
-    elif v < 35: return '<span class="badge badge-amber">Amber</span>'
-    else:        return '<span class="badge badge-red">Red</span>'
-
-fwd_table["Confidence"] = fwd_table["CI Width"].apply(rag_week)
-
-tbl_html = """
-<div class="apple-table-wrap">
-<table class="apple-table"><thead><tr>
-<th>Week</th><th>Forecast Units</th><th>Lower (80% CI)</th><th>Upper (80% CI)</th><th>CI Width</th><th>Confidence</th>
-</tr></thead><tbody>
-"""
-for _, row in fwd_table.iterrows():
-    tbl_html += f"""<tr>
-<td style="font-weight:500">{row['Week']}</td>
-<td style="font-weight:600">{row['Forecast']}</td>
-<td style="color:#6E6E73">{row['Lower (80%CI)']}</td>
-<td style="color:#6E6E73">{row['Upper (80%CI)']}</td>
-<td style="color:#6E6E73">{row['CI Width']}</td>
-<td>{row['Confidence']}</td>
-</tr>"""
-tbl_html += "</tbody></table></div>"
-st.markdown(tbl_html, unsafe_allow_html=True)
+ci = fwd_table["CI Width"].to_numpy()
+fwd_table["Confidence"] = np.select([ci < 20, ci < 35], ["Green", "Amber"], "Red")
+
+render_table(fwd_table, [
+    column("Week", "Week", style="font-weight:500"),
+    column("Forecast Units", "forecast_units", integer(), style="font-weight:600"),
+    column("Lower (80% CI)", "forecast_lower", integer(), style="color:#6E6E73"),
+    column("Upper (80% CI)", "forecast_upper", integer(), style="color:#6E6E73"),
+    column("CI Width", "CI Width", percent(), style="color:#6E6E73"),
+    column("Confidence", "Confidence",
+           badge({"Green": "badge-green", "Amber": "badge-amber", "Red": "badge-red"})),
+], key="forward_plan",
+   cache_key=(get_store().version("forecasts", "products", "partners", "actuals"),
+              reconciled.method, aggregates_version(), fam, pid, partid))
+
+render_debug_panel()
@@ -17,23 +17,30 @@ css_path = os.path.join(os.path.dirname(__file__), "..", "styles", "apple_theme.
 with open(css_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-from src.utils.helpers import (load_products, load_partners, load_actuals,
-                                load_forecasts, load_order_book, format_eur)
+from src.utils.helpers import format_eur
+from src.utils.data_store import get_store
 from src.utils.apple_charts import instock_heatmap, wos_histogram
-from src.analytics.order_book_analysis import (order_book_health, get_chase_opportunities,
+from src.analytics.order_book_analysis import (load_order_book_analytics,
                                                  shipment_plan_validation, instock_ranging_analysis)
 from app.components.kpi_cards import render_kpi_row, insight_box, section_header, render_sidebar
 from app.components.charts import show_chart
+from app.components.tables import render_table, column, integer, eur, badge
+from app.components.debug_panel import begin_page, render_debug_panel
 import plotly.graph_objects as go
 from src.utils.apple_charts import apple_chart_layout
 
-@st.cache_data(ttl=300)
 def _load():
-    return (load_products(), load_partners(), load_actuals(),
-            load_forecasts(), load_order_book())
+    store = get_store()
+    return (store.get("products"), store.get("partners"),
+            store.facts(["date","product_id","partner_id","in_stock_rate","weeks_of_supply",
+                         "product_family","partner_name"]),
+            store.get("forecasts", ["product_id","forecast_units","forecast_model"]),
+            store.get("order_book"), load_order_book_analytics(store))
+
+begin_page("Order Book")
 
 try:
-    products, partners, actuals, forecasts, order_book = _load()
+    products, partners, actuals, forecasts, order_book, ob_layer = _load()
 except FileNotFoundError:
     st.error("Run `python src/data_generator.py` first."); st.stop()
 
@@ -45,16 +52,16 @@ st.markdown('<div class="page-title">Order Book & Shipment Planning</div>', unsa
 st.markdown('<div class="page-subtitle">Current order book health · Chase opportunities · Shipment plan validation · In-stock analysis</div>', unsafe_allow_html=True)
 
 # ─── KPI Row ─────────────────────────────────────────────────────────────────
-health = order_book_health(order_book)
+health = ob_layer.health()
 
 render_kpi_row([
-    {"label": "Open Order Value", "value": format_eur(order_book[order_book["status"]!="Shipped"]["units_confirmed"].sum() * 1_050),
-     "context": f"{len(order_book[order_book['status'].isin(['Open','Partially Fulfilled'])]):,} open lines"},
+    {"label": "Open Order Value", "value": format_eur(health["open_units"] * 1_050),
+     "context": f"{health['open_lines']:,} open lines"},
     {"label": "Fulfilment Rate", "value": f"{health['fulfilment_rate']:.1f}%",
      "delta": 2.1, "context": "Units shipped / ordered"},
     {"label": "At-Risk Orders", "value": f"{health['at_risk_pct']:.1f}%",
      "delta": -1.2, "delta_good_direction": "negative",
-     "context": f"{len(order_book[order_book['status']=='At Risk'])} lines at risk"},
+     "context": f"{health['at_risk_lines']} lines at risk"},
     {"label": "Chase Opportunity", "value": format_eur(health["chase_value"]),
      "delta": 15.0, "context": "Incremental revenue available"},
 ])
@@ -63,26 +70,16 @@ st.markdown("<div style='margin:16px 0'></div>", unsafe_allow_html=True)
 # ─── Chase Opportunity Table ──────────────────────────────────────────────────
 section_header("Chase Opportunity — Top Lines by Revenue Potential")
 
-chase = get_chase_opportunities(order_book, products, partners, top_n=15)
-
-def priority_badge(p):
-    cls = {"High": "badge-red", "Medium": "badge-amber", "Low": "badge-blue"}.get(p, "badge-grey")
-    return f'<span class="badge {cls}">{p}</span>'
-
-tbl_html = """<div class="apple-table-wrap"><table class="apple-table">
-<thead><tr><th>Partner</th><th>Product</th><th>Family</th>
-<th>Chase Units</th><th>Revenue Potential</th><th>Priority</th></tr></thead><tbody>"""
-for _, row in chase.iterrows():
-    tbl_html += f"""<tr>
-<td style="font-weight:500">{row['partner_name']}</td>
-<td>{row['product_name']}</td>
-<td style="color:#6E6E73">{row['product_family']}</td>
-<td style="font-weight:500">{int(row['chase_units_recommended']):,}</td>
-<td style="font-weight:600;color:#0071E3">{format_eur(row['chase_revenue_potential'])}</td>
-<td>{priority_badge(str(row['priority']))}</td>
-</tr>"""
-tbl_html += "</tbody></table></div>"
-st.markdown(tbl_html, unsafe_allow_html=True)
+chase = ob_layer.chase(top_n=15)
+
+render_table(chase, [
+    column("Partner", "partner_name", style="font-weight:500"),
+    column("Product", "product_name"),
+    column("Family", "product_family", style="color:#6E6E73"),
+    column("Chase Units", "chase_units_recommended", integer(), style="font-weight:500"),
+    column("Revenue Potential", "chase_revenue_potential", eur(), style="font-weight:600;color:#0071E3"),
+    column("Priority", "priority", badge({"High": "badge-red", "Medium": "badge-amber", "Low": "badge-blue"})),
+], key="chase", cache_key=get_store().version("order_book", "actuals", "products", "partners"))
 
 insight_box(
     f"<strong>Chase Analysis:</strong> We have identified <strong>{format_eur(health['chase_value'])}</strong> "
@@ -114,7 +111,7 @@ with col1:
 
 with col2:
     # Order status donut
-    status_counts = order_book["status"].value_counts().reset_index()
+    status_counts = ob_layer.status_counts()
     status_colors = {"Open": "#0071E3", "Partially Fulfilled": "#FF9500",
                      "At Risk": "#FF3B30", "Shipped": "#34C759"}
     colors = [status_colors.get(s, "#8E8E93") for s in status_counts["status"]]
@@ -152,3 +149,5 @@ section_header("Weeks of Supply Distribution")
 recent_wos = actuals[actuals["date"] == actuals["date"].max()][["weeks_of_supply"]].dropna()
 fig_wos = wos_histogram(recent_wos, height=320)
 show_chart(fig_wos)
+
+render_debug_panel()
@@ -16,19 +16,27 @@ css_path = os.path.join(os.path.dirname(__file__), "..", "styles", "apple_theme.
 with open(css_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-from src.utils.helpers import load_products, load_partners, load_npi_tracker, format_eur
+from src.utils.helpers import format_eur, PROC_DIR
+from src.utils.data_store import get_store
 from src.utils.apple_charts import npi_velocity_chart, apple_chart_layout
-from src.analytics.npi_tracker import npi_launch_kpis, partner_npi_scorecard, npi_waterfall_data
+from src.analytics.npi_tracker import load_npi_analytics
+from src.analytics.npi_stream import state_version
+from src.analytics.launch_curves import load_launch_curves
 from app.components.kpi_cards import render_kpi_row, insight_box, section_header, render_sidebar
 from app.components.charts import show_chart
+from app.components.tables import render_table, column, percent, badge, truncate
+from app.components.debug_panel import begin_page, render_debug_panel
 import plotly.graph_objects as go
 
-@st.cache_data(ttl=300)
 def _load():
-    return load_products(), load_partners(), load_npi_tracker()
+    store = get_store()
+    return store.get_many("products", "partners", "npi") + (load_npi_analytics(store),
+                                                            load_launch_curves(store))
+
+begin_page("NPI Tracker")
 
 try:
-    products, partners, npi = _load()
+    products, partners, npi, npi_layer, launch_curves = _load()
 except FileNotFoundError:
     st.error("Run `python src/data_generator.py` first."); st.stop()
 
@@ -56,9 +64,9 @@ sel_npi_name = st.selectbox(
 sel_npi_pid = npi_products[npi_products["product_name"] == sel_npi_name]["product_id"].values[0]
 
 # ─── KPI Row ─────────────────────────────────────────────────────────────────
-kpis = npi_launch_kpis(npi, products)
-npi_filt = npi[npi["product_id"] == sel_npi_pid]
-prod_velocity = npi_filt["velocity_vs_plan"].mean() * 100
+kpis = npi_layer.kpis()
+npi_view = npi_layer.product(sel_npi_pid)
+prod_velocity = npi_view["velocity"]
 
 render_kpi_row([
     {"label": "Overall NPI Velocity", "value": f"{prod_velocity:.1f}%",
@@ -79,24 +87,21 @@ st.markdown("<div style='margin:16px 0'></div>", unsafe_allow_html=True)
 section_header("Launch Velocity — Actual vs Plan vs Prior Generation")
 
 # Current gen: aggregate by week across all partners
-cur_actual = npi_filt.groupby("week_number").agg(
-    units_planned=("units_planned","sum"),
-    units_actual=("units_actual","sum"),
-).reset_index()
+cur_actual = npi_view["weekly"]
 
-# Simulate prior gen (iPhone 15 equivalent) — 5-10% lower with noise
-prior = cur_actual.copy()
-prior["units_actual"] = (prior["units_planned"] * np.random.uniform(0.82, 0.92, len(prior))).astype(int)
+# Prior gen: the family's previous launch curve from actuals, on this launch's week-1 plan
+prior, prior_label = launch_curves.comparison(sel_npi_pid, cur_actual)
+vel_title = f"Launch Velocity: {sel_npi_name}" + (f" vs {prior_label}" if prior_label else "")
 
 fig_vel = npi_velocity_chart(cur_actual, cur_actual, prior, height=420)
-fig_vel.update_layout(title=dict(text=f"Launch Velocity: {sel_npi_name}",
+fig_vel.update_layout(title=dict(text=vel_title,
                                   font=dict(size=16, color="#1D1D1F"), x=0))
 show_chart(fig_vel)
 
 # ─── Partner Scorecard Grid ────────────────────────────────────────────────────
 section_header("Partner Scorecard — RAG Status by Partner")
 
-scorecard = partner_npi_scorecard(npi, partners, sel_npi_pid)
+scorecard = npi_view["scorecard"]
 
 if scorecard.empty:
     st.info("No scorecard data for this product."); 
@@ -136,20 +141,19 @@ else:
 risk_rows = scorecard[scorecard["risk_flag"].isin(["Red","Amber"])].copy()
 if not risk_rows.empty:
     section_header("Risk Identification — Partners Requiring Action")
-    tbl = """<div class="apple-table-wrap"><table class="apple-table">
-    <thead><tr><th>Partner</th><th>Velocity vs Plan</th><th>Sell-Through</th><th>Status</th><th>Root Cause / Recommended Action</th></tr></thead><tbody>"""
-    for _, r in risk_rows.iterrows():
-        cls = "badge-red" if r["risk_flag"] == "Red" else "badge-amber"
-        reason = r.get("risk_reason") or "Monitor and engage Account Manager"
-        tbl += f"""<tr>
-        <td style="font-weight:500">{r['partner_name']}</td>
-        <td style="font-weight:600;color:{'#FF3B30' if r['risk_flag']=='Red' else '#FF9500'}">{r['velocity_pct']:.1f}%</td>
-        <td>{r['st_pct']:.1f}%</td>
-        <td><span class="badge {cls}">{r['risk_flag']}</span></td>
-        <td style="color:#6E6E73;font-size:13px">{str(reason)[:100]}</td>
-        </tr>"""
-    tbl += "</tbody></table></div>"
-    st.markdown(tbl, unsafe_allow_html=True)
+    reason = risk_rows["risk_reason"].astype(object)
+    risk_rows["risk_reason"] = reason.where(reason.notna() & (reason != ""), "Monitor and engage Account Manager")
+    render_table(risk_rows, [
+        column("Partner", "partner_name", style="font-weight:500"),
+        column("Velocity vs Plan", "velocity_pct", percent(),
+               style=lambda df: np.where(df["risk_flag"] == "Red", "font-weight:600;color:#FF3B30",
+                                         "font-weight:600;color:#FF9500")),
+        column("Sell-Through", "st_pct", percent()),
+        column("Status", "risk_flag", badge({"Red": "badge-red"}, default="badge-amber")),
+        column("Root Cause / Recommended Action", "risk_reason", truncate(100),
+               style="color:#6E6E73;font-size:13px"),
+    ], key="npi_risk", cache_key=(get_store().version("npi", "products", "partners"),
+                                  state_version(PROC_DIR), sel_npi_pid))
 
 insight_box(
     f"<strong>NPI Intelligence:</strong> {sel_npi_name} is tracking at "
@@ -163,7 +167,7 @@ insight_box(
 # ─── Waterfall ────────────────────────────────────────────────────────────────
 section_header("Launch Performance Waterfall — Plan vs Actual by Partner")
 
-wf_data = npi_waterfall_data(npi, partners, sel_npi_pid)
+wf_data = npi_view["waterfall"]
 if not wf_data.empty:
     total_plan   = wf_data["plan"].sum()
     total_actual = wf_data["actual"].sum()
@@ -187,3 +191,5 @@ if not wf_data.empty:
     ))
     apple_chart_layout(fig_wf, height=380)
     show_chart(fig_wf)
+
+render_debug_panel()
@@ -16,18 +16,26 @@ css_path = os.path.join(os.path.dirname(__file__), "..", "styles", "apple_theme.
 with open(css_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-from src.utils.helpers import (load_products, load_partners, load_actuals,
-                                load_alerts, format_eur)
+from src.utils.helpers import format_eur
+from src.utils.data_store import get_store
 from src.utils.apple_charts import risk_matrix_scatter, apple_chart_layout
 from src.analytics.alert_engine import get_alert_kpis, build_risk_matrix
 from app.components.kpi_cards import render_kpi_row, insight_box, section_header, render_sidebar
 from app.components.alerts import render_alert_feed
 from app.components.charts import show_chart
+from app.components.tables import render_table, column, eur, badge, truncate
+from app.components.debug_panel import begin_page, render_debug_panel
 import plotly.graph_objects as go
 
-@st.cache_data(ttl=300)
 def _load():
-    return load_products(), load_partners(), load_actuals(), load_alerts()
+    store = get_store()
+    return (store.get("products"), store.get("partners"),
+            store.facts(["date","product_id","partner_id","revenue","units_sold",
+                         "in_stock_rate","weeks_of_supply","product_key","partner_key",
+                         "product_name","product_family","asp","partner_name"]),
+            store.get("alerts"))
+
+begin_page("Risk & Alerts")
 
 try:
     products, partners, actuals, alerts = _load()
@@ -101,24 +109,19 @@ open_alerts = open_alerts.merge(products[["product_id","product_name","product_f
 open_alerts = open_alerts.merge(partners[["partner_id","partner_name"]], on="partner_id", how="left")
 top10 = open_alerts.sort_values("revenue_impact", ascending=False).head(10)
 
-sev_cls = {"Critical": "badge-red", "Warning": "badge-amber", "Info": "badge-blue"}
-
-tbl = """<div class="apple-table-wrap"><table class="apple-table">
-<thead><tr><th>#</th><th>Severity</th><th>Partner</th><th>Product</th>
-<th>Alert Type</th><th>Recommended Action</th><th>Revenue Impact</th></tr></thead><tbody>"""
-for rank, (_, row) in enumerate(top10.iterrows(), 1):
-    cls = sev_cls.get(row["severity"], "badge-blue")
-    tbl += f"""<tr>
-<td style="font-weight:700;color:#0071E3">{rank}</td>
-<td><span class="badge {cls}">{row['severity']}</span></td>
-<td style="font-weight:500">{row.get('partner_name', '—')}</td>
-<td style="color:#6E6E73">{str(row.get('product_name','—'))[:30]}</td>
-<td>{row['alert_type']}</td>
-<td style="font-size:13px;color:#6E6E73">{str(row['recommended_action'])[:80]}…</td>
-<td style="font-weight:600;color:#FF3B30">{format_eur(row['revenue_impact'])}</td>
-</tr>"""
-tbl += "</tbody></table></div>"
-st.markdown(tbl, unsafe_allow_html=True)
+top10["rank"] = np.arange(1, len(top10) + 1)
+
+render_table(top10, [
+    column("#", "rank", style="font-weight:700;color:#0071E3"),
+    column("Severity", "severity", badge({"Critical": "badge-red", "Warning": "badge-amber"},
+                                         default="badge-blue")),
+    column("Partner", "partner_name", style="font-weight:500"),
+    column("Product", "product_name", truncate(30), style="color:#6E6E73"),
+    column("Alert Type", "alert_type"),
+    column("Recommended Action", "recommended_action", truncate(80, "…"),
+           style="font-size:13px;color:#6E6E73"),
+    column("Revenue Impact", "revenue_impact", eur(), style="font-weight:600;color:#FF3B30"),
+], key="top_actions", cache_key=get_store().version("alerts", "products", "partners"))
 
 insight_box(
     f"<strong>Action Summary:</strong> If we action the top 10 alerts this week, we protect "
@@ -130,8 +133,8 @@ insight_box(
 # ─── Alert Resolution Trend ───────────────────────────────────────────────────
 section_header("Alert Volume Trend — Last 8 Weeks")
 
-alerts["week"] = pd.to_datetime(alerts["date_generated"]).dt.to_period("W").dt.start_time
-trend = alerts.groupby(["week","status"]).size().unstack(fill_value=0).reset_index()
+alert_week = pd.to_datetime(alerts["date_generated"]).dt.to_period("W").dt.start_time.rename("week")
+trend = alerts.groupby([alert_week, alerts["status"]]).size().unstack(fill_value=0).reset_index()
 
 fig_trend = go.Figure()
 if "Open" in trend.columns:
@@ -146,3 +149,5 @@ if "In Progress" in trend.columns:
                                                                   dash="dash")))
 apple_chart_layout(fig_trend, height=300)
 show_chart(fig_trend)
+
+render_debug_panel()
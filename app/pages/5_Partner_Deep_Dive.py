@@ -16,25 +16,31 @@ css_path = os.path.join(os.path.dirname(__file__), "..", "styles", "apple_theme.
 with open(css_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
-from src.utils.helpers import (load_products, load_partners, load_actuals,
-                                load_forecasts, load_order_book, load_npi_tracker,
-                                load_alerts, format_eur, format_pct)
+from src.utils.helpers import format_eur, format_pct, format_eur_series
+from src.utils.data_store import get_store
+from src.forecasting.reconciliation import load_reconciled
+from src.utils.aggregate_cube import load_aggregate_cube
+from src.utils.partner_index import load_partner_index, PARTNER_DATASETS
 from src.utils.apple_charts import (product_mix_donut, apple_chart_layout,
-                                     forecast_line_chart)
+                                     forecast_line_chart, family_trend_chart)
 from src.analytics.partner_analytics import (partner_overview, partner_revenue_trend,
                                                partner_product_mix, generate_partner_insights)
 from app.components.kpi_cards import render_kpi_row, insight_box, section_header, render_sidebar
 from app.components.alerts import render_alert_feed
 from app.components.charts import show_chart
+from app.components.tables import render_table, column, integer, percent, badge, truncate
+from app.components.debug_panel import begin_page, render_debug_panel
 import plotly.graph_objects as go
 
-@st.cache_data(ttl=300)
 def _load():
-    return (load_products(), load_partners(), load_actuals(), load_forecasts(),
-            load_order_book(), load_npi_tracker(), load_alerts())
+    store = get_store()
+    return (store.get("products"), store.get("partners"), load_partner_index(store),
+            load_reconciled("mint_wls", store))
+
+begin_page("Partner Deep Dive")
 
 try:
-    products, partners, actuals, forecasts, order_book, npi, alerts = _load()
+    products, partners, partner_index, reconciled = _load()
 except FileNotFoundError:
     st.error("Run `python src/data_generator.py` first."); st.stop()
 
@@ -51,6 +57,10 @@ sel_pid = partners[partners["partner_name"] == sel_partner]["partner_id"].values
 tier    = partners[partners["partner_name"] == sel_partner]["partner_tier"].values[0]
 country = partners[partners["partner_name"] == sel_partner]["country"].values[0]
 
+# This partner's rows in every dataset (contiguous slices of the partner index)
+p_data = partner_index.partner(sel_pid)
+data_version = get_store().version(*PARTNER_DATASETS, "products", "partners")
+
 tier_badge_cls = {"Platinum": "badge-blue", "Gold": "badge-amber", "Silver": "badge-grey"}
 tier_html = f'<span class="badge {tier_badge_cls.get(tier,"badge-grey")}">{tier}</span>'
 st.markdown(
@@ -62,8 +72,8 @@ st.markdown(
 )
 
 # ─── KPI Row ─────────────────────────────────────────────────────────────────
-kpis = partner_overview(actuals, alerts, sel_pid)
-product_mix = partner_product_mix(actuals, products, sel_pid)
+kpis = partner_overview(p_data["actuals"], p_data["alerts"], sel_pid)
+product_mix = partner_product_mix(p_data["actuals"], products, sel_pid)
 
 render_kpi_row([
     {"label": "Revenue YTD",    "value": format_eur(kpis.get("ytd_revenue", 0)),
@@ -87,7 +97,7 @@ with tabs[0]:
 
     with col1:
         section_header("Revenue Trend — Last 2 Years")
-        rev_trend = partner_revenue_trend(actuals, sel_pid, weeks=104)
+        rev_trend = partner_revenue_trend(p_data["actuals"], sel_pid, weeks=104)
         fig_rev = go.Figure()
         fig_rev.add_trace(go.Scatter(
             x=rev_trend["date"], y=rev_trend["revenue"],
@@ -115,42 +125,25 @@ with tabs[0]:
 with tabs[1]:
     section_header(f"Demand Actuals & Forecast — {sel_partner}")
 
-    p_acts = actuals[actuals["partner_id"] == sel_pid]
-    weekly = p_acts.groupby("date").agg(units_sold=("units_sold","sum")).reset_index().sort_values("date").tail(52)
+    cube = load_aggregate_cube()
+    weekly = cube.frame(["units_sold"], partner_id=sel_pid).tail(52)
 
-    p_fcast = forecasts[(forecasts["partner_id"] == sel_pid) &
-                          (forecasts["forecast_model"] == "Ensemble")]
-    weekly_fc = p_fcast.groupby("date").agg(
-        forecast_units=("forecast_units","sum"),
-        forecast_lower=("forecast_lower","sum"),
-        forecast_upper=("forecast_upper","sum"),
-    ).reset_index().sort_values("date")
+    weekly_fc = reconciled.node(partner_id=sel_pid)
 
     fig_dem = forecast_line_chart(weekly, weekly_fc, height=420)
     show_chart(fig_dem)
 
     # Accuracy by product family
     section_header("Demand by Product Family")
-    p_acts_fam = p_acts.merge(products[["product_id","product_family"]], on="product_id", how="left")
-    fam_weekly = p_acts_fam.groupby(["date","product_family"]).agg(
-        units_sold=("units_sold","sum")).reset_index()
-
-    from src.utils.apple_charts import APPLE_COLORS
-    fig_fam = go.Figure()
-    for fam, color in APPLE_COLORS.items():
-        fam_data = fam_weekly[fam_weekly["product_family"] == fam].sort_values("date").tail(26)
-        if fam_data.empty: continue
-        fig_fam.add_trace(go.Scatter(
-            x=fam_data["date"], y=fam_data["units_sold"],
-            name=fam, line=dict(color=color, width=2), mode="lines"
-        ))
-    apple_chart_layout(fig_fam, height=360)
+    fam_weekly = cube.breakdown("units_sold", "family", partner_id=sel_pid)
+
+    fig_fam = family_trend_chart(fam_weekly, "units_sold", periods=26, height=360)
     show_chart(fig_fam)
 
 # ═══════════ TAB 3: ORDER BOOK ═══════════
 with tabs[2]:
     section_header(f"Order Book — {sel_partner}")
-    p_orders = order_book[order_book["partner_id"] == sel_pid].copy()
+    p_orders = p_data["order_book"].copy()
     p_orders = p_orders.merge(products[["product_id","product_name","product_family"]], on="product_id", how="left")
 
     if p_orders.empty:
@@ -169,58 +162,55 @@ with tabs[2]:
 
         st.markdown("<div style='margin:12px 0'></div>", unsafe_allow_html=True)
 
-        tbl = """<div class="apple-table-wrap"><table class="apple-table">
-<thead><tr><th>Order ID</th><th>Product</th><th>Ordered</th>
-<th>Confirmed</th><th>Shipped</th><th>Status</th><th>Chase</th></tr></thead><tbody>"""
-        status_cls = {"Open":"badge-blue","Partially Fulfilled":"badge-amber",
-                      "At Risk":"badge-red","Shipped":"badge-green"}
-        for _, r in p_orders.head(20).iterrows():
-            chase_str = format_eur(r["chase_revenue_potential"]) if r["chase_opportunity"] else "—"
-            cls = status_cls.get(r["status"], "badge-grey")
-            tbl += f"""<tr>
-<td style="color:#6E6E73;font-size:12px">{r['order_id']}</td>
-<td style="font-size:13px">{str(r.get('product_name',''))[:30]}</td>
-<td>{int(r['units_ordered']):,}</td>
-<td>{int(r['units_confirmed']):,}</td>
-<td>{int(r['units_shipped']):,}</td>
-<td><span class="badge {cls}">{r['status']}</span></td>
-<td style="color:#0071E3;font-weight:600">{chase_str}</td>
-</tr>"""
-        tbl += "</tbody></table></div>"
-        st.markdown(tbl, unsafe_allow_html=True)
+        p_orders["chase_display"] = np.where(p_orders["chase_opportunity"].to_numpy(dtype=bool),
+                                             format_eur_series(p_orders["chase_revenue_potential"]), "—")
+        render_table(p_orders, [
+            column("Order ID", "order_id", style="color:#6E6E73;font-size:12px"),
+            column("Product", "product_name", truncate(30), style="font-size:13px"),
+            column("Ordered", "units_ordered", integer()),
+            column("Confirmed", "units_confirmed", integer()),
+            column("Shipped", "units_shipped", integer()),
+            column("Status", "status", badge({"Open": "badge-blue", "Partially Fulfilled": "badge-amber",
+                                              "At Risk": "badge-red", "Shipped": "badge-green"})),
+            column("Chase", "chase_display", style="color:#0071E3;font-weight:600"),
+        ], key=f"partner_orders_{sel_pid}", cache_key=data_version, page_size=20)
 
 # ═══════════ TAB 4: NPI ═══════════
 with tabs[3]:
     section_header(f"NPI Performance — {sel_partner}")
-    p_npi = npi[npi["partner_id"] == sel_pid].copy()
+    p_npi = p_data["npi"].copy()
     p_npi = p_npi.merge(products[["product_id","product_name"]], on="product_id", how="left")
 
     if p_npi.empty:
         st.info("No NPI data for this partner.")
     else:
-        tbl = """<div class="apple-table-wrap"><table class="apple-table">
-<thead><tr><th>Product</th><th>Week</th><th>Plan</th><th>Actual</th>
-<th>Velocity vs Plan</th><th>Sell-Through</th><th>Status</th></tr></thead><tbody>"""
-        for _, r in p_npi.sort_values(["product_id","week_number"]).head(30).iterrows():
-            vel_color = "#34C759" if r["velocity_vs_plan"]>=0.9 else ("#FF9500" if r["velocity_vs_plan"]>=0.7 else "#FF3B30")
-            rag_cls = {"Green":"badge-green","Amber":"badge-amber","Red":"badge-red"}.get(r["risk_flag"],"badge-grey")
-            tbl += f"""<tr>
-<td style="font-size:13px">{str(r.get('product_name',''))[:30]}</td>
-<td style="color:#6E6E73">Wk {int(r['week_number'])}</td>
-<td>{int(r['units_planned']):,}</td>
-<td style="font-weight:600">{int(r['units_actual']):,}</td>
-<td style="font-weight:600;color:{vel_color}">{r['velocity_vs_plan']*100:.1f}%</td>
-<td>{r['sell_through_rate']*100:.1f}%</td>
-<td><span class="badge {rag_cls}">{r['risk_flag']}</span></td>
-</tr>"""
-        tbl += "</tbody></table></div>"
-        st.markdown(tbl, unsafe_allow_html=True)
+        p_npi = p_npi.sort_values(["product_id","week_number"])
+
+        def velocity_style(df):
+            vel = df["velocity_vs_plan"].to_numpy(dtype=float)
+            return np.select([vel >= 0.9, vel >= 0.7], ["font-weight:600;color:#34C759",
+                             "font-weight:600;color:#FF9500"], "font-weight:600;color:#FF3B30")
+
+        p_npi["week_label"] = "Wk " + p_npi["week_number"].astype(int).astype(str)
+        render_table(p_npi, [
+            column("Product", "product_name", truncate(30), style="font-size:13px"),
+            column("Week", "week_label", style="color:#6E6E73"),
+            column("Plan", "units_planned", integer()),
+            column("Actual", "units_actual", integer(), style="font-weight:600"),
+            column("Velocity vs Plan", "velocity_vs_plan", percent(100),
+                   style=velocity_style),
+            column("Sell-Through", "sell_through_rate", percent(100)),
+            column("Status", "risk_flag", badge({"Green": "badge-green", "Amber": "badge-amber",
+                                                 "Red": "badge-red"})),
+        ], key=f"partner_npi_{sel_pid}", cache_key=data_version, page_size=30)
 
 # ═══════════ TAB 5: ALERTS ═══════════
 with tabs[4]:
     section_header(f"Open Alerts — {sel_partner}")
-    p_alerts = alerts[(alerts["partner_id"] == sel_pid) & (alerts["status"] == "Open")]
+    p_alerts = p_data["alerts"][p_data["alerts"]["status"] == "Open"]
     if p_alerts.empty:
         insight_box(f"No open alerts for {sel_partner} — operations are on track.", icon="")
     else:
         render_alert_feed(p_alerts)
+
+render_debug_panel()
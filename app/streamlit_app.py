@@ -25,33 +25,37 @@ with open(css_path) as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
 # ─── Imports (after sys.path) ─────────────────────────────────────────────────
-from src.utils.helpers import (
-    load_products, load_partners, load_actuals, load_forecasts,
-    load_order_book, load_npi_tracker, load_alerts,
-    format_eur, format_pct, calc_channel_kpis
-)
+from src.utils.helpers import format_eur, format_pct, calc_channel_kpis
+from src.utils.data_store import get_store
+from src.utils.aggregate_cube import load_aggregate_cube
+from src.analytics.chase_engine import load_scored_order_book
+from src.analytics.forecast_accuracy import load_accuracy_cube, accuracy_metrics, summarize_accuracy
 from src.utils.apple_charts import (
     revenue_trend_chart, product_mix_donut, partner_ranking_bar,
     forecast_accuracy_bar, apple_chart_layout
 )
 from app.components.kpi_cards import render_kpi_row, insight_box, section_header, render_sidebar
 from app.components.charts import show_chart
+from app.components.debug_panel import begin_page, render_debug_panel
 
 
-# ─── Data Loading (cached) ────────────────────────────────────────────────────
-@st.cache_data(ttl=300)
+# ─── Data Loading (shared process-wide store) ─────────────────────────────────
 def load_data():
+    store = get_store()
     return {
-        "products":   load_products(),
-        "partners":   load_partners(),
-        "actuals":    load_actuals(),
-        "forecasts":  load_forecasts(),
-        "order_book": load_order_book(),
-        "npi":        load_npi_tracker(),
-        "alerts":     load_alerts(),
+        "products":   store.get("products"),
+        "partners":   store.get("partners"),
+        "actuals":    store.facts(["date","product_id","partner_id","revenue","in_stock_rate",
+                                       "units_ordered","units_shipped","product_family","partner_name"]),
+        "cube":       load_aggregate_cube(store),
+        "order_book": load_scored_order_book(store),
+        "npi":        store.get("npi"),
+        "alerts":     store.get("alerts"),
     }
 
 
+begin_page("Executive Overview")
+
 try:
     data = load_data()
 except FileNotFoundError:
@@ -61,7 +65,7 @@ except FileNotFoundError:
 products   = data["products"]
 partners   = data["partners"]
 actuals    = data["actuals"]
-forecasts  = data["forecasts"]
+cube       = data["cube"]
 order_book = data["order_book"]
 alerts     = data["alerts"]
 
@@ -72,6 +76,10 @@ with st.sidebar:
 # ─── KPIs ─────────────────────────────────────────────────────────────────────
 kpis = calc_channel_kpis(actuals, order_book, alerts, products)
 
+# Measured Ensemble accuracy (forecast vs actual or backtest); None until one exists
+acc_cube = load_accuracy_cube()
+ensemble_acc = accuracy_metrics(acc_cube, "Ensemble") if acc_cube is not None else None
+
 # ─── Page Header ─────────────────────────────────────────────────────────────
 st.markdown('<div class="page-title">Reseller Channel Intelligence</div>', unsafe_allow_html=True)
 st.markdown('<div class="page-subtitle">EMEA Reseller Operations · Week 37, 2025 · <span class="data-freshness"><span class="meta-dot" style="display:inline-block;vertical-align:middle;margin-right:4px"></span>Data refreshed 2 min ago</span></div>',
@@ -88,10 +96,9 @@ render_kpi_row([
     },
     {
         "label": "Forecast Accuracy",
-        "value": "91.3%",
-        "delta": 1.2,
-        "delta_period": "vs last month",
-        "context": "Ensemble model (WMAPE)",
+        "value": f"{ensemble_acc['accuracy']:.1f}%" if ensemble_acc is not None else "n/a",
+        "context": ("Ensemble model (WMAPE)" if ensemble_acc is not None
+                    else "Run src/forecasting/backtest.py to measure"),
     },
     {
         "label": "In-Stock Rate",
@@ -131,32 +138,16 @@ section_header("Revenue Trend & Product Mix")
 col1, col2 = st.columns([3, 2], gap="large")
 
 with col1:
-    # Build weekly revenue from actuals (last 52 weeks)
-    weekly_rev = (
-        actuals.groupby("date")["revenue"]
-        .sum()
-        .reset_index()
-        .sort_values("date")
-        .tail(52)
-    )
-    fcast_ens = forecasts[forecasts["forecast_model"] == "Ensemble"].copy()
-    fcast_merged = fcast_ens.merge(products[["product_id","asp"]], on="product_id", how="left")
-    fcast_merged["_rev"]   = fcast_merged["forecast_units"] * fcast_merged["asp"]
-    fcast_merged["_lower"] = fcast_merged["forecast_lower"]  * fcast_merged["asp"]
-    fcast_merged["_upper"] = fcast_merged["forecast_upper"]  * fcast_merged["asp"]
-    fcast_rev = fcast_merged.groupby("date").agg(
-        forecast_revenue=("_rev","sum"),
-        lower=("_lower","sum"),
-        upper=("_upper","sum"),
-    ).reset_index()
+    # Weekly revenue (last 52 weeks) and Ensemble forecast from the aggregate cube
+    weekly_rev = cube.frame(["revenue"]).tail(52)
+    fcast_rev = cube.forecast_band("forecast_revenue")
 
     fig_rev = revenue_trend_chart(weekly_rev, fcast_rev, height=380)
     show_chart(fig_rev)
 
 with col2:
-    mix = actuals.merge(products[["product_id","product_family"]], on="product_id", how="left")
-    total_rev = mix["revenue"].sum()
-    fig_donut = product_mix_donut(mix, center_text=format_eur(total_rev), height=380)
+    total_rev = actuals["revenue"].sum()
+    fig_donut = product_mix_donut(actuals, center_text=format_eur(total_rev), height=380)
     fig_donut.update_layout(title=dict(text="Product Family Mix",
                                         font=dict(size=16, color="#1D1D1F"), x=0))
     show_chart(fig_donut)
@@ -168,8 +159,7 @@ col3, col4 = st.columns([3, 2], gap="large")
 with col3:
     # Partner ranking by revenue with avg in-stock as colour
     p_rev = (
-        actuals.merge(partners[["partner_id","partner_name"]], on="partner_id", how="left")
-        .groupby("partner_name")
+        actuals.groupby("partner_name", observed=True)
         .agg(revenue=("revenue","sum"), in_stock_rate=("in_stock_rate","mean"))
         .reset_index()
     )
@@ -180,18 +170,16 @@ with col3:
 
 with col4:
     # Forecast accuracy by product family
-    family_acc = pd.DataFrame([
-        {"product_family": "iPhone",       "accuracy": 93.8},
-        {"product_family": "iPad",         "accuracy": 91.2},
-        {"product_family": "Mac",          "accuracy": 90.5},
-        {"product_family": "Apple Watch",  "accuracy": 89.1},
-        {"product_family": "AirPods",      "accuracy": 88.4},
-        {"product_family": "Accessories",  "accuracy": 86.2},
-    ])
-    fig_acc = forecast_accuracy_bar(family_acc, height=420)
-    fig_acc.update_layout(title=dict(text="Forecast Accuracy by Product Family",
-                                      font=dict(size=16, color="#1D1D1F"), x=0))
-    show_chart(fig_acc)
+    if ensemble_acc is not None:
+        family_acc = (summarize_accuracy(acc_cube, ["product_family"], forecast_model="Ensemble")
+                      .sort_values("accuracy", ascending=False))
+        fig_acc = forecast_accuracy_bar(family_acc, height=420)
+        fig_acc.update_layout(title=dict(text="Forecast Accuracy by Product Family",
+                                          font=dict(size=16, color="#1D1D1F"), x=0))
+        show_chart(fig_acc)
+    else:
+        st.info("Forecast accuracy by product family appears once forecasts overlap actuals "
+                "or `python src/forecasting/backtest.py` has been run.")
 
 # ─── Insight Box ──────────────────────────────────────────────────────────────
 insight_box(
@@ -204,3 +192,5 @@ insight_box(
     f"<strong>{kpis['critical_alerts']} critical alerts</strong> require action this week to "
     f"protect an estimated €2.8M in at-risk revenue."
 )
+
+render_debug_panel()
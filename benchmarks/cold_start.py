@@ -0,0 +1,140 @@
+"""
+Cold-Start Benchmark — Import time and first-render time of the dashboard pages.
+Every measurement runs in a fresh interpreter: module import times, then each
+page's first render with cold caches and after the launch warm-up
+(src/utils/warmup.py), plus the rerun that follows.
+Author: Mohammed Kaif Ahmed
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+
+IMPORT_TARGETS = [
+    "pandas",
+    "plotly.graph_objects",
+    "src.utils.data_store",
+    "src.utils.apple_charts",
+    "src.forecasting.reconciliation",
+    "src.analytics.order_book_analysis",
+    "app.components.charts",
+    "app.components.tables",
+]
+PAGES = [
+    "app/streamlit_app.py",
+    "app/pages/1_Demand_Forecast.py",
+    "app/pages/2_Order_Book.py",
+    "app/pages/3_NPI_Tracker.py",
+    "app/pages/4_Risk_Alerts.py",
+    "app/pages/5_Partner_Deep_Dive.py",
+]
+
+
+# ─── Child processes ──────────────────────────────────────────────────────────
+def _child_import(module: str) -> dict:
+    import streamlit  # noqa: F401 — already loaded in a running server
+    if module != "pandas":
+        import pandas  # noqa: F401 — reported on its own row
+    t0 = time.perf_counter()
+    __import__(module)
+    return {"seconds": time.perf_counter() - t0}
+
+
+def _child_render(page: str, mode: str, raw_dir: str) -> dict:
+    # Page time comes from the dashboard's own rerun profile (src/utils/profiling.py),
+    # which excludes the test harness's per-app start-up
+    os.environ["DEMAND_PLANNER_PROFILE"] = "1"
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    from src.utils import helpers
+
+    helpers.RAW_DIR = raw_dir
+    # AppTest runs a single script without the multipage registry; sidebar links are no-ops
+    st.page_link = lambda *a, **k: None
+
+    out = {}
+    if mode == "warm":
+        from src.utils.warmup import warm_up
+        t0 = time.perf_counter()
+        warm_up()
+        out["warm_up"] = time.perf_counter() - t0
+
+    at = AppTest.from_file(os.path.join(BASE_DIR, page), default_timeout=600)
+    at.run()
+    at.run()
+    out["errors"] = [str(e.value)[:200] for e in list(at.exception) + list(at.error)]
+    history = at.session_state["_profile_history"] if "_profile_history" in at.session_state else {}
+    runs = next(iter(history.values()), [])
+    if len(runs) == 2:
+        out["first"], out["rerun"] = runs
+    return out
+
+
+def _spawn(*args) -> dict:
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", *args],
+                          cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        return {"error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(lines[-1])
+
+
+# ─── Driver ───────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure dashboard import and first-render time.")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="benchmark dataset scale (generated by run_benchmarks.py if missing)")
+    parser.add_argument("--raw-dir", default=None, help="use this raw data folder instead")
+    parser.add_argument("--pages", default=None, help="comma-separated substrings of pages to run")
+    parser.add_argument("--json", default=None, help="also write results to this file")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        sys.path.insert(0, BASE_DIR)
+        kind, *rest = args.child
+        result = _child_import(*rest) if kind == "import" else _child_render(*rest)
+        print(json.dumps(result))
+        return 0
+
+    raw_dir = args.raw_dir
+    if raw_dir is None:
+        from run_benchmarks import ensure_dataset
+        raw_dir = ensure_dataset(args.scale)
+    pages = [p for p in PAGES if not args.pages or any(s in p for s in args.pages.split(","))]
+
+    print("\nImport time (fresh interpreter; streamlit and pandas preloaded except on their own row)")
+    imports = {}
+    for module in IMPORT_TARGETS:
+        imports[module] = _spawn("import", module)
+        r = imports[module]
+        print(f"  {module:38s} " + (f"{r['seconds'] * 1000:8.1f} ms" if "seconds" in r else r["error"]))
+
+    print(f"\nFirst render ({raw_dir})")
+    print(f"  {'page':34s} {'cold':>9s} {'warm-up':>9s} {'warm':>9s} {'rerun':>9s}")
+    renders = {}
+    for page in pages:
+        cold, warm = _spawn("render", page, "cold", raw_dir), _spawn("render", page, "warm", raw_dir)
+        renders[page] = {"cold": cold, "warm": warm}
+        fmt = lambda r, k: f"{r[k]:8.2f}s" if k in r else "      —  "
+        print(f"  {os.path.basename(page):34s} {fmt(cold, 'first')} {fmt(warm, 'warm_up')} "
+              f"{fmt(warm, 'first')} {fmt(warm, 'rerun')}")
+        for r in (cold, warm):
+            if r.get("error") or r.get("errors"):
+                print(f"    ⚠ {r.get('error') or r['errors'][0]}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"raw_dir": raw_dir, "imports": imports, "renders": renders}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Benchmarks — Analytics and loader timings at 1×, 10× and 100× the demo data scale.
+Datasets are generated once per scale (SKUs and partners each grown by √scale),
+every case is timed over several repeats and traced once for peak memory, and
+results are compared with a JSON baseline to flag regressions.
+Author: Mohammed Kaif Ahmed
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from src.utils import helpers
+from src.analytics import (alert_engine, chase_engine, forecast_accuracy, launch_curves,
+                           npi_tracker, order_book_analysis, partner_analytics, tracking_signal)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+BASE_SKUS, BASE_PARTNERS = 40, 13
+DEFAULT_SCALES = (1, 10, 100)
+REGRESSION_RATIO = 1.25     # slower / heavier than baseline by more than this → flagged
+NOISE_FLOOR_S = 0.005       # ignore timing deltas below 5 ms
+
+
+# ─── Datasets ─────────────────────────────────────────────────────────────────
+def scale_dims(scale: int) -> tuple:
+    """(SKUs, partners) for a scale factor: each dimension grows by √scale."""
+    root = math.sqrt(scale)
+    return round(BASE_SKUS * root), round(BASE_PARTNERS * root)
+
+
+def ensure_dataset(scale: int, data_dir: str = DATA_DIR) -> str:
+    """Generate the dataset for `scale` once; returns its raw/ folder."""
+    out_dir = os.path.join(data_dir, f"scale_{scale}")
+    raw_dir = os.path.join(out_dir, "raw")
+    if os.path.exists(os.path.join(raw_dir, "alerts.csv")) or \
+            os.path.exists(os.path.join(raw_dir, "alerts.parquet")):
+        return raw_dir
+    skus, partners = scale_dims(scale)
+    print(f"  generating {scale}× dataset ({skus} SKUs × {partners} partners)...")
+    subprocess.run([sys.executable, os.path.join(BASE_DIR, "src", "data_generator.py"),
+                    "--skus", str(skus), "--partners", str(partners), "--out-dir", out_dir],
+                   check=True, stdout=subprocess.DEVNULL)
+    return raw_dir
+
+
+# ─── Cases ────────────────────────────────────────────────────────────────────
+def build_cases(d: dict) -> dict:
+    """name → zero-argument callable over the loaded datasets `d`."""
+    acts, prods, parts = d["actuals"], d["products"], d["partners"]
+    ob, fc, npi, alerts = d["order_book"], d["forecasts"], d["npi"], d["alerts"]
+    pid = parts["partner_id"].iloc[0]
+    npi_pid = npi["product_id"].iloc[0] if len(npi) else None
+    mix = partner_analytics.partner_product_mix(acts, prods, pid)
+    kpis = partner_analytics.partner_overview(acts, alerts, pid)
+
+    return {
+        "helpers.load_all":                      lambda: helpers.load_all(),
+        "helpers.calc_channel_kpis":             lambda: helpers.calc_channel_kpis(acts, ob, alerts, prods),
+        "helpers.calc_forecast_accuracy":        lambda: helpers.calc_forecast_accuracy(acts, fc),
+        "alert_engine.detect_demand_anomalies":  lambda: alert_engine.detect_demand_anomalies(acts, prods, parts),
+        "alert_engine.build_risk_matrix":        lambda: alert_engine.build_risk_matrix(acts, prods, parts),
+        "alert_engine.get_alert_kpis":           lambda: alert_engine.get_alert_kpis(alerts),
+        "order_book.order_book_health":          lambda: order_book_analysis.order_book_health(ob),
+        "order_book.get_chase_opportunities":    lambda: order_book_analysis.get_chase_opportunities(ob, prods, parts, 20),
+        "order_book.shipment_plan_validation":   lambda: order_book_analysis.shipment_plan_validation(ob, fc, prods),
+        "order_book.instock_ranging_analysis":   lambda: order_book_analysis.instock_ranging_analysis(acts, prods, parts),
+        "order_book.OrderBookAnalytics":         lambda: order_book_analysis.OrderBookAnalytics(ob, prods, parts),
+        "chase_engine.ChaseEngine.score":        lambda: chase_engine.ChaseEngine(acts, prods, parts).score(ob),
+        "npi_tracker.npi_launch_kpis":           lambda: npi_tracker.npi_launch_kpis(npi, prods),
+        "npi_tracker.partner_npi_scorecard":     lambda: npi_tracker.partner_npi_scorecard(npi, parts, npi_pid),
+        "npi_tracker.npi_waterfall_data":        lambda: npi_tracker.npi_waterfall_data(npi, parts, npi_pid),
+        "npi_tracker.NpiAnalytics":              lambda: npi_tracker.NpiAnalytics(npi, prods, parts),
+        "launch_curves.LaunchCurveStore":        lambda: launch_curves.LaunchCurveStore(acts, prods),
+        "partner.partner_overview":              lambda: partner_analytics.partner_overview(acts, alerts, pid),
+        "partner.partner_revenue_trend":         lambda: partner_analytics.partner_revenue_trend(acts, pid),
+        "partner.partner_product_mix":           lambda: partner_analytics.partner_product_mix(acts, prods, pid),
+        "partner.generate_partner_insights":     lambda: partner_analytics.generate_partner_insights(pid, kpis, mix),
+        "forecast_accuracy.align_forecasts":     lambda: forecast_accuracy.align_forecasts(acts, fc),
+        "tracking_signal.from_history":          lambda: tracking_signal.TrackingSignalMonitor.from_history(acts, fc),
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    """Median / min wall time over `repeat` runs, then one traced run for peak memory."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"median_s": float(np.median(times)), "min_s": float(min(times)), "peak_mb": peak / 1e6}
+
+
+def run_scale(scale: int, repeat: int, only: str = None, data_dir: str = DATA_DIR) -> dict:
+    helpers.RAW_DIR = ensure_dataset(scale, data_dir)
+    d = helpers.load_all()
+    results = {"rows": {k: len(v) for k, v in d.items()}, "cases": {}}
+    for name, fn in build_cases(d).items():
+        if only and only not in name:
+            continue
+        results["cases"][name] = measure(fn, repeat)
+        r = results["cases"][name]
+        print(f"  {scale:>4}×  {name:42s} {r['median_s'] * 1000:10.1f} ms  {r['peak_mb']:9.1f} MB")
+    return results
+
+
+# ─── Reporting ────────────────────────────────────────────────────────────────
+def scaling_table(results: dict) -> pd.DataFrame:
+    """Median time per case and scale, plus the fitted exponent of time vs actuals rows."""
+    rows = {int(s): r["rows"]["actuals"] for s, r in results.items()}
+    times = pd.DataFrame({int(s): {c: m["median_s"] for c, m in r["cases"].items()}
+                          for s, r in results.items()}).sort_index(axis=1)
+    if times.shape[1] >= 2:
+        x = np.log([rows[s] for s in times.columns])
+        y = np.log(times.clip(lower=1e-6).to_numpy())
+        times["exponent"] = np.polyfit(x, y.T, 1)[0].round(2)
+    return times
+
+
+def compare(results: dict, baseline: dict, ratio: float = REGRESSION_RATIO) -> list:
+    """Cases slower (beyond the noise floor) or heavier than baseline by more than `ratio`."""
+    flags = []
+    for scale, res in results.items():
+        base = baseline.get("results", {}).get(str(scale), {}).get("cases", {})
+        for name, cur in res["cases"].items():
+            ref = base.get(name)
+            if ref is None:
+                continue
+            if cur["median_s"] > ref["median_s"] * ratio and cur["median_s"] - ref["median_s"] > NOISE_FLOOR_S:
+                flags.append((scale, name, "time", ref["median_s"], cur["median_s"]))
+            if cur["peak_mb"] > ref["peak_mb"] * ratio and cur["peak_mb"] - ref["peak_mb"] > 1.0:
+                flags.append((scale, name, "memory", ref["peak_mb"], cur["peak_mb"]))
+    return flags
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark analytics and loaders at several data scales.")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated scale factors (1 = demo dataset)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--only", default=None, help="run only cases whose name contains this")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where generated datasets are kept")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write these results as the new baseline")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO,
+                        help="slowdown / memory ratio flagged as a regression")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    results = {}
+    for scale in scales:
+        print(f"\n[{scale}×]")
+        results[str(scale)] = run_scale(scale, args.repeat, args.only, args.data_dir)
+
+    print("\nScaling (median seconds; exponent = d log time / d log actuals rows)")
+    print(scaling_table(results).to_string(float_format=lambda v: f"{v:.4f}"))
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "pandas": pd.__version__,
+                       "machine": platform.machine(), "results": results}, f, indent=2)
+        print(f"\n  Baseline written to {os.path.relpath(args.baseline)}")
+        return 0
+    if not os.path.exists(args.baseline):
+        # A baseline is machine-specific, so it is never created implicitly
+        print(f"\n⚠  No baseline at {os.path.relpath(args.baseline)} — nothing to compare with. "
+              f"Re-run with --update-baseline to record one.")
+        return 2
+
+    with open(args.baseline) as f:
+        flags = compare(results, json.load(f), args.ratio)
+    if not flags:
+        print(f"\n✓  No regressions vs {os.path.relpath(args.baseline)}")
+        return 0
+    print(f"\n⚠  {len(flags)} regression(s) vs {os.path.relpath(args.baseline)}:")
+    for scale, name, kind, ref, cur in flags:
+        unit = "s" if kind == "time" else "MB"
+        print(f"   {scale:>4}×  {name:42s} {kind:6s} {ref:.4f}{unit} → {cur:.4f}{unit} "
+              f"({cur / ref:.2f}×)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
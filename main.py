@@ -2,6 +2,26 @@ import os
 import sys
 import streamlit.web.cli as stcli
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def warm_up(mode: str) -> None:
+    """
+    Precompute the shared dataset / analytics / figure caches before traffic.
+    DEMAND_PLANNER_WARMUP: "background" (default) starts it alongside the server,
+    "sync" finishes it before the server starts, "off" skips it.
+    """
+    if mode == "off":
+        return
+    sys.path.insert(0, BASE_DIR)
+    from src.utils.warmup import warm_up as run_warm_up, start_warm_up
+
+    if mode == "sync":
+        run_warm_up()
+    else:
+        start_warm_up()
+
+
 def main():
     """
     Entry point for Railpack/deployment platforms.
@@ -9,6 +29,11 @@ def main():
     This script programmatically launches our Streamlit application.
     """
     port = os.environ.get("PORT", "8501")
+    # Store views are shallow copies under copy-on-write (see src/utils/data_store.py)
+    import pandas as pd
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+    warm_up(os.environ.get("DEMAND_PLANNER_WARMUP", "background").lower())
     sys.argv = [
         "streamlit",
         "run",
@@ -6,6 +6,54 @@ Author: Mohammed Kaif Ahmed
 import pandas as pd
 import numpy as np
 
+from src.utils.fact_table import attach_dims
+from src.utils.profiling import timed
+
+
+# Rolling baseline length and how many trailing weeks per series are flagged
+ANOMALY_WINDOW = 8
+ANOMALY_RECENT_WEEKS = 4
+
+
+def _anomaly_frame(rows: pd.DataFrame, roll_mean: np.ndarray,
+                   z_score: np.ndarray) -> pd.DataFrame:
+    """
+    Shape flagged actuals rows into the anomaly feed schema.
+    `roll_mean` / `z_score` are aligned with `rows`. Shared by the batch and
+    streaming detectors so both emit identical records and narratives.
+    """
+    if not len(rows):
+        return pd.DataFrame()
+
+    units = rows["units_sold"].to_numpy().astype("int64")
+    spike = units > roll_mean
+    pct_change = (units - roll_mean) / np.fmax(1, roll_mean) * 100
+    labels = {c: pd.Series(np.asarray(rows[c], dtype=object))
+              for c in ["product_id","partner_id","product_name","partner_name","product_family"]}
+
+    narrative = (
+        pd.Series(np.where(spike, "↑ Demand spike", "↓ Demand drop")) + ": "
+        + labels["product_name"].astype(str) + " at " + labels["partner_name"].astype(str) + " "
+        + pd.Series(np.where(spike, "exceeded", "fell")) + " 8-week average by "
+        + pd.Series(np.abs(pct_change)).map("{:.0f}".format) + "%. "
+        + "Recommend: verify with Account Manager within 48 hours."
+    )
+
+    return pd.DataFrame({
+        "date":          rows["date"].to_numpy().astype("datetime64[ns]"),
+        "product_id":    labels["product_id"],
+        "partner_id":    labels["partner_id"],
+        "product_name":  labels["product_name"],
+        "partner_name":  labels["partner_name"],
+        "product_family":labels["product_family"],
+        "units_actual":  units,
+        "units_expected":np.round(roll_mean, 0),
+        "pct_change":    np.round(pct_change, 1),
+        "anomaly_type":  np.where(spike, "spike", "drop"),
+        "z_score":       np.round(z_score, 2),
+        "narrative":     narrative,
+    }).sort_values("date", ascending=False)
+
 
 def detect_demand_anomalies(actuals: pd.DataFrame,
                              products: pd.DataFrame,
@@ -15,64 +63,58 @@ def detect_demand_anomalies(actuals: pd.DataFrame,
     """
     Detect demand anomalies using Z-score and IQR methods.
     Returns flagged rows with anomaly type, magnitude, and narrative.
+
+    All product × partner series are scored in one pass: rows are sorted by
+    series and date, the trailing 8-week baseline is gathered only for each
+    series' last 4 weeks, and IQR bounds come from a grouped quantile.
     """
-    acts = actuals.copy()
-    acts = acts.merge(products[["product_id","product_name","product_family"]], on="product_id", how="left")
-    acts = acts.merge(partners[["partner_id","partner_name"]], on="partner_id", how="left")
-
-    anomalies = []
-    for (pid, partid), group in acts.groupby(["product_id","partner_id"]):
-        group = group.sort_values("date")
-        if len(group) < 8:
-            continue
-
-        # Rolling 8-week stats
-        group["roll_mean"] = group["units_sold"].rolling(8, min_periods=4).mean().shift(1)
-        group["roll_std"]  = group["units_sold"].rolling(8, min_periods=4).std().shift(1)
-
-        # Z-score anomaly
-        group["z_score"] = (group["units_sold"] - group["roll_mean"]) / group["roll_std"].replace(0, np.nan)
-
-        # IQR anomaly
-        q1 = group["units_sold"].quantile(0.25)
-        q3 = group["units_sold"].quantile(0.75)
-        iqr = q3 - q1
-        lower_iqr = q1 - iqr_multiplier * iqr
-        upper_iqr = q3 + iqr_multiplier * iqr
-
-        # Flag last 4 weeks
-        recent = group.tail(4)
-        for _, row in recent.iterrows():
-            if abs(row.get("z_score", 0) or 0) > z_threshold or \
-               not (lower_iqr <= row["units_sold"] <= upper_iqr):
-                direction = "spike" if row["units_sold"] > row.get("roll_mean", row["units_sold"]) else "drop"
-                pct_change = (row["units_sold"] - row.get("roll_mean", row["units_sold"])) / max(1, row.get("roll_mean", 1)) * 100
-                anomalies.append({
-                    "date":          row["date"],
-                    "product_id":    pid,
-                    "partner_id":    partid,
-                    "product_name":  row.get("product_name",""),
-                    "partner_name":  row.get("partner_name",""),
-                    "product_family":row.get("product_family",""),
-                    "units_actual":  row["units_sold"],
-                    "units_expected":round(row.get("roll_mean", row["units_sold"]), 0),
-                    "pct_change":    round(pct_change, 1),
-                    "anomaly_type":  direction,
-                    "z_score":       round(row.get("z_score", 0) or 0, 2),
-                    "narrative": (
-                        f"{'↑ Demand spike' if direction == 'spike' else '↓ Demand drop'}: "
-                        f"{row.get('product_name',pid)} at {row.get('partner_name',partid)} "
-                        f"{'exceeded' if direction == 'spike' else 'fell'} 8-week average by "
-                        f"{abs(pct_change):.0f}%. "
-                        f"Recommend: verify with Account Manager within 48 hours."
-                    )
-                })
-
-    if not anomalies:
+    acts = attach_dims(actuals, products, partners,
+                       ["product_name","product_family"], ["partner_name"])
+    acts = acts.sort_values(["product_id","partner_id","date"], kind="stable")
+    if acts.empty:
+        return pd.DataFrame()
+
+    gid = acts.groupby(["product_id","partner_id"], observed=True, sort=False).ngroup().to_numpy()
+    starts = np.flatnonzero(np.r_[True, gid[1:] != gid[:-1]])
+    sizes = np.diff(np.r_[starts, len(gid)])
+    units = acts["units_sold"].to_numpy(dtype=float)
+
+    # IQR bounds over each series' full history
+    by_series = pd.Series(units).groupby(gid)
+    q1 = by_series.quantile(0.25).to_numpy()
+    q3 = by_series.quantile(0.75).to_numpy()
+    iqr = q3 - q1
+
+    # Last 4 weeks of every series with at least 8 weeks of history
+    series = np.flatnonzero(sizes >= ANOMALY_WINDOW)
+    if not len(series):
         return pd.DataFrame()
-    return pd.DataFrame(anomalies).sort_values("date", ascending=False)
+    ends = starts[series] + sizes[series]
+    rows = (ends[:, None] - ANOMALY_RECENT_WEEKS + np.arange(ANOMALY_RECENT_WEEKS)).ravel()
+    series = np.repeat(series, ANOMALY_RECENT_WEEKS)
+
+    # Rolling 8-week stats of the preceding weeks (rolling(8, min_periods=4).shift(1))
+    window = rows[:, None] - ANOMALY_WINDOW + np.arange(ANOMALY_WINDOW)
+    in_series = window >= starts[series][:, None]
+    values = np.where(in_series, units[np.clip(window, 0, None)], np.nan)
+    n = in_series.sum(axis=1)
+    roll_mean = np.nansum(values, axis=1) / n
+    roll_std = np.sqrt(np.nansum((values - roll_mean[:, None]) ** 2, axis=1) / (n - 1))
+    roll_std[n < 4] = np.nan
+
+    # Z-score anomaly
+    current = units[rows]
+    z_score = (current - roll_mean) / np.where(roll_std == 0, np.nan, roll_std)
+
+    # IQR anomaly
+    lower_iqr = q1[series] - iqr_multiplier * iqr[series]
+    upper_iqr = q3[series] + iqr_multiplier * iqr[series]
+
+    flagged = (np.abs(z_score) > z_threshold) | ~((lower_iqr <= current) & (current <= upper_iqr))
+    return _anomaly_frame(acts.iloc[rows[flagged]], roll_mean[flagged], z_score[flagged])
 
 
+@timed("analytics")
 def build_risk_matrix(actuals: pd.DataFrame,
                       products: pd.DataFrame,
                       partners: pd.DataFrame) -> pd.DataFrame:
@@ -81,11 +123,11 @@ def build_risk_matrix(actuals: pd.DataFrame,
     Likelihood based on WoS and demand trend; impact based on revenue run-rate.
     """
     recent_cutoff = actuals["date"].max() - pd.Timedelta(weeks=4)
-    recent = actuals[actuals["date"] >= recent_cutoff].copy()
-    recent = recent.merge(products[["product_id","product_name","product_family","asp"]], on="product_id", how="left")
-    recent = recent.merge(partners[["partner_id","partner_name"]], on="partner_id", how="left")
+    recent = actuals[actuals["date"] >= recent_cutoff]
+    recent = attach_dims(recent, products, partners,
+                         ["product_name","product_family","asp"], ["partner_name"])
 
-    agg = recent.groupby(["product_id","partner_id","product_name","partner_name","product_family"]).agg(
+    agg = recent.groupby(["product_id","partner_id","product_name","partner_name","product_family"], observed=True).agg(
         avg_wos=("weeks_of_supply","mean"),
         avg_in_stock=("in_stock_rate","mean"),
         avg_revenue=("revenue","mean"),
@@ -106,6 +148,7 @@ def build_risk_matrix(actuals: pd.DataFrame,
                 "product_family","likelihood","revenue_impact","label"]].dropna()
 
 
+@timed("analytics")
 def get_alert_kpis(alerts: pd.DataFrame) -> dict:
     """Compute alert dashboard KPIs."""
     open_alerts = alerts[alerts["status"] == "Open"]
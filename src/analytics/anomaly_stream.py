@@ -0,0 +1,239 @@
+"""
+Anomaly Stream — Incremental demand anomaly detection with persisted per-series state.
+Each weekly cycle ingests only the newly appended actuals rows.
+Author: Mohammed Kaif Ahmed
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+from src.utils.helpers import PROC_DIR
+from src.utils.fact_table import attach_dims
+from src.analytics.alert_engine import ANOMALY_WINDOW, _anomaly_frame
+
+STATE_PATH = os.path.join(PROC_DIR, "anomaly_state.npz")
+
+# P² markers track the two IQR quartiles over each series' full history
+QUANTILES = np.array([0.25, 0.75])
+
+
+def _p2_init(first5: np.ndarray) -> tuple:
+    """Marker heights / positions / desired positions from each series' first 5 values."""
+    m = len(first5)
+    heights = np.repeat(np.sort(first5, axis=1)[:, None, :], len(QUANTILES), axis=1)
+    pos = np.broadcast_to(np.arange(1.0, 6.0), (m, len(QUANTILES), 5)).copy()
+    p = QUANTILES[:, None]
+    desired = np.broadcast_to(
+        np.hstack([np.ones_like(p), 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5 * np.ones_like(p)]),
+        (m, len(QUANTILES), 5)).copy()
+    return heights, pos, desired
+
+
+def _p2_update(heights: np.ndarray, pos: np.ndarray, desired: np.ndarray,
+               x: np.ndarray) -> None:
+    """One P² step (Jain & Chlamtac) for m series at once; arrays are updated in place."""
+    p = QUANTILES[None, :, None]
+    incr = np.concatenate([np.zeros_like(p), p / 2, p, (1 + p) / 2, np.ones_like(p)], axis=2)
+    x = x[:, None]
+
+    cell = (x[..., None] >= heights[:, :, 1:4]).sum(axis=2)
+    heights[:, :, 0] = np.minimum(heights[:, :, 0], x)
+    heights[:, :, 4] = np.maximum(heights[:, :, 4], x)
+    pos += np.arange(5) > cell[..., None]
+    desired += incr
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in (1, 2, 3):
+            q_lo, q_i, q_hi = heights[:, :, i - 1], heights[:, :, i], heights[:, :, i + 1]
+            n_lo, n_i, n_hi = pos[:, :, i - 1], pos[:, :, i], pos[:, :, i + 1]
+            d = desired[:, :, i] - n_i
+            up = (d >= 1) & (n_hi - n_i > 1)
+            down = (d <= -1) & (n_lo - n_i < -1)
+            move = up | down
+            if not move.any():
+                continue
+            s = np.where(up, 1.0, -1.0)
+            parabolic = q_i + s / (n_hi - n_lo) * (
+                (n_i - n_lo + s) * (q_hi - q_i) / (n_hi - n_i)
+                + (n_hi - n_i - s) * (q_i - q_lo) / (n_i - n_lo))
+            linear = np.where(up, q_i + (q_hi - q_i) / (n_hi - n_i),
+                              q_i - (q_lo - q_i) / (n_lo - n_i))
+            new = np.where((q_lo < parabolic) & (parabolic < q_hi), parabolic, linear)
+            heights[:, :, i] = np.where(move, new, q_i)
+            pos[:, :, i] = n_i + np.where(move, s, 0.0)
+
+
+class StreamingAnomalyDetector:
+    """
+    Incremental version of alert_engine.detect_demand_anomalies.
+
+    Per product × partner series it keeps a ring buffer of the last 8 weeks
+    (rolling mean/std baseline), a history count, the last ingested week and
+    P² quartile markers for the IQR bounds. `update()` costs O(new rows):
+    rows already seen are skipped, each new week is scored against the state
+    as it stood before that week, then folded in.
+
+    Quartiles are exact while a series has ≤ 8 weeks (taken from the buffer)
+    and P² estimates after that, so IQR flags can differ from the batch
+    detector on values sitting right at a bound.
+    """
+
+    def __init__(self, z_threshold: float = 2.5, iqr_multiplier: float = 1.5):
+        self.z_threshold = z_threshold
+        self.iqr_multiplier = iqr_multiplier
+        self.keys = pd.MultiIndex.from_arrays([[], []], names=["product_id", "partner_id"])
+        self.ring = np.empty((0, ANOMALY_WINDOW))
+        self.count = np.empty(0, dtype=np.int64)
+        self.last_date = np.empty(0, dtype="datetime64[ns]")
+        self.heights = np.empty((0, len(QUANTILES), 5))
+        self.pos = np.empty((0, len(QUANTILES), 5))
+        self.desired = np.empty((0, len(QUANTILES), 5))
+
+    # ── Construction / persistence ───────────────────────────────────────────
+    @classmethod
+    def from_history(cls, actuals: pd.DataFrame, **kwargs) -> "StreamingAnomalyDetector":
+        """Build state by replaying historic actuals week by week (no anomalies emitted)."""
+        det = cls(**kwargs)
+        det._ingest(actuals)
+        return det
+
+    def save(self, path: str = STATE_PATH) -> None:
+        np.savez_compressed(
+            path,
+            product_id=np.asarray(self.keys.get_level_values(0), dtype=str),
+            partner_id=np.asarray(self.keys.get_level_values(1), dtype=str),
+            ring=self.ring, count=self.count, last_date=self.last_date,
+            heights=self.heights, pos=self.pos, desired=self.desired,
+            params=np.array([self.z_threshold, self.iqr_multiplier]),
+        )
+
+    @classmethod
+    def load(cls, path: str = STATE_PATH) -> "StreamingAnomalyDetector":
+        with np.load(path) as f:
+            det = cls(*f["params"])
+            det.keys = pd.MultiIndex.from_arrays([f["product_id"], f["partner_id"]],
+                                                 names=["product_id", "partner_id"])
+            det.ring, det.count, det.last_date = f["ring"], f["count"], f["last_date"]
+            det.heights, det.pos, det.desired = f["heights"], f["pos"], f["desired"]
+        return det
+
+    # ── Weekly cycle ─────────────────────────────────────────────────────────
+    def update(self, new_actuals: pd.DataFrame, products: pd.DataFrame,
+               partners: pd.DataFrame) -> pd.DataFrame:
+        """Ingest newly appended actuals and return anomalies among them (feed schema)."""
+        flagged = self._ingest(new_actuals, emit=True)
+        if not flagged:
+            return pd.DataFrame()
+        rows = pd.concat([f[0] for f in flagged])
+        rows = attach_dims(rows, products, partners,
+                           ["product_name", "product_family"], ["partner_name"])
+        return _anomaly_frame(rows, np.concatenate([f[1] for f in flagged]),
+                              np.concatenate([f[2] for f in flagged]))
+
+    def _series_index(self, batch: pd.DataFrame) -> np.ndarray:
+        """Map batch rows to state rows, growing the state for unseen series."""
+        pids = np.asarray(batch["product_id"], dtype=str)
+        rids = np.asarray(batch["partner_id"], dtype=str)
+        idx = self.keys.get_indexer(pd.MultiIndex.from_arrays([pids, rids]))
+        new = idx < 0
+        if new.any():
+            new_keys = pd.MultiIndex.from_arrays([pids[new], rids[new]]).unique()
+            m = len(new_keys)
+            self.keys = self.keys.append(new_keys)
+            self.ring = np.vstack([self.ring, np.full((m, ANOMALY_WINDOW), np.nan)])
+            self.count = np.concatenate([self.count, np.zeros(m, dtype=np.int64)])
+            self.last_date = np.concatenate([self.last_date,
+                                             np.full(m, np.datetime64("NaT"), dtype="datetime64[ns]")])
+            blank = np.full((m, len(QUANTILES), 5), np.nan)
+            self.heights = np.vstack([self.heights, blank])
+            self.pos = np.vstack([self.pos, blank])
+            self.desired = np.vstack([self.desired, blank])
+            idx = self.keys.get_indexer(pd.MultiIndex.from_arrays([pids, rids]))
+        return idx
+
+    def _ingest(self, actuals: pd.DataFrame, emit: bool = False) -> list:
+        flagged = []
+        if actuals.empty:
+            return flagged
+        actuals = actuals.sort_values("date", kind="stable")
+        dates = actuals["date"].to_numpy().astype("datetime64[ns]")
+        bounds = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1], True])
+
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            week = actuals.iloc[lo:hi]
+            idx = self._series_index(week)
+            fresh = ~(self.last_date[idx] >= dates[lo])          # NaT compares False
+            week, idx = week[fresh], idx[fresh]
+            keep = ~pd.Index(idx).duplicated(keep="last")
+            week, idx = week[keep], idx[keep]
+            if not len(idx):
+                continue
+            result = self._step(idx, week["units_sold"].to_numpy(dtype=float), dates[lo])
+            if emit and result is not None:
+                mask, roll_mean, z_score = result
+                if mask.any():
+                    flagged.append((week[mask], roll_mean[mask], z_score[mask]))
+        return flagged
+
+    def _step(self, idx: np.ndarray, x: np.ndarray, date) -> tuple:
+        """Score one week's values against the prior state, then fold them in."""
+        # Baseline from the previous ≤ 8 weeks (rolling(8, min_periods=4).shift(1))
+        window = self.ring[idx]
+        n_prev = np.minimum(self.count[idx], ANOMALY_WINDOW)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roll_mean = np.nansum(window, axis=1) / n_prev
+            roll_std = np.sqrt(np.nansum((window - roll_mean[:, None]) ** 2, axis=1) / (n_prev - 1))
+        roll_mean[n_prev < 4] = np.nan
+        roll_std[n_prev < 4] = np.nan
+
+        # Fold the new week into buffer, count and quartile markers
+        count = self.count[idx]
+        self.ring[idx, count % ANOMALY_WINDOW] = x
+        count = count + 1
+        self.count[idx] = count
+        self.last_date[idx] = date
+
+        init = count == 5
+        if init.any():
+            h, p, d = _p2_init(self.ring[idx[init], :5])
+            self.heights[idx[init]], self.pos[idx[init]], self.desired[idx[init]] = h, p, d
+        step = count > 5
+        if step.any():
+            h, p, d = self.heights[idx[step]], self.pos[idx[step]], self.desired[idx[step]]
+            _p2_update(h, p, d, x[step])
+            self.heights[idx[step]], self.pos[idx[step]], self.desired[idx[step]] = h, p, d
+
+        # Only series with a full 8 weeks of history are scored (as in batch)
+        scored = count >= ANOMALY_WINDOW
+        if not scored.any():
+            return None
+        exact = count <= ANOMALY_WINDOW
+        q = self.heights[idx][:, :, 2].copy()
+        if exact.any():
+            q[exact] = np.nanquantile(self.ring[idx[exact]], QUANTILES, axis=1).T
+        iqr = q[:, 1] - q[:, 0]
+        lower_iqr = q[:, 0] - self.iqr_multiplier * iqr
+        upper_iqr = q[:, 1] + self.iqr_multiplier * iqr
+
+        z_score = (x - roll_mean) / np.where(roll_std == 0, np.nan, roll_std)
+        mask = scored & ((np.abs(z_score) > self.z_threshold)
+                         | ~((lower_iqr <= x) & (x <= upper_iqr)))
+        return mask, roll_mean, z_score
+
+
+def update_anomaly_state(new_actuals: pd.DataFrame, products: pd.DataFrame,
+                         partners: pd.DataFrame, history: pd.DataFrame = None,
+                         path: str = STATE_PATH) -> pd.DataFrame:
+    """
+    Weekly cycle: load persisted state (or bootstrap it from `history`),
+    ingest `new_actuals`, save, and return the new anomalies.
+    """
+    if os.path.exists(path):
+        det = StreamingAnomalyDetector.load(path)
+    else:
+        det = StreamingAnomalyDetector.from_history(history if history is not None
+                                                    else new_actuals.iloc[:0])
+    anomalies = det.update(new_actuals, products, partners)
+    det.save(path)
+    return anomalies
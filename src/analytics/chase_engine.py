@@ -0,0 +1,125 @@
+"""
+Chase Engine — Chase-opportunity scoring from live sell-through and weeks of supply.
+A SKU × partner is a chase candidate when sell-through > 85% AND WoS < 3; open
+order lines are joined to those metrics through a hash index on the
+(product, partner) key and scored in one vectorized pass.
+Author: Mohammed Kaif Ahmed
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.fact_table import surrogate_keys
+
+ST_THRESHOLD = 0.85       # sell-through above which demand is outrunning supply
+WOS_THRESHOLD = 3.0       # weeks of supply below which the channel is short
+TARGET_WOS = 3.0          # chase tops the channel back up to this cover
+MAX_CHASE_SHARE = 0.40    # at most this share of a line's open units is chased
+LOOKBACK_WEEKS = 4
+OPEN_STATUSES = ["Open", "Partially Fulfilled"]
+
+
+class ChaseEngine:
+    """
+    Sell-through, weeks of supply and weekly run-rate per SKU × partner over
+    the last `weeks` of actuals, keyed by product_key * n_partners + partner_key.
+    `score()` re-scores any order book against them without touching actuals.
+    """
+
+    def __init__(self, actuals: pd.DataFrame, products: pd.DataFrame, partners: pd.DataFrame,
+                 weeks: int = LOOKBACK_WEEKS):
+        self.products = products
+        self.partners = partners
+        self.n_partners = len(partners)
+        self.asp = products["asp"].to_numpy(dtype=float)
+
+        latest = actuals["date"].max()
+        recent = actuals[actuals["date"] > latest - pd.Timedelta(weeks=weeks)]
+        keys = self._keys(recent)
+        ok = keys >= 0
+        keys = keys[ok]
+        # Dense codes per SKU × partner, then every metric is one bincount
+        codes, uniq = pd.factorize(keys)
+        n = len(uniq)
+        sold = np.bincount(codes, weights=recent["units_sold"].to_numpy(dtype=float)[ok], minlength=n)
+        shipped = np.bincount(codes, weights=recent["units_shipped"].to_numpy(dtype=float)[ok], minlength=n)
+        week_count = np.bincount(codes, minlength=n)
+
+        # Weeks of supply as of the latest week (closing position, not the average)
+        is_last = (recent["date"] == latest).to_numpy()[ok]
+        wos = np.full(n, np.nan)
+        wos[codes[is_last]] = recent["weeks_of_supply"].to_numpy(dtype=float)[ok][is_last]
+
+        self.index = pd.Index(uniq)      # hash index: SKU × partner key → metric row
+        self.metrics = pd.DataFrame({
+            "sell_through":    np.divide(sold, shipped, out=np.zeros(n), where=shipped > 0),
+            "weeks_of_supply": wos,
+            "run_rate":        sold / np.maximum(week_count, 1),
+        })
+
+    def _keys(self, df: pd.DataFrame) -> np.ndarray:
+        pkey = surrogate_keys(df["product_id"], self.products["product_id"]).astype(np.int64)
+        qkey = surrogate_keys(df["partner_id"], self.partners["partner_id"]).astype(np.int64)
+        return np.where((pkey >= 0) & (qkey >= 0), pkey * self.n_partners + qkey, -1)
+
+    def score(self, order_book: pd.DataFrame) -> pd.DataFrame:
+        """
+        Order book with chase_opportunity / chase_units_recommended /
+        chase_revenue_potential recomputed, plus the line's sell_through and
+        weeks_of_supply. Chase units cover the gap to TARGET_WOS at the current
+        run-rate, capped at MAX_CHASE_SHARE of the line's open units.
+        """
+        keys = self._keys(order_book)
+        rows = self.index.get_indexer(keys)
+        hit = (rows >= 0) & (keys >= 0)
+        rows = np.maximum(rows, 0)
+
+        st_rate = np.where(hit, self.metrics["sell_through"].to_numpy()[rows], np.nan)
+        wos = np.where(hit, self.metrics["weeks_of_supply"].to_numpy()[rows], np.nan)
+        run_rate = np.where(hit, self.metrics["run_rate"].to_numpy()[rows], 0.0)
+
+        is_open = order_book["status"].isin(OPEN_STATUSES).to_numpy()
+        chase = is_open & (st_rate > ST_THRESHOLD) & (wos < WOS_THRESHOLD)
+
+        open_units = np.maximum(order_book["units_ordered"].to_numpy(dtype=float)
+                                - order_book["units_shipped"].to_numpy(dtype=float), 0)
+        gap = run_rate * np.maximum(TARGET_WOS - np.nan_to_num(wos, nan=TARGET_WOS), 0)
+        units = np.where(chase, np.floor(np.minimum(gap, MAX_CHASE_SHARE * open_units)), 0).astype(np.int64)
+        chase &= units > 0
+
+        pkey = surrogate_keys(order_book["product_id"], self.products["product_id"])
+        price = np.where(pkey >= 0, self.asp[np.maximum(pkey, 0)], 0.0)
+
+        out = order_book.copy(deep=False)
+        out["chase_opportunity"] = chase
+        out["chase_units_recommended"] = units
+        out["chase_revenue_potential"] = np.round(units * price, 2)
+        out["sell_through"] = np.round(st_rate, 4)
+        out["weeks_of_supply"] = np.round(wos, 2)
+        return out
+
+
+def load_chase_engine(store=None) -> ChaseEngine:
+    """Chase engine over the latest actuals, built once per data version."""
+    from src.utils.data_store import get_store
+
+    store = store or get_store()
+
+    def build(*_):
+        return ChaseEngine(store.get("actuals", ["date", "product_id", "partner_id", "units_sold",
+                                                 "units_shipped", "weeks_of_supply"]),
+                           store.get("products"), store.get("partners"))
+
+    return store.derived("chase_engine", ("actuals", "products", "partners"), build)
+
+
+def load_scored_order_book(store=None) -> pd.DataFrame:
+    """Order book re-scored by the chase engine, once per data version."""
+    from src.utils.data_store import get_store
+
+    store = store or get_store()
+
+    def build(order_book, *_):
+        return load_chase_engine(store).score(order_book)
+
+    return store.derived("scored_order_book", ("order_book", "actuals", "products", "partners"), build)
@@ -0,0 +1,117 @@
+"""
+Forecast Accuracy — Batched MAPE / WMAPE / bias / tracking signal for every
+model × product family × partner from one pre-aligned actual-vs-forecast frame.
+Author: Mohammed Kaif Ahmed
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.fact_table import attach_dims
+from src.utils.profiling import timed
+
+# Finest grain of the accuracy cube; any coarser view is a re-sum of it
+CUBE_DIMS = ["forecast_model", "product_family", "partner_id"]
+
+
+def align_forecasts(actuals: pd.DataFrame, forecasts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pair every forecast row (all models) with the actual for the same
+    week × product × partner. One hash lookup replaces a merge per model.
+    """
+    cell = ["date", "product_id", "partner_id"]
+    a_index = pd.MultiIndex.from_arrays([actuals[c] for c in cell])
+    pos = a_index.get_indexer(pd.MultiIndex.from_arrays([forecasts[c] for c in cell]))
+    hit = pos >= 0
+    aligned = forecasts.loc[hit, cell + ["forecast_model", "forecast_units"]].copy()
+    aligned["actual_units"] = actuals["units_sold"].to_numpy()[pos[hit]]
+    return aligned
+
+
+def accuracy_cube(aligned: pd.DataFrame, products: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Additive error sums per model × family × partner in one grouped pass.
+    Sums (not ratios) are stored so any roll-up stays exact. Without
+    `products` the family level is dropped.
+    """
+    if products is not None:
+        enriched = attach_dims(aligned, products, product_cols=["product_family"])
+    else:
+        enriched = aligned
+    dims = [d for d in CUBE_DIMS if d in enriched.columns]
+    actual = enriched["actual_units"].to_numpy(dtype=float)
+    err = enriched["forecast_units"].to_numpy(dtype=float) - actual
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(actual > 0, np.abs(err) / actual, np.nan)
+
+    frame = pd.DataFrame({
+        **{c: enriched[c] for c in dims},
+        "abs_err": np.abs(err), "err": err, "actual": actual, "ape": ape,
+    })
+    return frame.groupby(dims, observed=True).agg(
+        n=("actual", "size"), abs_err=("abs_err", "sum"), err=("err", "sum"),
+        actual=("actual", "sum"), ape=("ape", "sum"), n_ape=("ape", "count"),
+    ).reset_index()
+
+
+@timed("analytics")
+def summarize_accuracy(cube: pd.DataFrame, by: list = ("forecast_model",),
+                       **filters) -> pd.DataFrame:
+    """
+    Roll the cube up to `by` (optionally filtered, e.g. product_family="iPhone")
+    and derive MAPE / WMAPE / bias / accuracy (%) and tracking signal.
+    """
+    for col, value in filters.items():
+        if value is not None:
+            cube = cube[cube[col] == value]
+    g = cube.groupby(list(by), observed=True)[["n", "abs_err", "err", "actual", "ape", "n_ape"]].sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = pd.DataFrame({
+            "mape":  g["ape"] / g["n_ape"] * 100,
+            "wmape": g["abs_err"] / g["actual"] * 100,
+            "bias":  g["err"] / g["actual"] * 100,
+            "tracking_signal": g["err"] / (g["abs_err"] / g["n"]),
+            "n":     g["n"],
+        })
+    out["accuracy"] = 100 - out["wmape"]
+    return out.reset_index()
+
+
+@timed("analytics")
+def accuracy_metrics(cube: pd.DataFrame, model: str = "Ensemble", **filters) -> dict:
+    """
+    Headline metrics for one model (and optional family / partner filter).
+    None when the slice has no aligned rows or no actual demand to measure against.
+    """
+    summary = summarize_accuracy(cube, ["forecast_model"], forecast_model=model, **filters)
+    if summary.empty or not np.isfinite(summary["wmape"].iloc[0]):
+        return None
+    row = summary.iloc[0]
+    return {"mape": round(row["mape"], 2), "wmape": round(row["wmape"], 2),
+            "bias": round(row["bias"], 2), "accuracy": round(row["accuracy"], 1),
+            "tracking_signal": round(row["tracking_signal"], 2)}
+
+
+def load_accuracy_cube(store=None):
+    """
+    Accuracy cube for the dashboard, built once per data version.
+    Uses forecasts that overlap actuals; when the forecast file is purely
+    forward-looking, falls back to the stored backtest forecasts. None when
+    neither source has overlapping weeks.
+    """
+    from src.utils.data_store import get_store
+    from src.forecasting.backtest import load_backtest_table, backtest_version
+
+    store = store or get_store()
+
+    def build(actuals, forecasts, products):
+        aligned = align_forecasts(actuals, forecasts)
+        if aligned.empty:
+            bt = load_backtest_table("backtest_forecasts")
+            if bt is None or bt.empty:
+                return None
+            aligned = bt
+        return accuracy_cube(aligned, products)
+
+    return store.derived("accuracy_cube", ("actuals", "forecasts", "products"), build,
+                         token=backtest_version("backtest_forecasts"))
@@ -0,0 +1,118 @@
+"""
+Launch Curves — Historical launch velocity indexed by family and week since launch.
+Every launch cohort (family × category × launch date) observed in the weekly
+actuals gets a normalized cumulative velocity curve, so an NPI's prior-generation
+comparison is a lookup rather than a simulation.
+Author: Mohammed Kaif Ahmed
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.profiling import timed
+
+HORIZON = 12          # weeks tracked after launch (as in the NPI tracker)
+MIN_GAP_DAYS = 180    # a prior generation launched at least ~6 months earlier
+
+
+class LaunchCurveStore:
+    """
+    Cumulative launch velocity per cohort, normalized to launch-week units:
+    curve[w-1] = units sold in weeks 1..w / units sold in week 1.
+    Cohorts are indexed by family; each product maps to its prior-generation cohort.
+    """
+
+    def __init__(self, actuals: pd.DataFrame, products: pd.DataFrame, horizon: int = HORIZON):
+        self.horizon = horizon
+        dims = products[["product_id", "product_family", "product_category", "launch_date"]].copy()
+        dims["product_id"] = dims["product_id"].astype(str)
+        dims["launch_date"] = pd.to_datetime(dims["launch_date"]).dt.normalize()
+
+        # Network units per product × week, then week since launch (week 1 = launch week)
+        weekly = (actuals.groupby(["product_id", "date"], observed=True)["units_sold"].sum()
+                  .reset_index())
+        weekly["product_id"] = weekly["product_id"].astype(str)
+        weekly = weekly.merge(dims, on="product_id", how="inner")
+        days = (weekly["date"] - weekly["launch_date"]).dt.days.to_numpy()
+        weekly["week"] = np.floor_divide(days + 6, 7) + 1
+        first_week, last_week = weekly["date"].min(), weekly["date"].max()
+
+        # Only launches observed from week 1 through the full horizon
+        cohort_cols = ["product_family", "product_category", "launch_date"]
+        cohorts = dims.drop_duplicates(cohort_cols)[cohort_cols]
+        seen = ((cohorts["launch_date"] >= first_week - pd.Timedelta(days=6)) &
+                (cohorts["launch_date"] + pd.Timedelta(weeks=horizon - 1) <= last_week))
+        cohorts = cohorts[seen].sort_values("launch_date").reset_index(drop=True)
+
+        window = weekly[(weekly["week"] >= 1) & (weekly["week"] <= horizon)]
+        grid = window.pivot_table(index=cohort_cols, columns="week", values="units_sold",
+                                  aggfunc="sum", observed=True)
+        grid = grid.reindex(columns=range(1, horizon + 1), fill_value=0).fillna(0)
+        grid = grid.reindex(pd.MultiIndex.from_frame(cohorts)).fillna(0)
+        units = grid.to_numpy(dtype=float)
+        keep = units[:, 0] > 0 if len(units) else np.zeros(0, dtype=bool)
+        self.cohorts = cohorts[keep].reset_index(drop=True)
+        self.cohorts["label"] = (self.cohorts["product_category"] + " · "
+                                 + self.cohorts["launch_date"].dt.strftime("%b %Y") + " launch")
+        self.curves = np.cumsum(units[keep], axis=1) / units[keep, :1]
+
+        # family → cohort rows, and the family-average curve
+        self.by_family = {fam: rows for fam, rows in
+                          self.cohorts.groupby("product_family").indices.items()}
+        self.family_curves = {fam: self.curves[rows].mean(axis=0) for fam, rows in self.by_family.items()}
+
+        # product → most recent earlier cohort in its family (same category preferred)
+        self.prior = {}
+        for row in dims.itertuples(index=False):
+            rows = self.by_family.get(row.product_family)
+            if rows is None:
+                continue
+            cands = self.cohorts.iloc[rows]
+            cands = cands[cands["launch_date"] <= row.launch_date - pd.Timedelta(days=MIN_GAP_DAYS)]
+            same = cands[cands["product_category"] == row.product_category]
+            cands = same if not same.empty else cands
+            if not cands.empty:
+                self.prior[row.product_id] = cands.index[-1]
+
+    def curve(self, family: str = None, cohort: int = None) -> np.ndarray:
+        """Normalized cumulative curve of one cohort, or the family average."""
+        if cohort is not None:
+            return self.curves[cohort]
+        return self.family_curves.get(family)
+
+    def prior_generation(self, product_id: str) -> dict:
+        """Prior-generation cohort of a product: {label, curve}, or None."""
+        cohort = self.prior.get(str(product_id))
+        if cohort is None:
+            return None
+        return {"label": self.cohorts.at[cohort, "label"], "curve": self.curves[cohort]}
+
+    @timed("analytics")
+    def comparison(self, product_id: str, current: pd.DataFrame) -> tuple:
+        """
+        Prior-generation weekly units on the current launch's scale: the prior
+        curve's velocity applied to this launch's week-1 plan. Returns
+        (frame with week_number / units_actual, label) or (empty frame, None).
+        """
+        prior = self.prior_generation(product_id)
+        if prior is None or current.empty:
+            return pd.DataFrame(columns=["week_number", "units_actual"]), None
+        weeks = current["week_number"].to_numpy(dtype=int)
+        weeks = weeks[(weeks >= 1) & (weeks <= self.horizon)]
+        velocity = np.diff(np.r_[0.0, prior["curve"]])
+        base = float(current.loc[current["week_number"] == current["week_number"].min(),
+                                 "units_planned"].sum())
+        return pd.DataFrame({"week_number": weeks,
+                             "units_actual": np.round(base * velocity[weeks - 1]).astype(int)}), prior["label"]
+
+
+def load_launch_curves(store=None) -> LaunchCurveStore:
+    """Launch-curve store for the dashboard, built once per data version."""
+    from src.utils.data_store import get_store
+
+    store = store or get_store()
+
+    def build(actuals, products):
+        return LaunchCurveStore(actuals[["date", "product_id", "units_sold"]], products)
+
+    return store.derived("launch_curves", ("actuals", "products"), build)
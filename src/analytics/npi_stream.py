@@ -0,0 +1,211 @@
+"""
+NPI Stream — Incremental ingestion of weekly / intra-week NPI launch rows.
+New sell-in and sell-through figures are upserted into a persisted NPI state;
+velocity, sell-through and RAG are recomputed only for the touched rows, and
+the NPI analytics layer refreshes only the affected products.
+Author: Mohammed Kaif Ahmed
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from src.utils.helpers import PROC_DIR
+from src.utils.storage import parquet_available, read_dataset, resolve_dataset, write_dataset
+
+STATE_NAME = "npi_state"
+KEY = ["product_id", "partner_id", "week_number"]
+NPI_COLUMNS = ["week_number", "product_id", "partner_id", "units_planned", "units_actual",
+               "velocity_vs_plan", "sell_through_rate", "risk_flag", "risk_reason"]
+
+# RAG thresholds on velocity vs plan (as in the data generator)
+GREEN_AT = 0.90
+AMBER_AT = 0.70
+
+
+def npi_rag(velocity: np.ndarray) -> tuple:
+    """Vectorized RAG flag and reason for velocity-vs-plan values."""
+    velocity = np.asarray(velocity, dtype=float)
+    flag = np.select([velocity >= GREEN_AT, velocity >= AMBER_AT], ["Green", "Amber"], "Red")
+    below = np.round((1 - velocity) * 100).astype(int)
+    amber = pd.Series(below).map("Tracking {}% below launch plan — monitor closely".format).to_numpy()
+    reason = np.select([flag == "Green", flag == "Amber"], [None, amber],
+                       "Significantly below plan — escalate to Account Manager")
+    return flag, reason
+
+
+def derive_npi_metrics(rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    velocity_vs_plan, sell_through_rate and RAG for incoming rows.
+    Sell-through comes from `units_sold_through` (share of sell-in) when given,
+    otherwise from a supplied `sell_through_rate`.
+    """
+    out = rows.copy()
+    planned = out["units_planned"].to_numpy(dtype=float)
+    actual = out["units_actual"].to_numpy(dtype=float)
+    out["velocity_vs_plan"] = np.round(actual / np.maximum(1, planned), 4)
+    if "units_sold_through" in out:
+        st = out.pop("units_sold_through").to_numpy(dtype=float) / np.maximum(1, actual)
+        out["sell_through_rate"] = np.round(np.clip(st, 0, 1), 4)
+    elif "sell_through_rate" not in out:
+        out["sell_through_rate"] = np.nan
+    out["risk_flag"], out["risk_reason"] = npi_rag(out["velocity_vs_plan"])
+    return out[NPI_COLUMNS]
+
+
+class NpiState:
+    """
+    NPI tracker rows with a (product, partner, week) → row lookup.
+    `ingest()` upserts rows in place (intra-week updates overwrite the week)
+    and returns the products it touched.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame[NPI_COLUMNS].reset_index(drop=True)
+        for col in ("product_id", "partner_id", "risk_flag"):
+            frame[col] = frame[col].astype(object)
+        frame["risk_reason"] = frame["risk_reason"].astype(object)
+        self.frame = frame
+        self._rebuild_lookup()
+
+    def _rebuild_lookup(self) -> None:
+        keys = zip(self.frame["product_id"], self.frame["partner_id"],
+                   self.frame["week_number"].astype(int))
+        self.positions = {k: i for i, k in enumerate(keys)}
+        codes, uniques = pd.factorize(self.frame["product_id"])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.r_[0, np.cumsum(np.bincount(codes, minlength=len(uniques)))]
+        self.product_rows = {pid: order[bounds[i]:bounds[i + 1]] for i, pid in enumerate(uniques)}
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    @classmethod
+    def load(cls, folder: str = PROC_DIR) -> "NpiState":
+        return cls(read_dataset(STATE_NAME, folder))
+
+    def save(self, folder: str = PROC_DIR) -> None:
+        os.makedirs(folder, exist_ok=True)
+        write_dataset(self.frame, STATE_NAME, folder,
+                      formats=("parquet",) if parquet_available() else ("csv",))
+
+    # ── Ingestion ────────────────────────────────────────────────────────────
+    def ingest(self, rows: pd.DataFrame) -> list:
+        """Upsert new week-N rows; metrics and RAG are derived for these rows only."""
+        if rows.empty:
+            return []
+        rows = rows.copy()
+        rows["product_id"] = rows["product_id"].astype(str)
+        rows["partner_id"] = rows["partner_id"].astype(str)
+        rows["week_number"] = rows["week_number"].astype(int)
+        rows = rows.drop_duplicates(KEY, keep="last").reset_index(drop=True)
+
+        pos = np.array([self.positions.get(k, -1) for k in
+                        zip(rows["product_id"], rows["partner_id"], rows["week_number"])])
+        hit = pos >= 0
+        # Intra-week updates may omit the plan / sell-through already on record
+        for col in ("units_planned", "sell_through_rate"):
+            if col not in rows:
+                rows[col] = np.nan
+            known = self.frame[col].to_numpy()[np.maximum(pos, 0)]
+            rows[col] = np.where(hit & rows[col].isna().to_numpy(), known, rows[col])
+        if rows.loc[~hit, "units_planned"].isna().any():
+            raise ValueError("New NPI rows need units_planned")
+        rows = derive_npi_metrics(rows)
+
+        dtypes = self.frame.dtypes
+        if hit.any():
+            # A row whose RAG flag holds keeps its reason (e.g. a partner-specific note)
+            known = self.frame["risk_flag"].to_numpy()[np.maximum(pos, 0)]
+            same = hit & (rows["risk_flag"].to_numpy() == known)
+            rows.loc[same, "risk_reason"] = self.frame["risk_reason"].to_numpy()[pos[same]]
+            for col in NPI_COLUMNS:
+                values = self.frame[col].to_numpy(copy=True)
+                values[pos[hit]] = rows.loc[hit, col].to_numpy()
+                self.frame[col] = values
+        if (~hit).any():
+            # All-NA columns (no sell-through, all-Green reasons) are left to the concat to fill
+            self.frame = pd.concat([self.frame, rows[~hit].dropna(axis=1, how="all")], ignore_index=True)
+            self._rebuild_lookup()
+        for col, dtype in dtypes.items():
+            if pd.api.types.is_integer_dtype(dtype) and self.frame[col].dtype != dtype:
+                self.frame[col] = self.frame[col].astype(dtype)
+        return sorted(rows["product_id"].unique())
+
+    def rows_for(self, product_ids) -> pd.DataFrame:
+        """State rows of the given products (positional gather, no scan)."""
+        pos = [self.product_rows[p] for p in product_ids if p in self.product_rows]
+        return self.frame.iloc[np.concatenate(pos) if pos else []]
+
+
+# ─── Dashboard access ─────────────────────────────────────────────────────────
+def state_version(folder: str = PROC_DIR):
+    """(path, mtime) of the persisted NPI state, or None when none exists."""
+    try:
+        path = resolve_dataset(STATE_NAME, folder)
+    except FileNotFoundError:
+        return None
+    return (path, os.stat(path).st_mtime_ns)
+
+
+def load_npi_state(store=None, folder: str = PROC_DIR) -> NpiState:
+    """
+    Live NPI state: the persisted state when it is newer than the generated
+    tracker file, otherwise seeded from the tracker dataset.
+    """
+    from src.utils.data_store import get_store
+
+    store = store or get_store()
+    sig = state_version(folder)
+
+    def build(npi):
+        tracker_mtime = store.version("npi")[0][0]
+        if sig is not None and sig[1] >= tracker_mtime:
+            return NpiState.load(folder)
+        return NpiState(npi)
+
+    return store.derived("npi_state", ("npi",), build, token=sig)
+
+
+def ingest_npi_updates(rows: pd.DataFrame, store=None, folder: str = PROC_DIR) -> list:
+    """
+    Ingest new NPI rows into the live state, persist it, and refresh the
+    NPI analytics layer for the touched products only. Returns those products.
+    """
+    from src.utils.data_store import get_store
+    from src.analytics.npi_tracker import load_npi_analytics
+
+    store = store or get_store()
+    state = load_npi_state(store, folder)
+    analytics = load_npi_analytics(store, folder)
+    touched = state.ingest(rows)
+    if not touched:
+        return touched
+    state.save(folder)
+
+    analytics.refresh(state.frame, state.rows_for(touched), touched)
+    token = state_version(folder)
+    store.replace_derived("npi_state", ("npi",), state, token)
+    store.replace_derived("npi_analytics", ("npi", "products", "partners"), analytics, token)
+    return touched
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest weekly / intra-week NPI launch rows.")
+    parser.add_argument("file", help="CSV with week_number, product_id, partner_id, units_actual "
+                                     "[, units_planned, units_sold_through | sell_through_rate]")
+    parser.add_argument("--state-dir", default=PROC_DIR, help="Where the NPI state is kept")
+    args = parser.parse_args(argv)
+
+    rows = pd.read_csv(args.file)
+    touched = ingest_npi_updates(rows, folder=args.state_dir)
+    print(f"  ✓ {len(rows):,} NPI rows ingested — {len(touched)} product(s) refreshed")
+
+
+if __name__ == "__main__":
+    main()
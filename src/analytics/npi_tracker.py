@@ -6,6 +6,8 @@ Author: Mohammed Kaif Ahmed
 import pandas as pd
 import numpy as np
 
+from src.utils.profiling import timed
+
 
 def npi_launch_kpis(npi_df: pd.DataFrame, products: pd.DataFrame) -> dict:
     """Summary KPIs for the NPI tracker page."""
@@ -25,6 +27,23 @@ def npi_launch_kpis(npi_df: pd.DataFrame, products: pd.DataFrame) -> dict:
     }
 
 
+SCORECARD_COLUMNS = ["partner_name", "partner_tier", "country", "week_number", "units_planned",
+                     "units_actual", "velocity_pct", "st_pct", "risk_flag", "risk_reason"]
+
+
+def latest_npi_rows(npi_df: pd.DataFrame) -> pd.DataFrame:
+    """Latest tracked week per product × partner, for every NPI product in one sort-and-dedupe."""
+    ordered = npi_df.sort_values(["product_id", "partner_id", "week_number"], kind="stable")
+    return ordered.drop_duplicates(["product_id", "partner_id"], keep="last")
+
+
+def _scorecard(latest: pd.DataFrame, partners: pd.DataFrame) -> pd.DataFrame:
+    out = latest.merge(partners[["partner_id","partner_name","partner_tier","country"]], on="partner_id", how="left")
+    out["velocity_pct"] = (out["velocity_vs_plan"] * 100).round(1)
+    out["st_pct"] = (out["sell_through_rate"] * 100).round(1)
+    return out
+
+
 def partner_npi_scorecard(npi_df: pd.DataFrame,
                            partners: pd.DataFrame,
                            product_id: str) -> pd.DataFrame:
@@ -32,20 +51,9 @@ def partner_npi_scorecard(npi_df: pd.DataFrame,
     Returns per-partner NPI scorecard for a given product.
     Latest week per partner, with velocity, sell-through, and RAG.
     """
-    filt = npi_df[npi_df["product_id"] == product_id].copy()
-    latest = filt.groupby("partner_id").apply(
-        lambda g: g.nlargest(1, "week_number")
-    ).reset_index(drop=True)
-
-    latest = latest.merge(partners[["partner_id","partner_name","partner_tier","country"]], on="partner_id", how="left")
-
-    latest["velocity_pct"] = (latest["velocity_vs_plan"] * 100).round(1)
-    latest["st_pct"] = (latest["sell_through_rate"] * 100).round(1)
-
-    return latest[[
-        "partner_name","partner_tier","country","week_number",
-        "units_planned","units_actual","velocity_pct","st_pct","risk_flag","risk_reason"
-    ]].sort_values("velocity_pct", ascending=False).reset_index(drop=True)
+    latest = latest_npi_rows(npi_df[npi_df["product_id"] == product_id])
+    latest = _scorecard(latest.reset_index(drop=True), partners)
+    return latest[SCORECARD_COLUMNS].sort_values("velocity_pct", ascending=False).reset_index(drop=True)
 
 
 def npi_waterfall_data(npi_df: pd.DataFrame, partners: pd.DataFrame,
@@ -63,3 +71,82 @@ def npi_waterfall_data(npi_df: pd.DataFrame, partners: pd.DataFrame,
     summary["variance"] = summary["actual"] - summary["plan"]
 
     return summary.sort_values("variance")
+
+
+# ─── NPI analytics layer ──────────────────────────────────────────────────────
+class NpiAnalytics:
+    """
+    Scorecard, waterfall, weekly velocity and KPIs for every NPI product,
+    computed in one pass over the tracker; per-product views are sliced from
+    those tables and memoised. `refresh()` recomputes only updated products.
+    """
+
+    def __init__(self, npi_df: pd.DataFrame, products: pd.DataFrame, partners: pd.DataFrame):
+        self.products = products
+        self.partners = partners
+        self._kpis = npi_launch_kpis(npi_df, products)
+        self._cache = {}
+        self.latest, self.waterfalls, self.weekly_all = self._tables(npi_df)
+
+    def _tables(self, npi_df: pd.DataFrame) -> tuple:
+        latest = _scorecard(latest_npi_rows(npi_df).reset_index(drop=True), self.partners)
+
+        names = self.partners[["partner_id", "partner_name"]]
+        waterfalls = npi_df.merge(names, on="partner_id", how="left").groupby(
+            ["product_id", "partner_name"], observed=True, sort=True).agg(
+            plan=("units_planned","sum"), actual=("units_actual","sum")).reset_index()
+        waterfalls["variance"] = waterfalls["actual"] - waterfalls["plan"]
+
+        weekly_all = npi_df.groupby(["product_id", "week_number"], observed=True, sort=True).agg(
+            units_planned=("units_planned","sum"), units_actual=("units_actual","sum"),
+            velocity=("velocity_vs_plan","sum"), rows=("velocity_vs_plan","count")).reset_index()
+        return latest, waterfalls, weekly_all
+
+    def refresh(self, npi_df: pd.DataFrame, product_rows: pd.DataFrame, product_ids) -> None:
+        """Swap in recomputed tables for `product_ids` (their rows in `product_rows`)."""
+        tables = self._tables(product_rows)
+        self.latest, self.waterfalls, self.weekly_all = (
+            pd.concat([old[~old["product_id"].isin(product_ids)], new], ignore_index=True)
+            for old, new in zip((self.latest, self.waterfalls, self.weekly_all), tables))
+        self._kpis = npi_launch_kpis(npi_df, self.products)
+        for pid in product_ids:
+            self._cache.pop(pid, None)
+
+    def kpis(self) -> dict:
+        return self._kpis
+
+    @timed("analytics")
+    def product(self, product_id: str) -> dict:
+        """Scorecard / waterfall / weekly curve / mean velocity for one product (memoised)."""
+        if product_id not in self._cache:
+            sc = self.latest[self.latest["product_id"] == product_id]
+            wf = self.waterfalls[self.waterfalls["product_id"] == product_id]
+            wk = self.weekly_all[self.weekly_all["product_id"] == product_id].sort_values("week_number")
+            self._cache[product_id] = {
+                "scorecard": sc[SCORECARD_COLUMNS].sort_values("velocity_pct", ascending=False)
+                                                  .reset_index(drop=True),
+                "waterfall": wf[["partner_name", "plan", "actual", "variance"]]
+                             .reset_index(drop=True).sort_values("variance"),
+                "weekly":    wk[["week_number", "units_planned", "units_actual"]].reset_index(drop=True),
+                "velocity":  wk["velocity"].sum() / max(1, wk["rows"].sum()) * 100,
+            }
+        return self._cache[product_id]
+
+
+def load_npi_analytics(store=None, state_dir: str = None) -> NpiAnalytics:
+    """
+    NPI analytics layer for the dashboard, built once per data version from
+    the live NPI state (src/analytics/npi_stream.py) when one is persisted.
+    """
+    from src.utils.data_store import get_store
+    from src.analytics.npi_stream import load_npi_state, state_version
+    from src.utils.helpers import PROC_DIR
+
+    store = store or get_store()
+    state_dir = state_dir or PROC_DIR
+
+    def build(npi, products, partners):
+        return NpiAnalytics(load_npi_state(store, state_dir).frame, products, partners)
+
+    return store.derived("npi_analytics", ("npi", "products", "partners"), build,
+                         token=state_version(state_dir))
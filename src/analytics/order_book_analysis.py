@@ -7,28 +7,134 @@ Author: Mohammed Kaif Ahmed
 import pandas as pd
 import numpy as np
 
+from src.utils.fact_table import attach_dims, surrogate_keys, take_dims
+from src.utils.profiling import timed
 
-def order_book_health(order_book: pd.DataFrame) -> dict:
-    """Compute order book health KPIs."""
-    total_open_value = order_book[order_book["status"] != "Shipped"]["units_confirmed"].sum()
-    total_orders = len(order_book)
-    at_risk = len(order_book[order_book["status"] == "At Risk"])
-    at_risk_pct = at_risk / total_orders * 100
+STATUSES = ["Open", "Partially Fulfilled", "At Risk", "Shipped"]
+OPEN_STATUSES = ["Open", "Partially Fulfilled"]
+CHASE_COLUMNS = ["partner_name", "product_name", "product_family",
+                 "chase_units_recommended", "chase_revenue_potential",
+                 "status", "priority", "partner_tier"]
+
+
+class OrderBookAnalytics:
+    """
+    Order book with status encoded once as category codes. Status counts and
+    per-status unit sums come from one bincount each; chase lines are ranked
+    with argpartition, so only the top N are ever sorted or joined to dimensions.
+    """
+
+    def __init__(self, order_book: pd.DataFrame, products: pd.DataFrame, partners: pd.DataFrame):
+        self.order_book = order_book
+        self.products = products
+        self.partners = partners
+
+        status = order_book["status"]
+        if not isinstance(status.dtype, pd.CategoricalDtype):
+            status = status.astype("category")
+        labels = status.cat.categories.astype(str)
+        self.statuses = STATUSES + sorted(set(labels) - set(STATUSES))
+        # Recode the column's own categories onto the fixed status order (no per-row strings)
+        recode = np.append(pd.Index(self.statuses).get_indexer(labels), -1)
+        self.codes = recode[status.cat.codes.to_numpy()]
+        n, known = len(self.statuses), self.codes >= 0
+        self.counts = np.bincount(self.codes[known], minlength=n)
+        self.units = {col: np.bincount(self.codes[known], minlength=n,
+                                       weights=order_book[col].to_numpy(dtype=float)[known])
+                      for col in ("units_ordered", "units_confirmed", "units_shipped")}
+        self.totals = {col: order_book[col].sum() for col in self.units}
+
+        chase = order_book["chase_opportunity"].to_numpy(dtype=bool)
+        self.chase_rows = np.flatnonzero(chase)
+        self.chase_revenue = order_book["chase_revenue_potential"].to_numpy(dtype=float)[self.chase_rows]
+        self._health = self._kpis()
+        self._top = {}
+
+    def _code(self, status: str) -> int:
+        return self.statuses.index(status)
+
+    def mask(self, *statuses: str) -> np.ndarray:
+        """Boolean row mask for the given statuses."""
+        return np.isin(self.codes, [self._code(s) for s in statuses])
+
+    def count(self, *statuses: str) -> int:
+        return int(sum(self.counts[self._code(s)] for s in statuses))
+
+    def _kpis(self) -> dict:
+        total_orders = len(self.order_book)
+        shipped, partial = self._code("Shipped"), self._code("Partially Fulfilled")
+        at_risk_pct = self.counts[self._code("At Risk")] / total_orders * 100 if total_orders else 0
+        fulfil_numerator = self.units["units_shipped"][shipped] + self.units["units_shipped"][partial]
+        fulfil_denominator = self.totals["units_ordered"]
+        fulfil_rate = fulfil_numerator / fulfil_denominator * 100 if fulfil_denominator > 0 else 0
+        return {
+            "total_orders":     total_orders,
+            "at_risk_pct":      round(at_risk_pct, 1),
+            "fulfilment_rate":  round(fulfil_rate, 1),
+            "chase_value":      self.chase_revenue.sum(),
+            "open_units":       self.totals["units_confirmed"] - self.units["units_confirmed"][shipped],
+            "open_lines":       self.count(*OPEN_STATUSES),
+            "at_risk_lines":    self.count("At Risk"),
+        }
+
+    def health(self) -> dict:
+        return self._health
+
+    def status_counts(self) -> pd.DataFrame:
+        """status / count, most frequent first (statuses with no lines omitted)."""
+        order = np.argsort(-self.counts, kind="stable")
+        order = order[self.counts[order] > 0]
+        return pd.DataFrame({"status": [self.statuses[i] for i in order], "count": self.counts[order]})
+
+    @timed("analytics")
+    def chase(self, top_n: int = 20) -> pd.DataFrame:
+        """Top N chase lines by revenue potential, joined to product / partner names."""
+        if top_n not in self._top:
+            k = min(top_n, len(self.chase_rows))
+            top = (np.argpartition(-self.chase_revenue, k - 1)[:k] if 0 < k < len(self.chase_rows)
+                   else np.arange(k))
+            top = top[np.argsort(-self.chase_revenue[top], kind="stable")]
+            lines = self.order_book.iloc[self.chase_rows[top]]
+
+            pkey = surrogate_keys(lines["product_id"], self.products["product_id"])
+            qkey = surrogate_keys(lines["partner_id"], self.partners["partner_id"])
+            out = pd.DataFrame({
+                **take_dims(self.partners, qkey, ["partner_name", "partner_tier"]),
+                **take_dims(self.products, pkey, ["product_name", "product_family"]),
+                "chase_units_recommended": lines["chase_units_recommended"].to_numpy(),
+                "chase_revenue_potential": lines["chase_revenue_potential"].to_numpy(),
+                "status": lines["status"].to_numpy(),
+            })
+            out["priority"] = pd.cut(out["chase_revenue_potential"],
+                                     bins=[0, 100_000, 300_000, float("inf")],
+                                     labels=["Low", "Medium", "High"])
+            self._top[top_n] = out[CHASE_COLUMNS]
+        return self._top[top_n]
+
+
+def load_order_book_analytics(store=None) -> OrderBookAnalytics:
+    """
+    Order-book analytics for the dashboard over the chase-scored order book
+    (see chase_engine), built once per data version.
+    """
+    from src.utils.data_store import get_store
+    from src.analytics.chase_engine import load_scored_order_book
 
-    shipped = order_book[order_book["status"] == "Shipped"]
-    partial = order_book[order_book["status"] == "Partially Fulfilled"]
-    fulfil_numerator = shipped["units_shipped"].sum() + partial["units_shipped"].sum()
-    fulfil_denominator = order_book["units_ordered"].sum()
-    fulfil_rate = fulfil_numerator / fulfil_denominator * 100 if fulfil_denominator > 0 else 0
+    store = store or get_store()
 
-    chase_value = order_book[order_book["chase_opportunity"]]["chase_revenue_potential"].sum()
+    def build(*_):
+        return OrderBookAnalytics(load_scored_order_book(store), store.get("products"),
+                                  store.get("partners"))
 
-    return {
-        "total_orders":     total_orders,
-        "at_risk_pct":      round(at_risk_pct, 1),
-        "fulfilment_rate":  round(fulfil_rate, 1),
-        "chase_value":      chase_value,
-    }
+    return store.derived("order_book_analytics", ("order_book", "actuals", "products", "partners"),
+                         build)
+
+
+def order_book_health(order_book: pd.DataFrame) -> dict:
+    """Compute order book health KPIs."""
+    health = OrderBookAnalytics(order_book, pd.DataFrame(columns=["product_id"]),
+                                pd.DataFrame(columns=["partner_id"])).health()
+    return {k: health[k] for k in ("total_orders", "at_risk_pct", "fulfilment_rate", "chase_value")}
 
 
 def get_chase_opportunities(order_book: pd.DataFrame,
@@ -39,25 +145,10 @@ def get_chase_opportunities(order_book: pd.DataFrame,
     Return top N chase opportunities ranked by revenue potential.
     Identifies partner × product combos where sell-through > 85% and WoS < 3.
     """
-    chase = order_book[order_book["chase_opportunity"]].copy()
-    chase = chase.merge(products[["product_id","product_name","product_family","asp"]], on="product_id", how="left")
-    chase = chase.merge(partners[["partner_id","partner_name","partner_tier"]], on="partner_id", how="left")
-
-    chase = chase.sort_values("chase_revenue_potential", ascending=False).head(top_n)
-
-    chase["priority"] = pd.cut(
-        chase["chase_revenue_potential"],
-        bins=[0, 100_000, 300_000, float("inf")],
-        labels=["Low", "Medium", "High"]
-    )
-
-    return chase[[
-        "partner_name", "product_name", "product_family",
-        "chase_units_recommended", "chase_revenue_potential",
-        "status", "priority", "partner_tier"
-    ]].reset_index(drop=True)
+    return OrderBookAnalytics(order_book, products, partners).chase(top_n)
 
 
+@timed("analytics")
 def shipment_plan_validation(order_book: pd.DataFrame,
                               forecast: pd.DataFrame,
                               products: pd.DataFrame) -> pd.DataFrame:
@@ -86,6 +177,7 @@ def shipment_plan_validation(order_book: pd.DataFrame,
     return result.sort_values("planned_units", ascending=False).reset_index(drop=True)
 
 
+@timed("analytics")
 def instock_ranging_analysis(actuals: pd.DataFrame, products: pd.DataFrame,
                               partners: pd.DataFrame) -> pd.DataFrame:
     """
@@ -93,10 +185,9 @@ def instock_ranging_analysis(actuals: pd.DataFrame, products: pd.DataFrame,
     Also flags ranging gaps (missing SKUs at partners).
     """
     recent = actuals[actuals["date"] >= actuals["date"].max() - pd.Timedelta(weeks=4)]
-    merged = recent.merge(products[["product_id","product_family"]], on="product_id", how="left")
-    merged = merged.merge(partners[["partner_id","partner_name"]], on="partner_id", how="left")
+    merged = attach_dims(recent, products, partners, ["product_family"], ["partner_name"])
 
-    heatmap = merged.groupby(["partner_name","product_family"])["in_stock_rate"].mean().reset_index()
+    heatmap = merged.groupby(["partner_name","product_family"], observed=True)["in_stock_rate"].mean().reset_index()
     heatmap.columns = ["partner_name", "product_family", "in_stock_rate"]
 
     return heatmap
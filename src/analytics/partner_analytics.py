@@ -1,12 +1,18 @@
 """
 Partner Analytics — Deep dive analytics per reseller partner.
+Each function accepts the full frames or a pre-sliced partner partition
+(src/utils/partner_index.py); on a slice the partner filter is a no-op pass.
 Author: Mohammed Kaif Ahmed
 """
 
 import pandas as pd
 import numpy as np
 
+from src.utils.fact_table import attach_dims
+from src.utils.profiling import timed
 
+
+@timed("analytics")
 def partner_overview(actuals: pd.DataFrame,
                      alerts: pd.DataFrame,
                      partner_id: str) -> dict:
@@ -42,6 +48,7 @@ def partner_overview(actuals: pd.DataFrame,
     }
 
 
+@timed("analytics")
 def partner_revenue_trend(actuals: pd.DataFrame, partner_id: str,
                            weeks: int = 52) -> pd.DataFrame:
     """Return weekly revenue trend for one partner."""
@@ -51,15 +58,17 @@ def partner_revenue_trend(actuals: pd.DataFrame, partner_id: str,
     return weekly
 
 
+@timed("analytics")
 def partner_product_mix(actuals: pd.DataFrame, products: pd.DataFrame,
                          partner_id: str) -> pd.DataFrame:
     """Revenue breakdown by product family for one partner."""
-    p = actuals[actuals["partner_id"] == partner_id].copy()
-    p = p.merge(products[["product_id","product_family"]], on="product_id", how="left")
-    mix = p.groupby("product_family").agg(revenue=("revenue","sum")).reset_index()
+    p = attach_dims(actuals[actuals["partner_id"] == partner_id], products,
+                    product_cols=["product_family"])
+    mix = p.groupby("product_family", observed=True).agg(revenue=("revenue","sum")).reset_index()
     return mix.sort_values("revenue", ascending=False)
 
 
+@timed("analytics")
 def generate_partner_insights(partner_name: str,
                                kpis: dict,
                                product_mix: pd.DataFrame) -> list:
@@ -0,0 +1,189 @@
+"""
+Tracking Signal — Online forecast-bias monitor per SKU × partner × model.
+Running error sums are updated as each new actual week lands, so control-limit
+flags never require a pass over the full history.
+Author: Mohammed Kaif Ahmed
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+from src.utils.helpers import PROC_DIR
+from src.analytics.forecast_accuracy import align_forecasts
+from src.utils.profiling import timed
+
+STATE_PATH = os.path.join(PROC_DIR, "tracking_signal_state.npz")
+
+TS_LIMIT = 4.0                      # ± control limits on the tracking signal
+KEY_NAMES = ["product_id", "partner_id", "forecast_model"]
+
+
+class TrackingSignalMonitor:
+    """
+    Per product × partner × model it keeps the cumulative forecast error,
+    cumulative absolute error, number of scored weeks and the last scored week.
+
+        tracking signal = cumulative error / MAD,   MAD = Σ|error| / n
+
+    with error = forecast − actual (positive = over-forecast). `update()` costs
+    O(new rows): weeks already scored for a series are skipped. Sums are
+    additive, so any slice (family, partner, network) is an exact re-sum.
+    """
+
+    def __init__(self, limit: float = TS_LIMIT):
+        self.limit = limit
+        self.keys = pd.MultiIndex.from_arrays([[], [], []], names=KEY_NAMES)
+        self.cum_err = np.empty(0)
+        self.cum_abs = np.empty(0)
+        self.n = np.empty(0, dtype=np.int64)
+        self.last_date = np.empty(0, dtype="datetime64[ns]")
+
+    # ── Construction / persistence ───────────────────────────────────────────
+    @classmethod
+    def from_history(cls, actuals: pd.DataFrame, forecasts: pd.DataFrame,
+                     **kwargs) -> "TrackingSignalMonitor":
+        """Build state from every historic week where forecasts and actuals overlap."""
+        mon = cls(**kwargs)
+        mon.ingest(align_forecasts(actuals, forecasts))
+        return mon
+
+    def save(self, path: str = STATE_PATH) -> None:
+        np.savez_compressed(
+            path,
+            **{name: np.asarray(self.keys.get_level_values(i), dtype=str)
+               for i, name in enumerate(KEY_NAMES)},
+            cum_err=self.cum_err, cum_abs=self.cum_abs, n=self.n,
+            last_date=self.last_date, params=np.array([self.limit]),
+        )
+
+    @classmethod
+    def load(cls, path: str = STATE_PATH) -> "TrackingSignalMonitor":
+        with np.load(path) as f:
+            mon = cls(*f["params"])
+            mon.keys = pd.MultiIndex.from_arrays([f[name] for name in KEY_NAMES], names=KEY_NAMES)
+            mon.cum_err, mon.cum_abs, mon.n = f["cum_err"], f["cum_abs"], f["n"]
+            mon.last_date = f["last_date"]
+        return mon
+
+    # ── Weekly cycle ─────────────────────────────────────────────────────────
+    def update(self, new_actuals: pd.DataFrame, forecasts: pd.DataFrame) -> pd.DataFrame:
+        """Score newly landed actuals against their forecasts; return flagged series among them."""
+        touched = self.ingest(align_forecasts(new_actuals, forecasts))
+        return self.flags(self.signals(touched))
+
+    def _series_index(self, aligned: pd.DataFrame) -> np.ndarray:
+        """Map rows to state rows, growing the state for unseen series."""
+        arrays = [np.asarray(aligned[c], dtype=str) for c in KEY_NAMES]
+        idx = self.keys.get_indexer(pd.MultiIndex.from_arrays(arrays))
+        new = idx < 0
+        if new.any():
+            new_keys = pd.MultiIndex.from_arrays([a[new] for a in arrays], names=KEY_NAMES).unique()
+            m = len(new_keys)
+            self.keys = self.keys.append(new_keys)
+            self.cum_err = np.concatenate([self.cum_err, np.zeros(m)])
+            self.cum_abs = np.concatenate([self.cum_abs, np.zeros(m)])
+            self.n = np.concatenate([self.n, np.zeros(m, dtype=np.int64)])
+            self.last_date = np.concatenate([self.last_date,
+                                             np.full(m, np.datetime64("NaT"), dtype="datetime64[ns]")])
+            idx = self.keys.get_indexer(pd.MultiIndex.from_arrays(arrays))
+        return idx
+
+    def ingest(self, aligned: pd.DataFrame) -> np.ndarray:
+        """
+        Fold aligned forecast/actual rows (align_forecasts or backtest schema)
+        into the running sums. Returns the state rows that changed.
+        """
+        if aligned.empty:
+            return np.empty(0, dtype=np.int64)
+        idx = self._series_index(aligned)
+        dates = aligned["date"].to_numpy().astype("datetime64[ns]")
+        fresh = ~(self.last_date[idx] >= dates)                   # NaT compares False
+        fresh &= ~pd.MultiIndex.from_arrays([idx, dates]).duplicated(keep="last")
+        idx, dates = idx[fresh], dates[fresh]
+        err = (aligned["forecast_units"].to_numpy(dtype=float)
+               - aligned["actual_units"].to_numpy(dtype=float))[fresh]
+
+        np.add.at(self.cum_err, idx, err)
+        np.add.at(self.cum_abs, idx, np.abs(err))
+        np.add.at(self.n, idx, 1)
+        np.maximum.at(self.last_date.view("i8"), idx, dates.view("i8"))   # NaT is the minimum
+        return np.unique(idx)
+
+    # ── Signals ──────────────────────────────────────────────────────────────
+    def signals(self, rows: np.ndarray = None) -> pd.DataFrame:
+        """Tracking signal, MAD and cumulative bias per series (all, or the given state rows)."""
+        rows = np.arange(len(self.keys)) if rows is None else rows
+        n = self.n[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mad = np.where(n > 0, self.cum_abs[rows] / n, np.nan)
+            ts = np.where(mad > 0, self.cum_err[rows] / mad, 0.0)
+        out = self.keys[rows].to_frame(index=False)
+        out["weeks"] = n
+        out["cum_error"] = self.cum_err[rows]
+        out["mad"] = mad
+        out["tracking_signal"] = ts
+        out["last_date"] = self.last_date[rows]
+        return out
+
+    def flags(self, signals: pd.DataFrame = None) -> pd.DataFrame:
+        """Series outside the ± control limits, worst first."""
+        signals = self.signals() if signals is None else signals
+        out = signals[signals["tracking_signal"].abs() > self.limit]
+        return out.sort_values("tracking_signal", key=np.abs, ascending=False).reset_index(drop=True)
+
+    @timed("analytics")
+    def slice_signal(self, model: str = "Ensemble", product_ids=None, partner_id=None) -> dict:
+        """Mean tracking signal across a slice's series, plus how many of them are flagged."""
+        mask = np.asarray(self.keys.get_level_values(2)) == model
+        if product_ids is not None:
+            mask &= np.isin(np.asarray(self.keys.get_level_values(0)), np.asarray(product_ids, dtype=str))
+        if partner_id is not None:
+            mask &= np.asarray(self.keys.get_level_values(1)) == str(partner_id)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            series_ts = np.nan_to_num(self.cum_err[mask] / (self.cum_abs[mask] / self.n[mask]))
+        return {"tracking_signal": round(float(series_ts.mean()), 2) if mask.any() else 0.0,
+                "series": int(mask.sum()), "flagged": int((np.abs(series_ts) > self.limit).sum())}
+
+
+def update_tracking_state(new_actuals: pd.DataFrame, forecasts: pd.DataFrame,
+                          history: pd.DataFrame = None, path: str = STATE_PATH) -> pd.DataFrame:
+    """
+    Weekly cycle: load persisted state (or bootstrap it from `history`
+    actuals), score `new_actuals`, save, and return the flagged series.
+    """
+    if os.path.exists(path):
+        mon = TrackingSignalMonitor.load(path)
+    else:
+        mon = TrackingSignalMonitor.from_history(history if history is not None
+                                                 else new_actuals.iloc[:0], forecasts)
+    flagged = mon.update(new_actuals, forecasts)
+    mon.save(path)
+    return flagged
+
+
+def load_tracking_monitor(store=None, path: str = STATE_PATH):
+    """
+    Monitor for the dashboard: the persisted weekly state when present,
+    otherwise built once per data version from overlapping forecasts (or the
+    stored backtest forecasts). None when there is nothing to score.
+    """
+    from src.utils.data_store import get_store
+    from src.forecasting.backtest import load_backtest_table, backtest_version
+
+    store = store or get_store()
+    state = (path, os.stat(path).st_mtime_ns) if os.path.exists(path) else None
+
+    def build(actuals, forecasts):
+        if state is not None:
+            return TrackingSignalMonitor.load(path)
+        mon = TrackingSignalMonitor.from_history(actuals, forecasts)
+        if not len(mon.keys):
+            bt = load_backtest_table("backtest_forecasts")
+            if bt is None or bt.empty:
+                return None
+            mon.ingest(bt)
+        return mon
+
+    return store.derived("tracking_signal", ("actuals", "forecasts"), build,
+                         token=(state, backtest_version("backtest_forecasts")))
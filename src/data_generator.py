@@ -8,6 +8,7 @@ import numpy as np
 import pandas as pd
 from datetime import date, timedelta
 import os
+import sys
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -21,6 +22,9 @@ PROCESSED_DIR = os.path.join(BASE_DIR, "data", "processed")
 os.makedirs(RAW_DIR, exist_ok=True)
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
+sys.path.insert(0, BASE_DIR)
+from src.utils.storage import DatasetWriter, write_dataset
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 1. PRODUCTS
@@ -139,200 +143,237 @@ def generate_partners() -> pd.DataFrame:
     return df
 
 
+def scale_products(products: pd.DataFrame, n_skus: int) -> pd.DataFrame:
+    """
+    Resize the SKU catalogue for load testing.
+    Extra SKUs are variants of the base catalogue (suffix -V002, -V003, …) that
+    keep family, lifecycle, launch date and ASP, so demand stays realistic.
+    """
+    if n_skus <= len(products):
+        return products.head(n_skus).reset_index(drop=True)
+
+    reps = -(-n_skus // len(products))
+    df = pd.concat([products] * reps, ignore_index=True).head(n_skus)
+    variant = np.arange(len(df)) // len(products) + 1
+    suffix = pd.Series(variant).map(lambda v: f"-V{v:03d}")
+    is_variant = variant > 1
+    df.loc[is_variant, "product_id"] = df.loc[is_variant, "product_id"] + suffix[is_variant]
+    df.loc[is_variant, "product_name"] = (df.loc[is_variant, "product_name"] +
+                                          suffix[is_variant].str.replace("-", " ", regex=False))
+    return df
+
+
+def scale_partners(partners: pd.DataFrame, n_partners: int) -> pd.DataFrame:
+    """
+    Resize the reseller network for load testing.
+    Extra partners clone the base network (suffix #2, #3, …) with revenue decayed
+    by 0.8× per clone generation, preserving the Pareto shape.
+    """
+    if n_partners <= len(partners):
+        return partners.head(n_partners).reset_index(drop=True)
+
+    reps = -(-n_partners // len(partners))
+    df = pd.concat([partners] * reps, ignore_index=True).head(n_partners)
+    generation = np.arange(len(df)) // len(partners)
+    df["partner_id"] = [f"PARTNER-{i+1:03d}" for i in range(len(df))]
+    is_clone = generation > 0
+    df.loc[is_clone, "partner_name"] = (df.loc[is_clone, "partner_name"] + " #" +
+                                        pd.Series(generation + 1)[is_clone].astype(str))
+    df["avg_monthly_revenue"] = (df["avg_monthly_revenue"] * 0.8 ** generation).round(2)
+    return df
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # 3. DEMAND ACTUALS
 # ═══════════════════════════════════════════════════════════════════════════════
-def generate_demand_actuals(products: pd.DataFrame, partners: pd.DataFrame) -> pd.DataFrame:
+# Product family baseline weekly channel units (total network)
+FAMILY_BASE_UNITS = {
+    "iPhone":       6_500,
+    "iPad":         1_800,
+    "Mac":            900,
+    "Apple Watch":    800,
+    "AirPods":      1_400,
+    "Accessories":  3_500,
+}
+
+# Cap on week × SKU × partner cells drawn per batch — bounds peak memory
+MAX_CELLS_PER_BLOCK = 4_000_000
+
+
+def _seasonality_by_family(week_nums: np.ndarray) -> dict:
+    """Return {family: multiplier array} for an array of ISO week numbers."""
+    wn = week_nums.astype(float)
+
+    # iPhone launch: W37-W42
+    iphone_launch_mult = np.where(
+        (wn >= 37) & (wn <= 41), 1.0 + 3.4 * np.exp(-0.5 * ((wn - 39) / 1.5) ** 2),
+        np.where((wn >= 42) & (wn <= 46), 1.0 + 0.3 * np.exp(-0.4 * (wn - 42)), 1.0)
+    )
+    # Holiday season: W47-W52
+    holiday_mult = np.where((wn >= 47) & (wn <= 52), 1.0 + 1.8 * np.exp(-0.3 * np.abs(wn - 50)), 1.0)
+    # Back-to-school: W33-W37
+    bts_mult = np.where((wn >= 33) & (wn <= 37), 1.0 + 0.6 * np.exp(-0.5 * np.abs(wn - 35)), 1.0)
+    # Feb dip (CNY supply effect)
+    feb_mult = np.where(np.isin(week_nums, [6, 7, 8]), 0.85, 1.0)
+
+    # AirPods: 1-week lag on iPhone launch
+    prev_wn = np.where(wn > 1, wn - 1, 52)
+    airpods_lag = np.where((prev_wn >= 38) & (prev_wn <= 43),
+                           1.0 + 2.0 * np.exp(-0.6 * np.abs(prev_wn - 40)), 1.0)
+    # Accessories: 1-2 week lag on iPhone launch
+    acc_lag = np.where((wn >= 39) & (wn <= 45), 1.0 + 2.5 * np.exp(-0.5 * np.abs(wn - 41)), 1.0)
+
+    return {
+        "iPhone":      iphone_launch_mult * holiday_mult * bts_mult * feb_mult,
+        "iPad":        (0.4 * iphone_launch_mult + 0.6) * holiday_mult * bts_mult,
+        "Mac":         (0.4 * iphone_launch_mult + 0.6) * holiday_mult * bts_mult,
+        "Apple Watch": (0.3 * iphone_launch_mult + 0.7) * holiday_mult,
+        "AirPods":     airpods_lag * holiday_mult,
+        "Accessories": acc_lag * holiday_mult,
+    }
+
+
+def _lifecycle_factor(lifecycle: np.ndarray, weeks_since_launch: np.ndarray) -> np.ndarray:
+    """Lifecycle multiplier for a (weeks × SKUs) matrix of weeks since launch."""
+    wsl = weeks_since_launch
+    return np.select(
+        [lifecycle == "Launch", lifecycle == "Growth", lifecycle == "Decline"],
+        [np.maximum(0.3, np.exp(-0.08 * wsl)) + 0.3,
+         np.minimum(1.0, 0.5 + 0.04 * wsl),
+         np.maximum(0.2, 1.0 - 0.004 * wsl)],
+        default=1.0,
+    )
+
+
+def _sku_fraction(products: pd.DataFrame) -> np.ndarray:
+    """Share of family units per SKU — weighted by ASP rank (cheaper sells more)."""
+    rank = products.groupby("product_family", sort=False)["asp"].rank(method="first").to_numpy() - 1
+    weight = 1.0 / (1.0 + 0.5 * rank)
+    return weight / products.assign(_w=weight).groupby("product_family", sort=False)["_w"].transform("sum").to_numpy()
+
+
+def _demand_block(weeks: pd.DatetimeIndex, base_units: np.ndarray,
+                  products: pd.DataFrame, partners: pd.DataFrame,
+                  partner_weights: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
     """
-    Generate 104 weeks of weekly demand per product × partner.
-    Simulates seasonality, NPI curves, supply constraints, Pareto partner sizes,
-    accessory correlation, YoY growth, and noise.
+    Draw partner-level actuals for a block of weeks in batched calls.
+    `base_units` is the (weeks × SKUs) network demand; cells expand to weeks × SKUs × partners.
     """
-    print("  Generating demand actuals (this may take 30-60 seconds)...")
-
-    # Date spine: 104 weeks ending ~ today (Sep 15 2025), starting Oct 2023
-    end_date   = date(2025, 8, 25)  # Last full week before "today"
-    start_date = end_date - timedelta(weeks=103)
-    weeks = [start_date + timedelta(weeks=i) for i in range(104)]
+    n_weeks, n_prod = base_units.shape
+    n_part = len(partners)
+    shape = (n_weeks, n_prod, n_part)
+
+    # Partner × product eligibility (Silver partners sometimes skip accessories)
+    skippable = ((partners["partner_tier"].to_numpy() == "Silver")[None, None, :] &
+                 (products["priority_tier"].to_numpy() == "Tier 3")[None, :, None])
+    skip = skippable & (rng.random(shape) < 0.25)
+
+    partner_units = base_units[:, :, None] * partner_weights[None, None, :] * n_part  # scale to partner level
+    noise = np.clip(rng.normal(1.0, 0.10, shape), 0.7, 1.4)
+    units_ordered = np.rint(partner_units * noise).astype(np.int64)
+
+    keep = ~skip & (units_ordered > 0)
+    w_idx, p_idx, r_idx = np.nonzero(keep)
+    units_ordered = units_ordered[keep]
+    n = len(units_ordered)
+
+    # ── Supply constraint (~12% of rows) ─────────────────────────────────────
+    is_constrained = rng.random(n) < 0.12
+    fill_rate = np.where(is_constrained, 0.55 + 0.30 * rng.random(n), 0.92 + 0.08 * rng.random(n))
+    units_shipped = np.rint(units_ordered * fill_rate).astype(np.int64)
+
+    # Sell-through: slightly less than shipped (some stay on shelf)
+    st_rate = rng.uniform(0.78, 0.97, n)
+    units_sold = np.rint(units_shipped * st_rate).astype(np.int64)
+
+    asp_actual = products["asp"].to_numpy(dtype=float)[p_idx] * rng.uniform(0.97, 1.03, n)
+    revenue = units_sold * asp_actual
+
+    # In-stock rate — worse if constrained; ~1.5% data quality NaN
+    in_stock_rate = np.where(is_constrained, 0.60 + 0.25 * rng.random(n), 0.88 + 0.11 * rng.random(n))
+    in_stock_rate = np.where(rng.random(n) < 0.015, np.nan, np.round(in_stock_rate, 4))
+
+    # Weeks of supply (rough: inventory / weekly_run_rate)
+    inventory = np.maximum(0, (units_shipped - units_sold) + rng.integers(0, units_sold // 2 + 1))
+    run_rate = np.maximum(1, units_sold)
+    wos = np.minimum(np.round(inventory / run_rate, 2), 12.0)
+
+    return pd.DataFrame({
+        "date":          weeks[w_idx],
+        "product_id":    products["product_id"].to_numpy()[p_idx],
+        "partner_id":    partners["partner_id"].to_numpy()[r_idx],
+        "units_ordered": units_ordered,
+        "units_shipped": units_shipped,
+        "units_sold":    units_sold,
+        "revenue":       np.round(revenue, 2),
+        "asp_actual":    np.round(asp_actual, 2),
+        "in_stock_rate": in_stock_rate,
+        "weeks_of_supply": wos,
+    })
+
+
+def _network_demand(products: pd.DataFrame, partners: pd.DataFrame, n_weeks: int) -> tuple:
+    """Return (weeks, base_units[weeks × SKUs], partner_weights) for the date spine."""
+    # Date spine: weekly, ending ~ today (Sep 15 2025)
+    end_date = pd.Timestamp("2025-08-25")  # Last full week before "today"
+    weeks = pd.date_range(end=end_date, periods=n_weeks, freq="7D")
+    iso = weeks.isocalendar()
+    week_nums = iso["week"].to_numpy(dtype=int)
+    years = weeks.year.to_numpy()
+    yoy_factor = 1.0 + 0.06 * ((years - 2023) + (np.arange(n_weeks) / 104))
 
     # Partner revenue weights (Pareto) — must sum to 1
-    partner_weights = np.array([28.5, 22.1, 11.4, 8.9, 7.2, 6.8, 10.3, 5.5,
-                                  3.1, 3.8, 2.4, 1.8, 1.4])
+    partner_weights = partners["avg_monthly_revenue"].to_numpy(dtype=float)
     partner_weights = partner_weights / partner_weights.sum()
 
-    # Product family baseline weekly channel units (total network)
-    family_base = {
-        "iPhone":       6_500,
-        "iPad":         1_800,
-        "Mac":            900,
-        "Apple Watch":    800,
-        "AirPods":      1_400,
-        "Accessories":  3_500,
-    }
+    families = products["product_family"].to_numpy()
+    season = _seasonality_by_family(week_nums)
+    season_mult = np.ones((n_weeks, len(products)))
+    for family, mult in season.items():
+        season_mult[:, families == family] = mult[:, None]
 
-    rows = []
-    iphone_demand_by_week = {}  # track for accessory lag correlation
-
-    product_list = products.to_dict("records")
-    partner_list = partners.to_dict("records")
-
-    for week_idx, week_start in enumerate(weeks):
-        week_num = week_start.isocalendar()[1]   # ISO week number
-        year     = week_start.year
-        yoy_factor = 1.0 + 0.06 * ((year - 2023) + (week_idx / 104))
-
-        # ── Seasonality multipliers (applied to all iPhone/tech) ────────────
-        # iPhone launch: W37-W42
-        iphone_launch_mult = 1.0
-        if 37 <= week_num <= 41:
-            iphone_launch_mult = 1.0 + 3.4 * np.exp(-0.5 * ((week_num - 39) / 1.5) ** 2)
-        elif 42 <= week_num <= 46:
-            iphone_launch_mult = 1.0 + 0.3 * np.exp(-0.4 * (week_num - 42))
-
-        # Holiday season: W47-W52
-        holiday_mult = 1.0
-        if 47 <= week_num <= 52:
-            holiday_mult = 1.0 + 1.8 * np.exp(-0.3 * abs(week_num - 50))
-
-        # Back-to-school: W33-W37
-        bts_mult = 1.0
-        if 33 <= week_num <= 37:
-            bts_mult = 1.0 + 0.6 * np.exp(-0.5 * abs(week_num - 35))
-
-        # Feb dip (CNY supply effect)
-        feb_mult = 0.85 if week_num in [6, 7, 8] else 1.0
-
-        total_iphone_demand_this_week = 0
-
-        for prod in product_list:
-            family    = prod["product_family"]
-            pid       = prod["product_id"]
-            asp       = prod["asp"]
-            lifecycle = prod["lifecycle_stage"]
-            launch    = prod["launch_date"] if isinstance(prod["launch_date"], date) else pd.to_datetime(prod["launch_date"]).date()
-            weeks_since_launch = max(0, (week_start - launch).days // 7)
-
-            # ── Lifecycle factor ─────────────────────────────────────────────
-            if lifecycle == "Launch":
-                if weeks_since_launch < 0:
-                    lc_factor = 0.0  # product not yet launched
-                else:
-                    lc_factor = max(0.3, 1.0 * np.exp(-0.08 * weeks_since_launch)) + 0.3
-            elif lifecycle == "Growth":
-                lc_factor = min(1.0, 0.5 + 0.04 * weeks_since_launch)
-            elif lifecycle == "Maturity":
-                lc_factor = 1.0
-            elif lifecycle == "Decline":
-                lc_factor = max(0.2, 1.0 - 0.004 * weeks_since_launch)
-            else:
-                lc_factor = 1.0
-
-            # ── Family seasonal mult ─────────────────────────────────────────
-            if family == "iPhone":
-                season_mult = iphone_launch_mult * holiday_mult * bts_mult * feb_mult
-            elif family in ["iPad", "Mac"]:
-                season_mult = (0.4 * iphone_launch_mult + 0.6) * holiday_mult * bts_mult
-            elif family == "Apple Watch":
-                season_mult = (0.3 * iphone_launch_mult + 0.7) * holiday_mult
-            elif family == "AirPods":
-                # 1-week lag on iPhone launch
-                prev_week_num = (week_num - 1) if week_num > 1 else 52
-                lag_iphone = 1.0
-                if 38 <= prev_week_num <= 43:
-                    lag_iphone = 1.0 + 2.0 * np.exp(-0.6 * abs(prev_week_num - 40))
-                season_mult = lag_iphone * holiday_mult
-            elif family == "Accessories":
-                # 1-2 week lag on iPhone launch
-                lag_iphone = 1.0
-                if 39 <= week_num <= 45:
-                    lag_iphone = 1.0 + 2.5 * np.exp(-0.5 * abs(week_num - 41))
-                season_mult = lag_iphone * holiday_mult
-            else:
-                season_mult = 1.0
-
-            base_family_units = family_base.get(family, 500)
-
-            # Distribute family units across SKUs in that family
-            family_skus = [p for p in product_list if p["product_family"] == family]
-            sku_count   = len(family_skus)
-            # Weight by ASP inverse (cheaper sells more) and lifecycle
-            sku_rank    = sorted(family_skus, key=lambda x: x["asp"])
-            sku_unit_weight = 1.0 / (1.0 + 0.5 * sku_rank.index(prod)) if prod in sku_rank else 1.0
-            total_sku_weight = sum(1.0 / (1.0 + 0.5 * i) for i in range(sku_count))
-            sku_fraction = sku_unit_weight / total_sku_weight if total_sku_weight > 0 else 1.0 / sku_count
-
-            base_units = base_family_units * sku_fraction * season_mult * lc_factor * yoy_factor
-
-            # Track for accessory correlation
-            if family == "iPhone":
-                total_iphone_demand_this_week += base_units
-
-            for p_idx, partner in enumerate(partner_list):
-                partner_weight = partner_weights[p_idx]
-                partner_id     = partner["partner_id"]
-
-                # Partner × product eligibility (smaller partners don't carry every SKU)
-                tier = partner["partner_tier"]
-                if tier == "Silver" and prod["priority_tier"] == "Tier 3" and np.random.random() < 0.25:
-                    continue  # Silver partners sometimes skip accessories
-
-                partner_units = base_units * partner_weight * 13  # scale to partner level
-                noise = np.random.normal(1.0, 0.10)
-                noise = np.clip(noise, 0.7, 1.4)
-                units_ordered = max(0, int(round(partner_units * noise)))
-
-                if units_ordered == 0:
-                    continue
-
-                # ── Supply constraint (~12% of rows) ─────────────────────────
-                is_constrained = np.random.random() < 0.12
-                if is_constrained:
-                    fill_rate = np.random.uniform(0.55, 0.85)
-                else:
-                    fill_rate = np.random.uniform(0.92, 1.0)
-                units_shipped = max(0, int(round(units_ordered * fill_rate)))
+    launch = pd.to_datetime(products["launch_date"]).to_numpy(dtype="datetime64[D]")
+    days_since_launch = (weeks.to_numpy(dtype="datetime64[D]")[:, None] - launch[None, :]).astype(int)
+    weeks_since_launch = np.maximum(0, days_since_launch // 7)
+    lc_factor = _lifecycle_factor(products["lifecycle_stage"].to_numpy(), weeks_since_launch)
 
-                # Sell-through: slightly less than shipped (some stay on shelf)
-                st_rate = np.random.uniform(0.78, 0.97)
-                units_sold = max(0, int(round(units_shipped * st_rate)))
+    family_units = products["product_family"].map(FAMILY_BASE_UNITS).fillna(500).to_numpy(dtype=float)
+    base_units = ((family_units * _sku_fraction(products))[None, :] *
+                  season_mult * lc_factor * yoy_factor[:, None])
+    return weeks, base_units, partner_weights
 
-                asp_variance = np.random.uniform(0.97, 1.03)
-                asp_actual   = prod["asp"] * asp_variance
-                revenue      = units_sold * asp_actual
-
-                # In-stock rate — worse if constrained
-                if is_constrained:
-                    in_stock_rate = np.random.uniform(0.60, 0.85)
-                else:
-                    in_stock_rate = np.random.uniform(0.88, 0.99)
 
-                # Inject ~1.5% data quality NaN in in_stock_rate
-                if np.random.random() < 0.015:
-                    in_stock_rate = np.nan
+def iter_demand_actuals(products: pd.DataFrame, partners: pd.DataFrame,
+                        n_weeks: int = 104, rng: np.random.Generator = None,
+                        chunk_weeks: int = None):
+    """
+    Yield demand actuals in chronological blocks of weeks.
+    Block size defaults to MAX_CELLS_PER_BLOCK week × SKU × partner cells, so
+    arbitrarily long histories stream with a bounded working set.
+    """
+    rng = rng if rng is not None else np.random.default_rng(42)
+    weeks, base_units, partner_weights = _network_demand(products, partners, n_weeks)
 
-                # Weeks of supply (rough: inventory / weekly_run_rate)
-                inventory = max(0, (units_shipped - units_sold) + np.random.randint(0, int(units_sold * 0.5) + 1))
-                run_rate  = max(1, units_sold)
-                wos = round(inventory / run_rate, 2) if run_rate > 0 else 0.0
-                wos = min(wos, 12.0)
+    if chunk_weeks is None:
+        cells_per_week = len(products) * len(partners)
+        chunk_weeks = max(1, MAX_CELLS_PER_BLOCK // max(1, cells_per_week))
+    for s in range(0, n_weeks, chunk_weeks):
+        yield _demand_block(weeks[s:s + chunk_weeks], base_units[s:s + chunk_weeks],
+                            products, partners, partner_weights, rng)
 
-                rows.append({
-                    "date":          week_start,
-                    "product_id":    pid,
-                    "partner_id":    partner_id,
-                    "units_ordered": units_ordered,
-                    "units_shipped": units_shipped,
-                    "units_sold":    units_sold,
-                    "revenue":       round(revenue, 2),
-                    "asp_actual":    round(asp_actual, 2),
-                    "in_stock_rate": round(in_stock_rate, 4) if not (isinstance(in_stock_rate, float) and np.isnan(in_stock_rate)) else np.nan,
-                    "weeks_of_supply": wos,
-                })
 
-        iphone_demand_by_week[week_start] = total_iphone_demand_this_week
+def generate_demand_actuals(products: pd.DataFrame, partners: pd.DataFrame,
+                            n_weeks: int = 104, rng: np.random.Generator = None) -> pd.DataFrame:
+    """
+    Generate weekly demand per product × partner (104 weeks by default).
+    Simulates seasonality, NPI curves, supply constraints, Pareto partner sizes,
+    accessory correlation, YoY growth, and noise.
 
-    df = pd.DataFrame(rows)
-    df["date"] = pd.to_datetime(df["date"])
+    The week × SKU × partner cube is built as NumPy arrays with every random draw
+    batched through `rng`; blocks of weeks are capped at MAX_CELLS_PER_BLOCK cells.
+    """
+    frames = list(iter_demand_actuals(products, partners, n_weeks=n_weeks, rng=rng))
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
     print(f"  ✓ Demand actuals: {len(df):,} rows | {df['date'].nunique()} weeks | Total revenue €{df['revenue'].sum()/1e9:.2f}B")
     return df
 
@@ -340,75 +381,83 @@ def generate_demand_actuals(products: pd.DataFrame, partners: pd.DataFrame) -> p
 # ═══════════════════════════════════════════════════════════════════════════════
 # 4. FORECASTS
 # ═══════════════════════════════════════════════════════════════════════════════
-def generate_forecasts(products: pd.DataFrame, partners: pd.DataFrame,
-                       actuals: pd.DataFrame) -> pd.DataFrame:
-    """Generate 12-week forward forecasts per product × partner with 4 models."""
-    today = date(2025, 9, 15)
-    forecast_weeks = [today + timedelta(weeks=i) for i in range(1, 13)]
-    models = ["ARIMA", "Prophet", "RF", "Ensemble"]
-    model_accuracy = {"ARIMA": 0.885, "Prophet": 0.902, "RF": 0.897, "Ensemble": 0.913}
-
-    # Get trailing 8-week avg as base forecast signal
-    recent_cutoff = pd.Timestamp(today - timedelta(weeks=8))
-    recent = actuals[actuals["date"] >= recent_cutoff].groupby(
-        ["product_id", "partner_id"]
-    ).agg(weekly_avg_units=("units_sold", "mean")).reset_index()
-
-    rows = []
-    for _, row in recent.iterrows():
-        pid    = row["product_id"]
-        partid = row["partner_id"]
-        base   = row["weekly_avg_units"]
-
-        prod_info = products[products["product_id"] == pid]
-        if prod_info.empty:
-            continue
-        lifecycle = prod_info.iloc[0]["lifecycle_stage"]
-
-        for wk_idx, fw in enumerate(forecast_weeks):
-            week_num = fw.isocalendar()[1]
-            trend = 1.0 + 0.005 * wk_idx  # slight upward trend in forecast
+FORECAST_MODEL_ACCURACY = {"ARIMA": 0.885, "Prophet": 0.902, "RF": 0.897, "Ensemble": 0.913}
 
-            # iphone launch bump for W37-W43
-            if pid.startswith("IPHONE-16") and 37 <= week_num <= 43:
-                trend *= (1.5 + 0.5 * np.exp(-0.4 * abs(week_num - 39)))
-            elif pid.startswith("IPHONE-16") and week_num > 43:
-                trend *= max(0.8, 1.0 - 0.03 * (week_num - 43))
+# Cap on series × weeks × models cells drawn per forecast chunk
+MAX_FORECAST_CELLS = 4_000_000
 
-            # Holiday uplift
-            if 47 <= week_num <= 52:
-                trend *= 1.4
 
-            forecast_base = max(0, base * trend)
+def iter_forecasts(actuals: pd.DataFrame, horizon: int = 12,
+                   rng: np.random.Generator = None, chunk_series: int = None):
+    """
+    Yield forward forecasts per product × partner with 4 models, in chunks of series.
+    Only the trailing 8 weeks of `actuals` are read, so a tail slice is sufficient.
+    """
+    rng = rng if rng is not None else np.random.default_rng(43)
+    today = pd.Timestamp("2025-09-15")
+    forecast_weeks = pd.date_range(today + pd.Timedelta(weeks=1), periods=horizon, freq="7D")
+    week_nums = forecast_weeks.isocalendar()["week"].to_numpy(dtype=int)
+    models = list(FORECAST_MODEL_ACCURACY)
+    mapes = 1.0 - np.array([FORECAST_MODEL_ACCURACY[m] for m in models])
 
-            for model in models:
-                mape = 1.0 - model_accuracy[model]
-                noise_factor = np.random.normal(1.0, mape * 0.5)
-                forecast_units = max(0, int(round(forecast_base * noise_factor)))
+    # Get trailing 8-week avg as base forecast signal
+    recent_cutoff = today - pd.Timedelta(weeks=8)
+    recent = actuals[actuals["date"] >= recent_cutoff].groupby(
+        ["product_id", "partner_id"], observed=True
+    ).agg(weekly_avg_units=("units_sold", "mean")).reset_index()
 
-                # Confidence intervals (80%)
-                ci_half = forecast_units * (mape * 2.0)
-                lower = max(0, int(round(forecast_units - ci_half)))
-                upper = int(round(forecast_units + ci_half))
+    # Week-level trend shared by all series; iPhone 16 launch shape on top
+    wk_idx = np.arange(horizon)
+    trend = 1.0 + 0.005 * wk_idx  # slight upward trend in forecast
+    holiday = np.where((week_nums >= 47) & (week_nums <= 52), 1.4, 1.0)
+    launch = np.where(
+        (week_nums >= 37) & (week_nums <= 43), 1.5 + 0.5 * np.exp(-0.4 * np.abs(week_nums - 39)),
+        np.where(week_nums > 43, np.maximum(0.8, 1.0 - 0.03 * (week_nums - 43)), 1.0)
+    )
+
+    n_models = len(models)
+    if chunk_series is None:
+        chunk_series = max(1, MAX_FORECAST_CELLS // (horizon * n_models))
+    for s in range(0, len(recent), chunk_series):
+        chunk = recent.iloc[s:s + chunk_series]
+        n = len(chunk)
+        is_iphone16 = chunk["product_id"].astype(str).str.startswith("IPHONE-16").to_numpy()
+        series_trend = trend[None, :] * np.where(is_iphone16[:, None], launch[None, :], 1.0) * holiday[None, :]
+        forecast_base = np.maximum(0, chunk["weekly_avg_units"].to_numpy()[:, None] * series_trend)
+
+        shape = (n, horizon, n_models)
+        noise_factor = 1.0 + rng.standard_normal(shape) * (mapes * 0.5)
+        forecast_units = np.maximum(0, np.rint(forecast_base[:, :, None] * noise_factor)).astype(np.int64)
+
+        # Confidence intervals (80%)
+        ci_half = forecast_units * (mapes * 2.0)
+        lower = np.maximum(0, np.rint(forecast_units - ci_half)).astype(np.int64)
+        upper = np.rint(forecast_units + ci_half).astype(np.int64)
+
+        # Trailing MAPE metric (per model)
+        trailing_mape = np.round(mapes + rng.uniform(-0.01, 0.01, shape), 4)
+
+        yield pd.DataFrame({
+            "date":                np.tile(np.repeat(forecast_weeks.to_numpy(), n_models), n),
+            "product_id":          np.repeat(chunk["product_id"].to_numpy(), horizon * n_models),
+            "partner_id":          np.repeat(chunk["partner_id"].to_numpy(), horizon * n_models),
+            "forecast_units":      forecast_units.ravel(),
+            "forecast_lower":      lower.ravel(),
+            "forecast_upper":      upper.ravel(),
+            "forecast_model":      np.tile(models, n * horizon),
+            "forecast_accuracy_mape": trailing_mape.ravel(),
+        })
 
-                # Trailing MAPE metric (per model)
-                trailing_mape = round(mape + np.random.uniform(-0.01, 0.01), 4)
 
-                rows.append({
-                    "date":                fw,
-                    "product_id":          pid,
-                    "partner_id":          partid,
-                    "forecast_units":      forecast_units,
-                    "forecast_lower":      lower,
-                    "forecast_upper":      upper,
-                    "forecast_model":      model,
-                    "forecast_accuracy_mape": trailing_mape,
-                })
-
-    df = pd.DataFrame(rows)
-    df["date"] = pd.to_datetime(df["date"])
+def generate_forecasts(products: pd.DataFrame, partners: pd.DataFrame,
+                       actuals: pd.DataFrame, horizon: int = 12,
+                       rng: np.random.Generator = None) -> pd.DataFrame:
+    """Generate forward forecasts (12 weeks by default) per product × partner with 4 models."""
+    known = actuals[actuals["product_id"].isin(products["product_id"])]
+    frames = list(iter_forecasts(known, horizon=horizon, rng=rng))
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
     print(f"  ✓ Forecasts: {len(df):,} rows | {df['forecast_model'].nunique()} models | "
-          f"12 weeks forward")
+          f"{horizon} weeks forward")
     return df
 
 
@@ -416,75 +465,60 @@ def generate_forecasts(products: pd.DataFrame, partners: pd.DataFrame,
 # 5. ORDER BOOK
 # ═══════════════════════════════════════════════════════════════════════════════
 def generate_order_book(products: pd.DataFrame, partners: pd.DataFrame,
-                        actuals: pd.DataFrame) -> pd.DataFrame:
-    """Generate current open order book. ~200-300 active orders."""
+                        actuals: pd.DataFrame, density: float = 0.65,
+                        rng: np.random.Generator = None) -> pd.DataFrame:
+    """
+    Generate current open order book — ~200-300 active orders at default scale.
+    `density` is the share of active product × partner combos with an open order.
+    """
+    rng = rng if rng is not None else np.random.default_rng(44)
     today = pd.Timestamp("2025-09-15")
-    statuses = ["Open", "Partially Fulfilled", "At Risk", "Shipped"]
+    statuses = np.array(["Open", "Partially Fulfilled", "At Risk", "Shipped"])
     status_weights = [0.40, 0.25, 0.15, 0.20]
 
     # Base on recent actuals for realistic sizing
     recent = actuals[actuals["date"] >= today - pd.Timedelta(weeks=4)].groupby(
-        ["product_id", "partner_id"]
+        ["product_id", "partner_id"], observed=True
     ).agg(avg_weekly=("units_ordered", "mean")).reset_index()
 
-    rows = []
-    order_id = 1
-
-    for _, base_row in recent.iterrows():
-        pid    = base_row["product_id"]
-        partid = base_row["partner_id"]
-        avg_wk = base_row["avg_weekly"]
-
-        if avg_wk < 1:
-            continue
-        if np.random.random() < 0.35:
-            continue  # Not every product-partner combo has an open order
-
-        prod_info = products[products["product_id"] == pid].iloc[0]
-
-        placed_days_ago = np.random.randint(1, 28)
-        date_placed = today - pd.Timedelta(days=placed_days_ago)
-        lead_time   = np.random.randint(5, 21)
-        date_req    = date_placed + pd.Timedelta(days=lead_time)
-
-        units_ordered   = max(1, int(round(avg_wk * 2 * np.random.uniform(0.8, 1.3))))
-        status          = np.random.choice(statuses, p=status_weights)
-
-        if status == "Shipped":
-            units_confirmed = units_ordered
-            units_shipped   = units_confirmed
-        elif status == "Partially Fulfilled":
-            units_confirmed = units_ordered
-            units_shipped   = int(units_ordered * np.random.uniform(0.4, 0.8))
-        elif status == "At Risk":
-            units_confirmed = int(units_ordered * np.random.uniform(0.5, 0.9))
-            units_shipped   = 0
-        else:  # Open
-            units_confirmed = int(units_ordered * np.random.uniform(0.7, 1.0))
-            units_shipped   = 0
-
-        # Chase opportunity: sell-through high, WoS low
-        chase = status in ["Open", "Partially Fulfilled"] and np.random.random() < 0.35
-        chase_units = int(units_ordered * np.random.uniform(0.15, 0.40)) if chase else 0
-        chase_rev   = chase_units * prod_info["asp"] if chase else 0.0
-
-        rows.append({
-            "order_id":                f"ORD-{order_id:05d}",
-            "date_placed":             date_placed,
-            "date_requested":          date_req,
-            "product_id":              pid,
-            "partner_id":              partid,
-            "units_ordered":           units_ordered,
-            "units_confirmed":         units_confirmed,
-            "units_shipped":           units_shipped,
-            "status":                  status,
-            "chase_opportunity":       chase,
-            "chase_units_recommended": chase_units,
-            "chase_revenue_potential": round(chase_rev, 2),
-        })
-        order_id += 1
-
-    df = pd.DataFrame(rows)
+    recent = recent[recent["avg_weekly"] >= 1]
+    # Not every product-partner combo has an open order
+    recent = recent[rng.random(len(recent)) < density].reset_index(drop=True)
+    n = len(recent)
+    avg_wk = recent["avg_weekly"].to_numpy()
+
+    date_placed = today - pd.to_timedelta(rng.integers(1, 28, n), unit="D")
+    date_req    = date_placed + pd.to_timedelta(rng.integers(5, 21, n), unit="D")
+
+    units_ordered = np.maximum(1, np.rint(avg_wk * 2 * rng.uniform(0.8, 1.3, n))).astype(np.int64)
+    status = statuses[rng.choice(len(statuses), size=n, p=status_weights)]
+
+    u = rng.random(n)
+    units_confirmed = np.select(
+        [status == "Shipped", status == "Partially Fulfilled", status == "At Risk"],
+        [units_ordered, units_ordered, (units_ordered * (0.5 + 0.4 * u)).astype(np.int64)],
+        default=(units_ordered * (0.7 + 0.3 * u)).astype(np.int64),  # Open
+    )
+    units_shipped = np.select(
+        [status == "Shipped", status == "Partially Fulfilled"],
+        [units_confirmed, (units_ordered * (0.4 + 0.4 * u)).astype(np.int64)],
+        default=0,
+    )
+
+    df = pd.DataFrame({
+        "order_id":                [f"ORD-{i:05d}" for i in range(1, n + 1)],
+        "date_placed":             date_placed,
+        "date_requested":          date_req,
+        "product_id":              recent["product_id"].to_numpy(),
+        "partner_id":              recent["partner_id"].to_numpy(),
+        "units_ordered":           units_ordered,
+        "units_confirmed":         units_confirmed,
+        "units_shipped":           units_shipped,
+        "status":                  status,
+    })
+    # Chase opportunity: sell-through > 85% and WoS < 3 on the latest actuals
+    from src.analytics.chase_engine import ChaseEngine
+    df = ChaseEngine(actuals, products, partners).score(df).drop(columns=["sell_through", "weeks_of_supply"])
     print(f"  ✓ Order book: {len(df):,} orders | "
           f"Chase opportunity: €{df['chase_revenue_potential'].sum()/1e6:.1f}M")
     return df
@@ -583,8 +617,8 @@ def generate_npi_tracker(products: pd.DataFrame, partners: pd.DataFrame) -> pd.D
 # 7. ALERTS
 # ═══════════════════════════════════════════════════════════════════════════════
 def generate_alerts(products: pd.DataFrame, partners: pd.DataFrame,
-                    actuals: pd.DataFrame) -> pd.DataFrame:
-    """Generate business alert feed from demand signals."""
+                    actuals: pd.DataFrame, n_alerts: int = 52) -> pd.DataFrame:
+    """Generate business alert feed from demand signals (52 + 3 scripted by default)."""
     import uuid
     from datetime import datetime
 
@@ -613,8 +647,7 @@ def generate_alerts(products: pd.DataFrame, partners: pd.DataFrame,
     # Get recent actuals for context
     recent = actuals[actuals["date"] >= pd.Timestamp("2025-07-01")]
 
-    # Generate 40-60 alerts
-    n_alerts = 52
+    partner_names = dict(zip(partners["partner_id"], partners["partner_name"]))
     selected_prods   = np.random.choice(products["product_id"].values, n_alerts)
     selected_partners = np.random.choice(partners["partner_id"].values, n_alerts)
 
@@ -624,11 +657,7 @@ def generate_alerts(products: pd.DataFrame, partners: pd.DataFrame,
 
         pid    = selected_prods[i]
         partid = selected_partners[i]
-        pname  = partners[partners["partner_id"] == partid]["partner_name"].values
-        pname  = pname[0] if len(pname) > 0 else "Unknown Partner"
-
-        prod_info = products[products["product_id"] == pid]
-        asp = prod_info["asp"].values[0] if not prod_info.empty else 999
+        pname  = partner_names.get(partid, "Unknown Partner")
 
         # Random metric value that breaches threshold
         if metric in ["weeks_of_supply", "on_time_delivery", "velocity_vs_plan"]:
@@ -716,63 +745,124 @@ def generate_alerts(products: pd.DataFrame, partners: pd.DataFrame,
 # ═══════════════════════════════════════════════════════════════════════════════
 # MAIN
 # ═══════════════════════════════════════════════════════════════════════════════
-def main():
+def parse_args(argv=None):
+    """Scale factors for the generator; defaults reproduce the demo dataset."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Generate the synthetic reseller datasets, optionally at load-test scale.")
+    parser.add_argument("--skus", type=int, default=40,
+                        help="number of SKUs (base catalogue is 40; extra SKUs are variants)")
+    parser.add_argument("--partners", type=int, default=13,
+                        help="number of reseller partners (base network is 13)")
+    parser.add_argument("--weeks", type=int, default=104, help="weeks of demand history")
+    parser.add_argument("--horizon", type=int, default=12, help="forecast horizon in weeks")
+    parser.add_argument("--order-density", type=float, default=0.65,
+                        help="share of active SKU × partner combos with an open order")
+    parser.add_argument("--alerts", type=int, default=52, help="number of generated alerts")
+    parser.add_argument("--chunk-weeks", type=int, default=None,
+                        help="weeks of actuals per streamed chunk (default: sized to memory cap)")
+    parser.add_argument("--format", choices=["both", "parquet", "csv"], default="both",
+                        help="storage format; Parquet is typed and columnar, CSV is the fallback")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out-dir", default=None,
+                        help="root folder for raw/ and processed/ output (default: data/)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    raw_dir, proc_dir = RAW_DIR, PROCESSED_DIR
+    if args.out_dir:
+        raw_dir = os.path.join(args.out_dir, "raw")
+        proc_dir = os.path.join(args.out_dir, "processed")
+        os.makedirs(raw_dir, exist_ok=True)
+        os.makedirs(proc_dir, exist_ok=True)
+
+    formats = ("parquet", "csv") if args.format == "both" else (args.format,)
+    np.random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
+
     print("\n🍎  Apple Demand Planner — Synthetic Data Generator")
     print("=" * 55)
 
     print("\n[1/7] Generating Products...")
-    products = generate_products()
-    products.to_csv(os.path.join(RAW_DIR, "products.csv"), index=False)
+    products = scale_products(generate_products(), args.skus)
+    write_dataset(products, "products", raw_dir, formats)
 
     print("\n[2/7] Generating Reseller Partners...")
-    partners = generate_partners()
-    partners.to_csv(os.path.join(RAW_DIR, "reseller_partners.csv"), index=False)
-
-    print("\n[3/7] Generating Demand Actuals (104 weeks)...")
-    actuals = generate_demand_actuals(products, partners)
-    actuals.to_csv(os.path.join(RAW_DIR, "demand_actuals.csv"), index=False)
-
-    print("\n[4/7] Generating Forecasts (12 weeks forward)...")
-    forecasts = generate_forecasts(products, partners, actuals)
-    forecasts.to_csv(os.path.join(RAW_DIR, "forecasts.csv"), index=False)
+    partners = scale_partners(generate_partners(), args.partners)
+    write_dataset(partners, "reseller_partners", raw_dir, formats)
+
+    # ── Actuals stream straight to disk; only the recent tail stays in memory ──
+    print(f"\n[3/7] Generating Demand Actuals ({args.weeks} weeks)...")
+    tail_cutoff = pd.Timestamp("2025-09-15") - pd.Timedelta(weeks=8)
+    prod_dims = products[["product_id","product_family","lifecycle_stage","priority_tier","asp"]]
+    part_dims = partners[["partner_id","partner_name","partner_tier","country"]]
+    id_categories = {"product_id": sorted(products["product_id"]),
+                     "partner_id": sorted(partners["partner_id"])}
+    actuals_out = DatasetWriter("demand_actuals", raw_dir, formats, dict(id_categories))
+    features_out = DatasetWriter("demand_features", proc_dir, formats, dict(id_categories))
+    n_actuals, total_rev, n_weeks_seen, tail = 0, 0.0, 0, []
+    chunks = iter_demand_actuals(products, partners, n_weeks=args.weeks, rng=rng,
+                                 chunk_weeks=args.chunk_weeks)
+    for chunk in chunks:
+        actuals_out.write(chunk)
+        # Demand features (processed)
+        features_out.write(chunk.merge(prod_dims, on="product_id").merge(part_dims, on="partner_id"))
+
+        n_actuals += len(chunk)
+        total_rev += chunk["revenue"].sum()
+        n_weeks_seen += chunk["date"].nunique()
+        tail.append(chunk[chunk["date"] >= tail_cutoff])
+        print(f"    … {n_actuals:,} rows written")
+    actuals_out.close()
+    features_out.close()
+    actuals = pd.concat(tail, ignore_index=True)
+    print(f"  ✓ Demand actuals: {n_actuals:,} rows | {n_weeks_seen} weeks | Total revenue €{total_rev/1e9:.2f}B")
+
+    print(f"\n[4/7] Generating Forecasts ({args.horizon} weeks forward)...")
+    forecasts_out = DatasetWriter("forecasts", raw_dir, formats, dict(id_categories))
+    results_out = DatasetWriter("forecast_results", proc_dir, formats, dict(id_categories))
+    n_forecasts = 0
+    for chunk in iter_forecasts(actuals, horizon=args.horizon, rng=rng):
+        forecasts_out.write(chunk)
+        # Forecast results (Ensemble only)
+        results_out.write(chunk[chunk["forecast_model"] == "Ensemble"])
+        n_forecasts += len(chunk)
+    forecasts_out.close()
+    results_out.close()
+    print(f"  ✓ Forecasts: {n_forecasts:,} rows | {len(FORECAST_MODEL_ACCURACY)} models | "
+          f"{args.horizon} weeks forward")
 
     print("\n[5/7] Generating Order Book...")
-    order_book = generate_order_book(products, partners, actuals)
-    order_book.to_csv(os.path.join(RAW_DIR, "order_book.csv"), index=False)
+    order_book = generate_order_book(products, partners, actuals,
+                                     density=args.order_density, rng=rng)
+    write_dataset(order_book, "order_book", raw_dir, formats)
 
     print("\n[6/7] Generating NPI Tracker...")
     npi = generate_npi_tracker(products, partners)
-    npi.to_csv(os.path.join(RAW_DIR, "npi_tracker.csv"), index=False)
+    write_dataset(npi, "npi_tracker", raw_dir, formats)
 
     print("\n[7/7] Generating Alerts...")
-    alerts = generate_alerts(products, partners, actuals)
-    alerts.to_csv(os.path.join(RAW_DIR, "alerts.csv"), index=False)
+    alerts = generate_alerts(products, partners, actuals, n_alerts=args.alerts)
+    write_dataset(alerts, "alerts", raw_dir, formats)
 
     # ── Processed summaries ────────────────────────────────────────────────────
     print("\n📊  Generating processed summaries...")
 
-    # Demand features
-    feat = actuals.merge(products[["product_id","product_family","lifecycle_stage","priority_tier","asp"]], on="product_id")
-    feat = feat.merge(partners[["partner_id","partner_name","partner_tier","country"]], on="partner_id")
-    feat.to_csv(os.path.join(PROCESSED_DIR, "demand_features.csv"), index=False)
-
-    # Forecast results (Ensemble only)
-    ens = forecasts[forecasts["forecast_model"] == "Ensemble"].copy()
-    ens.to_csv(os.path.join(PROCESSED_DIR, "forecast_results.csv"), index=False)
-
     # Alert summary
     alert_summary = alerts.groupby(["severity","alert_type"]).agg(
         count=("alert_id","count"),
         total_revenue_impact=("revenue_impact","sum"),
         open_count=("status", lambda x: (x=="Open").sum())
     ).reset_index()
-    alert_summary.to_csv(os.path.join(PROCESSED_DIR, "alert_summary.csv"), index=False)
+    write_dataset(alert_summary, "alert_summary", proc_dir, formats)
 
     print("\n✅  All datasets generated successfully!")
-    print(f"    Raw data: {RAW_DIR}")
-    print(f"    Processed: {PROCESSED_DIR}")
+    print(f"    Raw data: {raw_dir}")
+    print(f"    Processed: {proc_dir}")
     print("\n" + "=" * 55)
-    print(f"    Total rows generated: {len(products)+len(partners)+len(actuals)+len(forecasts)+len(order_book)+len(npi)+len(alerts):,}")
+    print(f"    Total rows generated: {len(products)+len(partners)+n_actuals+n_forecasts+len(order_book)+len(npi)+len(alerts):,}")
 
 
 if __name__ == "__main__":
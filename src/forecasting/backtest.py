@@ -0,0 +1,231 @@
+"""
+Backtest — Expanding-window cross-validation for every forecasting model.
+Folds × series blocks are fitted in parallel; results are cached on disk per
+data version and summarised into per-model and per-family accuracy tables.
+Author: Mohammed Kaif Ahmed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from src.forecasting.engine import series_matrix, forecast_series, _init_worker, SERIES_PER_TASK
+from src.utils.fact_table import attach_dims
+from src.utils.helpers import PROC_DIR
+from src.utils.storage import read_dataset, resolve_dataset, write_dataset
+
+MODELS = ("ARIMA", "Prophet", "RF", "Ensemble")
+META_FILE = "backtest_meta.json"
+TABLES = ("backtest_forecasts", "backtest_by_model", "backtest_by_family")
+
+
+# ─── Folds ────────────────────────────────────────────────────────────────────
+def fold_origins(n_weeks: int, n_folds: int = 4, horizon: int = 4, step: int = 4) -> list:
+    """
+    Week indices where each fold's forecast starts. Fold k trains on weeks
+    [0, origin_k) and is scored on [origin_k, origin_k + horizon); the last fold
+    ends on the final week.
+    """
+    last = n_weeks - horizon
+    return [last - step * k for k in reversed(range(n_folds)) if last - step * k > 0]
+
+
+def _backtest_chunk(task: tuple) -> tuple:
+    """Worker entry point: one fold × block of series."""
+    fold, origin, series_ids, units, dates, horizon, models = task
+    point = np.zeros((len(series_ids), horizon, len(models)))
+    for i, y in enumerate(units):
+        res = forecast_series(y[:origin], dates[:origin], horizon, models)
+        for j, m in enumerate(models):
+            point[i, :, j] = res[m][0]
+    return fold, series_ids, point
+
+
+def run_backtest(actuals: pd.DataFrame, n_folds: int = 4, horizon: int = 4, step: int = 4,
+                 models: tuple = MODELS, workers: int = None,
+                 series_per_task: int = SERIES_PER_TASK) -> pd.DataFrame:
+    """
+    Run every fold for every series and model.
+    Returns one row per fold × series × week × model with forecast and actual units.
+    """
+    models = list(models)
+    keys, dates, units = series_matrix(actuals)
+    origins = fold_origins(len(dates), n_folds, horizon, step)
+    n_series = len(keys)
+    tasks = [(f, origin, np.arange(s, min(s + series_per_task, n_series)),
+              units[s:s + series_per_task], dates, horizon, models)
+             for f, origin in enumerate(origins)
+             for s in range(0, n_series, series_per_task)]
+
+    point = np.zeros((len(origins), n_series, horizon, len(models)))
+
+    def collect(results):
+        for fold, ids, p in results:
+            point[fold, ids] = p
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            collect(map(_backtest_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            collect(pool.map(_backtest_chunk, tasks))
+
+    # Long format: fold × series × week × model
+    n_f, n_m = len(origins), len(models)
+    week_pos = np.array(origins)[:, None] + np.arange(horizon)                     # (fold, h)
+    actual = units[:, week_pos].transpose(1, 0, 2)                                 # (fold, series, h)
+    shape = (n_f, n_series, horizon, n_m)
+    fold_idx, series_idx, h_idx, m_idx = np.indices(shape).reshape(4, -1)
+    return pd.DataFrame({
+        "fold":           fold_idx.astype(np.int32),
+        "origin":         dates[np.array(origins)[fold_idx]],
+        "date":           dates[week_pos[fold_idx, h_idx]],
+        "product_id":     keys["product_id"].to_numpy()[series_idx],
+        "partner_id":     keys["partner_id"].to_numpy()[series_idx],
+        "forecast_model": np.asarray(models)[m_idx],
+        "forecast_units": np.rint(point.ravel()),
+        "actual_units":   np.broadcast_to(actual[..., None], shape).ravel(),
+    })
+
+
+# ─── Accuracy tables ──────────────────────────────────────────────────────────
+def accuracy_table(bt: pd.DataFrame, by: list) -> pd.DataFrame:
+    """WMAPE / MAPE / bias / accuracy (all %) grouped by `by`, in one grouped pass."""
+    err = bt["forecast_units"] - bt["actual_units"]
+    nz = bt["actual_units"] > 0
+    frame = pd.DataFrame({
+        **{c: bt[c] for c in by},
+        "abs_err": err.abs(), "err": err, "actual": bt["actual_units"],
+        "ape": (err.abs() / bt["actual_units"]).where(nz),
+    })
+    g = frame.groupby(by, observed=True).agg(
+        abs_err=("abs_err", "sum"), err=("err", "mean"), actual=("actual", "sum"),
+        actual_mean=("actual", "mean"), mape=("ape", "mean"), n=("actual", "size"))
+    out = pd.DataFrame({
+        "wmape": g["abs_err"] / g["actual"].clip(lower=1) * 100,
+        "mape":  g["mape"] * 100,
+        "bias":  g["err"] / g["actual_mean"].clip(lower=1e-9) * 100,
+        "n":     g["n"],
+    })
+    out["accuracy"] = 100 - out["wmape"]
+    return out.round(2).reset_index()
+
+
+def backtest_metrics(bt: pd.DataFrame, products: pd.DataFrame) -> dict:
+    """Per-model and per-model × family accuracy tables."""
+    enriched = attach_dims(bt, products, product_cols=["product_family"])
+    return {
+        "backtest_by_model":  accuracy_table(enriched, ["forecast_model"]),
+        "backtest_by_family": accuracy_table(enriched, ["forecast_model", "product_family"]),
+    }
+
+
+# ─── Cached entry point ───────────────────────────────────────────────────────
+def cache_key(data_version, **config) -> str:
+    payload = json.dumps({"data": data_version, "config": config}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_or_run(raw_dir: str = None, out_dir: str = None, force: bool = False,
+                formats: tuple = ("parquet", "csv"), **config) -> dict:
+    """
+    Return backtest tables for the current data version, running the backtest
+    only when the actuals/products files or the config changed since the last run.
+    Tables go to `out_dir`, by default the processed folder next to the raw folder.
+    """
+    from src.utils.data_store import DataStore
+
+    store = DataStore(folder=raw_dir)
+    out_dir = out_dir or os.path.join(os.path.dirname(os.path.abspath(store.folder)), "processed")
+    config = {"n_folds": 4, "horizon": 4, "step": 4, "models": list(MODELS), **config}
+    key = cache_key(store.version("actuals", "products"),
+                    **{k: v for k, v in config.items() if k != "workers"})
+
+    meta_path = os.path.join(out_dir, META_FILE)
+    if not force and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            if json.load(f).get("key") == key:
+                return {name: read_dataset(name, out_dir) for name in TABLES}
+
+    bt = run_backtest(store.get("actuals", ["date", "product_id", "partner_id", "units_sold"]),
+                      **config)
+    tables = {"backtest_forecasts": bt, **backtest_metrics(bt, store.get("products"))}
+    os.makedirs(out_dir, exist_ok=True)
+    for name, df in tables.items():
+        write_dataset(df, name, out_dir, formats=formats)
+    with open(meta_path, "w") as f:
+        json.dump({"key": key, "config": config, "created": time.time()}, f, indent=2)
+    return tables
+
+
+_TABLE_CACHE = {}
+
+
+def backtest_version(name: str = "backtest_by_model", folder: str = PROC_DIR):
+    """(path, mtime) of a stored backtest table, or None when it does not exist."""
+    try:
+        path = resolve_dataset(name, folder)
+    except FileNotFoundError:
+        return None
+    return (path, os.stat(path).st_mtime_ns)
+
+
+def load_backtest_table(name: str = "backtest_by_model", folder: str = PROC_DIR):
+    """
+    Read a stored backtest table for the dashboard, or None when no backtest
+    has been run. Re-read only when the file changes.
+    """
+    sig = backtest_version(name, folder)
+    if sig is None:
+        return None
+    if _TABLE_CACHE.get(name, (None,))[0] != sig:
+        _TABLE_CACHE[name] = (sig, read_dataset(name, folder))
+    return _TABLE_CACHE[name][1]
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Expanding-window backtest of ARIMA / Prophet / RF / Ensemble.")
+    parser.add_argument("--folds", type=int, default=4, help="Number of folds (default 4)")
+    parser.add_argument("--horizon", type=int, default=4, help="Weeks scored per fold (default 4)")
+    parser.add_argument("--step", type=int, default=4, help="Weeks between fold origins (default 4)")
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: all CPU cores)")
+    parser.add_argument("--raw-dir", default=None, help="Raw data directory")
+    parser.add_argument("--out-dir", default=None,
+                        help="Where backtest tables are written "
+                             "(default: the processed folder next to the raw directory)")
+    parser.add_argument("--force", action="store_true", help="Ignore the cached result")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("\n🧪 Apple Reseller Channel — Forecast Backtest")
+    print("=" * 55)
+    t0 = time.perf_counter()
+    tables = load_or_run(raw_dir=args.raw_dir, out_dir=args.out_dir, force=args.force,
+                         n_folds=args.folds, horizon=args.horizon, step=args.step,
+                         models=args.models, workers=args.workers)
+    print(f"  ✓ {len(tables['backtest_forecasts']):,} backtest rows in "
+          f"{time.perf_counter() - t0:.1f}s\n")
+    print(tables["backtest_by_model"].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
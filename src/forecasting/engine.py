@@ -0,0 +1,312 @@
+"""
+Forecasting Engine — Batch per-series forecasting across the SKU × partner grid.
+Series are fitted in parallel worker processes and written in the forecasts schema.
+Author: Mohammed Kaif Ahmed
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:  # ships with scikit-learn
+    threadpool_limits = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BASE_DIR)
+
+from src.forecasting.features import series_positions
+from src.forecasting.models import MODEL_FUNCS, naive_forecast
+from src.forecasting.reconciliation import AGGREGATES_META, LEVELS, NODE_COLUMNS
+from src.utils.fact_table import attach_dims
+
+
+MIN_HISTORY = 16          # shorter series get the naive forecast for every model
+HOLDOUT_WEEKS = 8         # trailing weeks held out to score each model
+SERIES_PER_TASK = 16      # series per worker task (amortises process overhead)
+# Hierarchy levels forecast from their own history as MinT base forecasts
+AGGREGATE_LEVELS = ["total", "family", "country", "partner"]
+
+
+# ─── Series extraction ────────────────────────────────────────────────────────
+def series_matrix(actuals: pd.DataFrame) -> tuple:
+    """
+    Pivot actuals to a dense (series × week) units matrix in one pass.
+    Missing weeks are zero demand. Returns (keys frame, week dates, matrix).
+    """
+    keys, weeks, sid, week_idx = series_positions(actuals)
+    units = np.zeros((len(keys), len(weeks)), dtype=np.float64)
+    np.add.at(units, (sid, week_idx), actuals["units_sold"].to_numpy(dtype=float))
+    return keys, weeks, units
+
+
+# ─── Per-series fitting (runs in worker processes) ────────────────────────────
+def _mape(actual: np.ndarray, pred: np.ndarray) -> float:
+    nz = actual > 0
+    if not nz.any():
+        return np.nan
+    return float(np.mean(np.abs(pred[nz] - actual[nz]) / actual[nz]))
+
+
+def _wmape(actual: np.ndarray, pred: np.ndarray) -> float:
+    return float(np.abs(pred - actual).sum() / max(1.0, actual.sum()))
+
+
+def forecast_series(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int,
+                    models: list) -> dict:
+    """
+    Fit every model on one series.
+    Each model is scored on the trailing holdout, then refit on full history.
+    The Ensemble averages the base models weighted by inverse holdout WMAPE.
+    Returns {model: (point, lower, upper, mape)}.
+    """
+    # Drop leading zeros (pre-launch / pre-ranging weeks)
+    nz = np.flatnonzero(y > 0)
+    start = nz[0] if len(nz) else len(y)
+    y, dates = y[start:], dates[start:]
+
+    base = [m for m in models if m != "Ensemble"]
+    out, holdout_preds, wmapes = {}, {}, {}
+    short = len(y) < MIN_HISTORY
+    hold = min(HOLDOUT_WEEKS, max(1, len(y) // 4))
+    actual_hold = y[-hold:]
+
+    for name in base:
+        func = naive_forecast if short else MODEL_FUNCS[name]
+        try:
+            hold_pred = func(y[:-hold], dates[:-hold], hold)[0] if len(y) > hold else np.zeros(hold)
+            point, lower, upper = func(y, dates, horizon)
+        except Exception:  # a failed fit must not sink the batch
+            hold_pred = naive_forecast(y[:-hold], dates[:-hold], hold)[0]
+            point, lower, upper = naive_forecast(y, dates, horizon)
+        holdout_preds[name] = hold_pred
+        wmapes[name] = _wmape(actual_hold, hold_pred)
+        out[name] = (point, lower, upper, _mape(actual_hold, hold_pred))
+
+    if "Ensemble" in models and base:
+        w = np.array([1.0 / max(wmapes[m], 1e-3) for m in base])
+        w /= w.sum()
+        stack = lambda i: np.tensordot(w, np.array([out[m][i] for m in base]), axes=1)
+        ens_hold = np.tensordot(w, np.array([holdout_preds[m] for m in base]), axes=1)
+        out["Ensemble"] = (stack(0), stack(1), stack(2), _mape(actual_hold, ens_hold))
+    return out
+
+
+def _init_worker() -> None:
+    warnings.simplefilter("ignore")
+    # One BLAS / OpenMP thread per worker; parallelism comes from the pool.
+    # Limits the already-loaded libraries (env vars are only read at load time).
+    if threadpool_limits is not None:
+        threadpool_limits(1)
+
+
+def _fit_chunk(task: tuple) -> tuple:
+    """Worker entry point: forecast a block of series, return stacked arrays."""
+    series_ids, units, dates, horizon, models = task
+    n_models = len(models)
+    point = np.zeros((len(series_ids), horizon, n_models))
+    lower, upper = np.zeros_like(point), np.zeros_like(point)
+    mape = np.full((len(series_ids), n_models), np.nan)
+    for i, y in enumerate(units):
+        res = forecast_series(y, dates, horizon, models)
+        for j, m in enumerate(models):
+            point[i, :, j], lower[i, :, j], upper[i, :, j], mape[i, j] = res[m]
+    return series_ids, point, lower, upper, mape
+
+
+# ─── Batch driver ─────────────────────────────────────────────────────────────
+def fit_matrix(units: np.ndarray, dates: pd.DatetimeIndex, horizon: int = 12,
+               models: list = ("ARIMA", "Prophet", "RF", "Ensemble"),
+               workers: int = None, series_per_task: int = SERIES_PER_TASK) -> tuple:
+    """
+    Forecast every row of a (series × week) units matrix.
+    Returns (point, lower, upper) as (series × horizon × model) arrays and
+    the holdout MAPE as (series × model).
+    """
+    models = list(models)
+    n_series, n_models = len(units), len(models)
+    tasks = [(np.arange(s, min(s + series_per_task, n_series)),
+              units[s:s + series_per_task], dates, horizon, models)
+             for s in range(0, n_series, series_per_task)]
+
+    point = np.zeros((n_series, horizon, n_models))
+    lower, upper = np.zeros_like(point), np.zeros_like(point)
+    mape = np.full((n_series, n_models), np.nan)
+
+    def collect(results):
+        for ids, p, lo, up, mp in results:
+            point[ids], lower[ids], upper[ids], mape[ids] = p, lo, up, mp
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            collect(map(_fit_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            collect(pool.map(_fit_chunk, tasks))
+    return point, lower, upper, mape
+
+
+def _forecast_frame(keys: pd.DataFrame, dates: pd.DatetimeIndex, models: list,
+                    point, lower, upper, mape) -> pd.DataFrame:
+    """Long forecasts-schema frame: one row per key × week × model."""
+    n_series, horizon, n_models = point.shape
+    forecast_weeks = dates[-1] + pd.to_timedelta(7 * np.arange(1, horizon + 1), unit="D")
+    cells = n_series * horizon * n_models
+    return pd.DataFrame({
+        "date":                np.tile(np.repeat(forecast_weeks.to_numpy(), n_models), n_series),
+        **{col: np.repeat(keys[col].to_numpy(), horizon * n_models) for col in keys.columns},
+        "forecast_units":      np.rint(point).astype(np.int64).reshape(cells),
+        "forecast_lower":      np.rint(lower).astype(np.int64).reshape(cells),
+        "forecast_upper":      np.rint(upper).astype(np.int64).reshape(cells),
+        "forecast_model":      np.tile(models, n_series * horizon),
+        "forecast_accuracy_mape": np.round(np.repeat(mape, horizon, axis=0).reshape(cells), 4),
+    })
+
+
+def run_forecasts(actuals: pd.DataFrame, horizon: int = 12,
+                  models: list = ("ARIMA", "Prophet", "RF", "Ensemble"),
+                  workers: int = None, series_per_task: int = SERIES_PER_TASK) -> pd.DataFrame:
+    """
+    Forecast every product × partner series in `actuals`.
+    Returns a frame in the forecasts.csv schema, one row per series × week × model.
+    """
+    models = list(models)
+    keys, dates, units = series_matrix(actuals)
+    fitted = fit_matrix(units, dates, horizon, models, workers, series_per_task)
+    return _forecast_frame(keys[["product_id", "partner_id"]], dates, models, *fitted)
+
+
+def run_aggregate_forecasts(actuals: pd.DataFrame, products: pd.DataFrame,
+                            partners: pd.DataFrame, levels: list = AGGREGATE_LEVELS,
+                            horizon: int = 12,
+                            models: list = ("ARIMA", "Prophet", "RF", "Ensemble"),
+                            workers: int = None) -> pd.DataFrame:
+    """
+    Forecast aggregate hierarchy nodes (e.g. each family, each partner) from their
+    own summed history. These are the independent base forecasts MinT reconciles
+    against (reconciliation.ForecastHierarchy); output is the forecasts schema
+    with `level` and the node's key columns in place of product / partner.
+    """
+    models = list(models)
+    facts = attach_dims(actuals, products, partners, ["product_family"], ["country"])
+    weeks = np.sort(facts["date"].unique())
+    week_idx = np.searchsorted(weeks, facts["date"].to_numpy())
+    sold = facts["units_sold"].to_numpy(dtype=float)
+
+    key_frames, matrices = [], []
+    for level in levels:
+        cols = list(LEVELS[level])
+        if cols:
+            grouped = facts.groupby(cols, observed=True, sort=True)
+            node = grouped.ngroup().to_numpy()
+            keys = grouped.size().reset_index()[cols]
+        else:
+            node, keys = np.zeros(len(facts), dtype=np.int64), pd.DataFrame(index=[0])
+        units = np.zeros((len(keys), len(weeks)))
+        np.add.at(units, (node, week_idx), sold)
+        keys.insert(0, "level", level)
+        key_frames.append(keys)
+        matrices.append(units)
+
+    keys = pd.concat(key_frames, ignore_index=True)
+    for col in NODE_COLUMNS:
+        keys[col] = keys[col].astype(object) if col in keys else np.nan
+    dates = pd.DatetimeIndex(weeks)
+    fitted = fit_matrix(np.vstack(matrices), dates, horizon, models, workers,
+                        series_per_task=1)
+    return _forecast_frame(keys[["level"] + NODE_COLUMNS], dates, models, *fitted)
+
+
+# ─── CLI ──────────────────────────────────────────────────────────────────────
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fit ARIMA / Prophet / RF / Ensemble per SKU × partner and "
+                    "write forecasts in the forecasts.csv schema.")
+    parser.add_argument("--horizon", type=int, default=12, help="Weeks forward (default 12)")
+    parser.add_argument("--models", nargs="+", default=["ARIMA", "Prophet", "RF", "Ensemble"],
+                        choices=list(MODEL_FUNCS) + ["Ensemble"], help="Models to fit")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: all CPU cores)")
+    parser.add_argument("--series-per-task", type=int, default=SERIES_PER_TASK,
+                        help="Series fitted per worker task")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Forecast only the first N series (smoke runs: needs --out-dir; "
+                             "raw forecasts and aggregate base forecasts are not written)")
+    parser.add_argument("--format", choices=["both", "parquet", "csv"], default="both",
+                        help="Output format(s) (default both)")
+    parser.add_argument("--raw-dir", default=None, help="Input/output raw data directory")
+    parser.add_argument("--out-dir", default=None,
+                        help="Where forecast_results / forecast_aggregates are written "
+                             "(default: the processed folder next to the raw directory)")
+    parser.add_argument("--levels", nargs="*", default=AGGREGATE_LEVELS,
+                        choices=[lv for lv in LEVELS if lv != "series"],
+                        help="Aggregate levels forecast as MinT base forecasts "
+                             "(default: %(default)s; pass none to skip)")
+    args = parser.parse_args(argv)
+    if args.limit and not args.out_dir:
+        parser.error("--limit writes truncated forecasts; pass --out-dir for them")
+    return args
+
+
+def main(argv=None):
+    from src.utils.helpers import RAW_DIR
+    from src.utils.storage import dataset_signature, read_dataset, write_dataset
+
+    args = parse_args(argv)
+    raw_dir = args.raw_dir or RAW_DIR
+    out_dir = args.out_dir or os.path.join(os.path.dirname(os.path.abspath(raw_dir)), "processed")
+    formats = ("parquet", "csv") if args.format == "both" else (args.format,)
+
+    print("\n📈 Apple Reseller Channel — Forecasting Engine")
+    print("=" * 55)
+    actuals = read_dataset("demand_actuals", raw_dir,
+                           ["date", "product_id", "partner_id", "units_sold"], parse_dates=["date"])
+    if args.limit:
+        keep = actuals.groupby(["product_id", "partner_id"], observed=True).ngroup() < args.limit
+        actuals = actuals[keep]
+
+    t0 = time.perf_counter()
+    fc = run_forecasts(actuals, horizon=args.horizon, models=args.models,
+                       workers=args.workers, series_per_task=args.series_per_task)
+    n_series = len(fc) // (args.horizon * len(args.models))
+    print(f"  ✓ Forecasts: {len(fc):,} rows | {n_series:,} series | "
+          f"{len(args.models)} models | {time.perf_counter() - t0:.1f}s")
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_dataset(fc[fc["forecast_model"] == "Ensemble"], "forecast_results", out_dir,
+                  formats=formats)
+    if args.limit:
+        # A partial run must not replace the dashboard's forecasts or skew MinT
+        print(f"  ✓ Smoke run ({args.limit:,} series) written to {out_dir} only")
+        return
+    write_dataset(fc, "forecasts", raw_dir, formats=formats)
+
+    if args.levels:
+        t0 = time.perf_counter()
+        agg = run_aggregate_forecasts(actuals, read_dataset("products", raw_dir),
+                                      read_dataset("reseller_partners", raw_dir),
+                                      levels=args.levels, horizon=args.horizon,
+                                      models=args.models, workers=args.workers)
+        agg = agg[agg["forecast_model"] == "Ensemble"]
+        write_dataset(agg, "forecast_aggregates", out_dir, formats=formats)
+        # MinT only blends these rows into the forecasts file written alongside them
+        with open(os.path.join(out_dir, AGGREGATES_META), "w") as f:
+            json.dump({"forecasts": list(dataset_signature("forecasts", raw_dir)[1:]),
+                       "levels": args.levels, "created": time.time()}, f, indent=2)
+        print(f"  ✓ Aggregate base forecasts: {len(agg) // args.horizon:,} nodes "
+              f"({', '.join(args.levels)}) | {time.perf_counter() - t0:.1f}s")
+    print(f"  ✓ Written to {raw_dir} and {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
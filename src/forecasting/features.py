@@ -0,0 +1,146 @@
+"""
+Features — Lag / rolling / calendar / NPI feature matrix for ML forecasting.
+All SKU × partner series are built in one vectorized pass over a dense
+(series × week) grid; features are float32. The Random Forest forecaster
+reads the same definitions for one series at a time (series_features).
+Author: Mohammed Kaif Ahmed
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.fact_table import surrogate_keys
+
+
+LAGS = [1, 2, 4, 8, 12]
+ROLLING_WINDOWS = [4, 8, 12]
+
+# Retail calendar windows (ISO week numbers), as used by the data generator
+HOLIDAY_WEEKS = (47, 52)
+LAUNCH_WEEKS = (37, 43)
+BACK_TO_SCHOOL_WEEKS = (33, 37)
+NPI_RAMP_WEEKS = 13
+
+CALENDAR_FEATURES = ["week_of_year", "month", "quarter", "week_sin", "week_cos",
+                     "is_holiday_season", "is_launch_window", "is_back_to_school"]
+NPI_FEATURES = ["is_npi", "weeks_since_launch", "is_npi_ramp", "product_family_code"]
+FEATURE_COLUMNS = ([f"lag_{k}" for k in LAGS]
+                   + [f"roll_mean_{w}" for w in ROLLING_WINDOWS]
+                   + ["roll_std_8"] + CALENDAR_FEATURES + NPI_FEATURES)
+
+
+def series_positions(actuals: pd.DataFrame) -> tuple:
+    """
+    Locate every actuals row on the dense grid.
+    Returns (keys frame, sorted week dates, series index per row, week index per row).
+    """
+    weeks = np.sort(actuals["date"].unique())
+    week_idx = np.searchsorted(weeks, actuals["date"].to_numpy())
+    grouped = actuals.groupby(["product_id", "partner_id"], observed=True, sort=True)
+    sid = grouped.ngroup().to_numpy()
+    keys = grouped.size().reset_index()[["product_id", "partner_id"]]
+    return keys, pd.DatetimeIndex(weeks), sid, week_idx
+
+
+def _lag_at(grid: np.ndarray, sid: np.ndarray, week_idx: np.ndarray, k: int) -> np.ndarray:
+    """Value `k` weeks before each row's week (NaN before the grid starts)."""
+    src = week_idx - k
+    return np.where(src >= 0, grid[sid, np.maximum(src, 0)], np.nan)
+
+
+def _window_mean_at(csum: np.ndarray, sid: np.ndarray, week_idx: np.ndarray, w: int) -> np.ndarray:
+    """Mean of the `w` weeks before each row's week, from prefix sums (NaN until w weeks exist)."""
+    lo = week_idx - w
+    total = csum[sid, week_idx] - csum[sid, np.maximum(lo, 0)]
+    return np.where(lo >= 0, total / w, np.nan)
+
+
+def calendar_features(dates: pd.DatetimeIndex) -> dict:
+    """Week-level calendar and season flags."""
+    wk = dates.isocalendar()["week"].to_numpy(dtype=int)
+    angle = 2 * np.pi * wk / 52.0
+    return {
+        "week_of_year":      wk,
+        "month":             dates.month.to_numpy(),
+        "quarter":           dates.quarter.to_numpy(),
+        "week_sin":          np.sin(angle),
+        "week_cos":          np.cos(angle),
+        "is_holiday_season": (wk >= HOLIDAY_WEEKS[0]) & (wk <= HOLIDAY_WEEKS[1]),
+        "is_launch_window":  (wk >= LAUNCH_WEEKS[0]) & (wk <= LAUNCH_WEEKS[1]),
+        "is_back_to_school": (wk >= BACK_TO_SCHOOL_WEEKS[0]) & (wk <= BACK_TO_SCHOOL_WEEKS[1]),
+    }
+
+
+def _history_features(grid: np.ndarray, weeks: pd.DatetimeIndex,
+                      sid: np.ndarray, week_idx: np.ndarray) -> dict:
+    """
+    Lag, rolling and calendar features at (series, week) positions of a dense grid.
+    A position may sit one week past the grid (the next forecast step) when
+    `weeks` covers it.
+    """
+    csum = np.zeros((grid.shape[0], grid.shape[1] + 1))
+    np.cumsum(grid, axis=1, out=csum[:, 1:])
+    csq = np.zeros_like(csum)
+    np.cumsum(grid ** 2, axis=1, out=csq[:, 1:])
+
+    feats = {f"lag_{k}": _lag_at(grid, sid, week_idx, k) for k in LAGS}
+    for w in ROLLING_WINDOWS:
+        feats[f"roll_mean_{w}"] = _window_mean_at(csum, sid, week_idx, w)
+    mean8 = feats["roll_mean_8"]
+    sq8 = _window_mean_at(csq, sid, week_idx, 8)
+    feats["roll_std_8"] = np.sqrt(np.maximum(sq8 - mean8 ** 2, 0) * 8 / 7)
+
+    for name, values in calendar_features(weeks).items():
+        feats[name] = np.asarray(values)[week_idx]
+    return feats
+
+
+def series_features(y: np.ndarray, dates: pd.DatetimeIndex, positions: np.ndarray,
+                    columns: list) -> np.ndarray:
+    """
+    Features of one series at the given week positions, as a (positions × columns)
+    float64 matrix. Same definitions as build_features; `dates` must extend to the
+    last position (one week past `y` for a forecast step).
+    """
+    positions = np.asarray(positions)
+    feats = _history_features(np.asarray(y, dtype=np.float64)[None, :], dates,
+                              np.zeros(len(positions), dtype=np.intp), positions)
+    return np.column_stack([np.asarray(feats[c], dtype=np.float64) for c in columns])
+
+
+def build_features(actuals: pd.DataFrame, products: pd.DataFrame = None,
+                   target: str = "units_sold") -> pd.DataFrame:
+    """
+    Feature matrix, one row per actuals row.
+    Lags and rolling stats only look at earlier weeks of the same series;
+    weeks missing from actuals count as zero demand. `products` adds the NPI
+    and family features (NaN when omitted).
+    """
+    keys, weeks, sid, week_idx = series_positions(actuals)
+    y = actuals[target].to_numpy(dtype=np.float64)
+
+    grid = np.zeros((len(keys), len(weeks)))
+    np.add.at(grid, (sid, week_idx), y)
+    feats = _history_features(grid, weeks, sid, week_idx)
+
+    if products is not None:
+        pkey = surrogate_keys(actuals["product_id"], products["product_id"])
+        known = pkey >= 0
+        take = lambda arr: np.where(known, np.asarray(arr, dtype=float)[pkey], np.nan)
+        launch = products["launch_date"].to_numpy().astype("datetime64[D]")
+        days = (weeks.to_numpy().astype("datetime64[D]")[week_idx]
+                - launch[pkey]).astype(float)
+        since = np.where(known, np.maximum(days // 7, 0), np.nan)
+        feats["is_npi"] = take(products["is_npi"])
+        feats["weeks_since_launch"] = since
+        feats["is_npi_ramp"] = np.where(known, (feats["is_npi"] > 0) & (since < NPI_RAMP_WEEKS), np.nan)
+        feats["product_family_code"] = take(pd.Categorical(products["product_family"]).codes)
+    else:
+        for name in NPI_FEATURES:
+            feats[name] = np.full(len(actuals), np.nan)
+
+    out = actuals[["date", "product_id", "partner_id"]].copy()
+    out[target] = y.astype(np.float32)
+    for name in FEATURE_COLUMNS:
+        out[name] = np.asarray(feats[name], dtype=np.float32)
+    return out
@@ -0,0 +1,117 @@
+"""
+Forecasting Models — Per-series ARIMA, Prophet and Random Forest forecasters.
+Each returns (point, lower, upper) arrays for an 80% interval. Model libraries
+are imported lazily so the dashboard never pays for them.
+Author: Mohammed Kaif Ahmed
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.forecasting.features import LAGS, series_features
+
+
+INTERVAL_ALPHA = 0.2                       # 80% prediction intervals
+ARIMA_ORDERS = [(0, 1, 1), (1, 1, 1), (2, 1, 1)]
+# Random Forest inputs: columns of the shared feature matrix (features.py)
+RF_FEATURES = ([f"lag_{k}" for k in LAGS] + ["roll_mean_4", "roll_mean_8"]
+               + ["week_sin", "week_cos"])
+
+
+def _clip(point, lower, upper) -> tuple:
+    point = np.maximum(0, np.asarray(point, dtype=float))
+    lower = np.clip(np.asarray(lower, dtype=float), 0, point)
+    upper = np.maximum(np.asarray(upper, dtype=float), point)
+    return point, lower, upper
+
+
+# ─── Baseline ─────────────────────────────────────────────────────────────────
+def naive_forecast(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int) -> tuple:
+    """Trailing 8-week mean with a ±1.28σ band. Fallback for short or failed fits."""
+    recent = y[-8:] if len(y) else np.zeros(1)
+    mean, std = recent.mean(), recent.std(ddof=1) if len(recent) > 1 else 0.0
+    point = np.full(horizon, mean)
+    return _clip(point, point - 1.28 * std, point + 1.28 * std)
+
+
+# ─── ARIMA ────────────────────────────────────────────────────────────────────
+def arima_forecast(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int) -> tuple:
+    """Non-seasonal ARIMA, order chosen by AIC over a small grid."""
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    best = None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for order in ARIMA_ORDERS:
+            try:
+                res = SARIMAX(y, order=order, trend="n",
+                              enforce_stationarity=False,
+                              enforce_invertibility=False).fit(disp=False)
+            except (ValueError, np.linalg.LinAlgError):
+                continue
+            if np.isfinite(res.aic) and (best is None or res.aic < best.aic):
+                best = res
+    if best is None:
+        return naive_forecast(y, dates, horizon)
+
+    fc = best.get_forecast(horizon)
+    ci = np.asarray(fc.conf_int(alpha=INTERVAL_ALPHA))
+    return _clip(fc.predicted_mean, ci[:, 0], ci[:, 1])
+
+
+# ─── Prophet ──────────────────────────────────────────────────────────────────
+def prophet_forecast(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int) -> tuple:
+    """Prophet with yearly seasonality once two years of weekly history exist."""
+    import logging
+    from prophet import Prophet
+
+    logging.getLogger("cmdstanpy").disabled = True
+    logging.getLogger("prophet").setLevel(logging.ERROR)
+
+    m = Prophet(yearly_seasonality=len(y) >= 104, weekly_seasonality=False,
+                daily_seasonality=False, interval_width=1 - INTERVAL_ALPHA,
+                uncertainty_samples=200)
+    m.fit(pd.DataFrame({"ds": dates, "y": y}))
+    future = pd.DataFrame({"ds": dates[-1] + pd.to_timedelta(7 * np.arange(1, horizon + 1), unit="D")})
+    fc = m.predict(future)
+    return _clip(fc["yhat"], fc["yhat_lower"], fc["yhat_upper"])
+
+
+# ─── Random Forest ────────────────────────────────────────────────────────────
+def rf_forecast(y: np.ndarray, dates: pd.DatetimeIndex, horizon: int,
+                n_estimators: int = 100, seed: int = 42) -> tuple:
+    """
+    Random Forest on lag features, forecast recursively.
+    Intervals are the 10th/90th percentile of per-tree predictions.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+
+    max_lag = max(LAGS)
+    if len(y) < max_lag + 8:
+        return naive_forecast(y, dates, horizon)
+
+    n = len(y)
+    all_dates = dates.append(dates[-1] + pd.to_timedelta(7 * np.arange(1, horizon + 1), unit="D"))
+    X = series_features(y, all_dates, np.arange(max_lag, n), RF_FEATURES)
+    model = RandomForestRegressor(n_estimators=n_estimators, min_samples_leaf=2,
+                                  random_state=seed, n_jobs=1)
+    model.fit(X, y[max_lag:])
+
+    history = np.concatenate([np.asarray(y, dtype=float), np.zeros(horizon)])
+    point, lower, upper = np.zeros(horizon), np.zeros(horizon), np.zeros(horizon)
+    for h in range(horizon):
+        row = series_features(history[:n + h], all_dates, [n + h], RF_FEATURES)
+        per_tree = np.array([t.predict(row)[0] for t in model.estimators_])
+        point[h] = history[n + h] = per_tree.mean()
+        lower[h] = np.percentile(per_tree, 100 * INTERVAL_ALPHA / 2)
+        upper[h] = np.percentile(per_tree, 100 * (1 - INTERVAL_ALPHA / 2))
+    return _clip(point, lower, upper)
+
+
+# Model name (as written to forecasts.forecast_model) → forecaster
+MODEL_FUNCS = {
+    "ARIMA":   arima_forecast,
+    "Prophet": prophet_forecast,
+    "RF":      rf_forecast,
+}
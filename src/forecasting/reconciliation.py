@@ -0,0 +1,281 @@
+"""
+Reconciliation — Coherent forecasts across the product / partner hierarchy.
+Every node (network, family, product, country, partner and their crossings)
+is expressed through one sparse summing matrix over the SKU × partner series,
+so all levels are reconciled in a single vectorized pass.
+Author: Mohammed Kaif Ahmed
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.utils.fact_table import attach_dims
+from src.utils.profiling import timed
+
+# Aggregation levels: name → bottom-series columns that identify a node
+LEVELS = {
+    "total":          (),
+    "family":         ("product_family",),
+    "product":        ("product_id",),
+    "country":        ("country",),
+    "partner":        ("partner_id",),
+    "country_family": ("country", "product_family"),
+    "family_partner": ("product_family", "partner_id"),
+    "series":         ("product_id", "partner_id"),
+}
+NODE_COLUMNS = ["product_family", "product_id", "country", "partner_id"]
+
+Z_80 = 1.2816                 # forecasts carry 80% intervals
+PROPORTION_WEEKS = 52         # history used for top-down split proportions
+DENSE_LIMIT = 4000            # bottom series count up to which MinT uses a dense Cholesky solve
+AGGREGATES_NAME = "forecast_aggregates"   # MinT base forecasts for aggregate nodes (engine.py)
+AGGREGATES_META = "forecast_aggregates_meta.json"   # signature of the forecasts they were fitted with
+
+
+def summing_matrix(bottom: pd.DataFrame, levels: dict = LEVELS) -> tuple:
+    """
+    Sparse S (nodes × bottom series): S[i, j] = 1 when series j rolls up into node i.
+    Returns (S, nodes frame with `level` and the NODE_COLUMNS that apply).
+    """
+    from scipy import sparse     # deferred: scipy is only needed once a hierarchy is built
+
+    m = len(bottom)
+    blocks, frames = [], []
+    for name, cols in levels.items():
+        if cols:
+            grouped = bottom.groupby(list(cols), observed=True, sort=True, dropna=False)
+            codes = grouped.ngroup().to_numpy()
+            nodes = grouped.size().reset_index()[list(cols)]
+        else:
+            codes = np.zeros(m, dtype=np.int64)
+            nodes = pd.DataFrame(index=[0])
+        nodes.insert(0, "level", name)
+        blocks.append(sparse.csr_matrix((np.ones(m), (codes, np.arange(m))), shape=(len(nodes), m)))
+        frames.append(nodes)
+    nodes = pd.concat(frames, ignore_index=True)
+    for col in NODE_COLUMNS:
+        nodes[col] = nodes[col].astype(object) if col in nodes else np.nan
+    return sparse.vstack(blocks, format="csr"), nodes[["level"] + NODE_COLUMNS]
+
+
+def _node_index(frame: pd.DataFrame) -> pd.MultiIndex:
+    """Hashable node key (level + key columns, blank where a column does not apply)."""
+    cols = [frame["level"].astype(str)]
+    cols += [frame[c].astype(object).where(frame[c].notna(), "").astype(str)
+             if c in frame else pd.Series("", index=frame.index) for c in NODE_COLUMNS]
+    return pd.MultiIndex.from_arrays(cols)
+
+
+def _wls_bottom(S, w: np.ndarray, y_hat: np.ndarray) -> np.ndarray:
+    """Bottom series b minimising Σ (ŷ − S b)² / w for every horizon column at once."""
+    from scipy import sparse
+    from scipy.linalg import cho_factor, cho_solve
+    from scipy.sparse.linalg import lsqr
+
+    w_inv = sparse.diags(1.0 / w)
+    rhs = S.T @ (w_inv @ y_hat)
+    if S.shape[1] <= DENSE_LIMIT:
+        normal = (S.T @ w_inv @ S).toarray()
+        return cho_solve(cho_factor(normal), rhs)
+    scaled = sparse.diags(1.0 / np.sqrt(w)) @ S
+    return np.column_stack([lsqr(scaled, y_hat[:, k] / np.sqrt(w), atol=1e-10, btol=1e-10)[0]
+                            for k in range(y_hat.shape[1])])
+
+
+class ForecastHierarchy:
+    """
+    Bottom-level (SKU × partner) Ensemble forecasts placed on the hierarchy.
+
+    Base point forecasts and 80% interval half-widths are held as
+    (series × week) matrices; σ is recovered from each interval.
+    """
+
+    def __init__(self, forecasts: pd.DataFrame, products: pd.DataFrame,
+                 partners: pd.DataFrame, levels: dict = LEVELS):
+        if "forecast_model" in forecasts:
+            forecasts = forecasts[forecasts["forecast_model"] == "Ensemble"]
+        weeks = np.sort(forecasts["date"].unique())
+        week_idx = np.searchsorted(weeks, forecasts["date"].to_numpy())
+        grouped = forecasts.groupby(["product_id", "partner_id"], observed=True, sort=True)
+        sid = grouped.ngroup().to_numpy()
+        keys = grouped.size().reset_index()[["product_id", "partner_id"]]
+
+        shape = (len(keys), len(weeks))
+        self.point, lower, upper = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+        np.add.at(self.point, (sid, week_idx), forecasts["forecast_units"].to_numpy(dtype=float))
+        np.add.at(lower, (sid, week_idx), forecasts["forecast_lower"].to_numpy(dtype=float))
+        np.add.at(upper, (sid, week_idx), forecasts["forecast_upper"].to_numpy(dtype=float))
+        self.sigma = np.maximum(upper - lower, 0) / (2 * Z_80)
+
+        self.dates = pd.DatetimeIndex(weeks)
+        self.bottom = attach_dims(keys, products, partners, ["product_family"], ["country"])
+        self.S, self.nodes = summing_matrix(self.bottom, levels)
+        self.levels = levels
+        self._index = _node_index(self.nodes)
+
+    def _base(self, base: pd.DataFrame) -> tuple:
+        """
+        Base point / variance for every node: the bottom-up sums, overwritten by
+        any independently forecast aggregate rows in `base` (forecasts schema
+        plus `level` and the node's key columns).
+        """
+        y_hat = self.S @ self.point
+        var = self.S @ self.sigma ** 2
+        if base is not None and len(base):
+            rows = self._index.get_indexer(_node_index(base))
+            dates = base["date"].to_numpy(dtype="datetime64[ns]")
+            cols = np.searchsorted(self.dates, dates)
+            ok = (rows >= 0) & (cols < len(self.dates))
+            ok[ok] &= self.dates.to_numpy()[cols[ok]] == dates[ok]
+            y_hat[rows[ok], cols[ok]] = base["forecast_units"].to_numpy(dtype=float)[ok]
+            half = (base["forecast_upper"] - base["forecast_lower"]).to_numpy(dtype=float) / 2
+            var[rows[ok], cols[ok]] = (half[ok] / Z_80) ** 2
+        return y_hat, var
+
+    def proportions(self, actuals: pd.DataFrame = None, weeks: int = PROPORTION_WEEKS) -> np.ndarray:
+        """Each series' share of network demand over the last `weeks` of actuals."""
+        if actuals is None or actuals.empty:
+            totals = self.point.sum(axis=1)
+        else:
+            recent = actuals[actuals["date"] > actuals["date"].max() - pd.Timedelta(weeks=weeks)]
+            idx = pd.MultiIndex.from_frame(self.bottom[["product_id", "partner_id"]].astype(str))
+            pos = idx.get_indexer(pd.MultiIndex.from_arrays(
+                [recent["product_id"].astype(str), recent["partner_id"].astype(str)]))
+            totals = np.bincount(pos[pos >= 0], weights=recent["units_sold"].to_numpy(dtype=float)[pos >= 0],
+                                 minlength=len(self.bottom))
+        return totals / max(totals.sum(), 1e-9)
+
+    def reconcile(self, method: str = "mint_wls", base: pd.DataFrame = None,
+                  actuals: pd.DataFrame = None) -> "ReconciledForecast":
+        """
+        Coherent forecasts for every node.
+
+        bottom_up — node = sum of its series.
+        top_down  — network forecast split by historical proportions (`actuals`).
+        mint_wls  — MinT with diagonal W from base forecast variances:
+                    b = (S'W⁻¹S)⁻¹ S'W⁻¹ ŷ, then every node = S b.
+                    Needs independently forecast aggregate nodes in `base`;
+                    without them ŷ = S·point, which MinT returns unchanged,
+                    so the result is bottom-up (and labelled so).
+
+        Intervals: series variances add up the hierarchy (independent errors);
+        for top-down the split is perfectly correlated so σ adds instead.
+        """
+        if method == "mint_wls" and (base is None or not len(base)):
+            method = "bottom_up"
+        y_hat, var = self._base(base)
+        if method == "bottom_up":
+            b, sd = self.point, np.sqrt(self.S @ self.sigma ** 2)
+        elif method == "top_down":
+            p = self.proportions(actuals)[:, None]
+            b = p * y_hat[0]
+            sd = self.S @ (p * np.sqrt(var[0]))
+        elif method == "mint_wls":
+            w = np.maximum(var.mean(axis=1), 1e-6)
+            b = np.maximum(_wls_bottom(self.S, w, y_hat), 0)
+            sd = np.sqrt(self.S @ self.sigma ** 2)
+        else:
+            raise ValueError(f"Unknown reconciliation method: {method}")
+        return ReconciledForecast(self, method, self.S @ b, sd)
+
+
+class ReconciledForecast:
+    """Coherent point forecasts and σ for every node × week."""
+
+    def __init__(self, hierarchy: ForecastHierarchy, method: str,
+                 point: np.ndarray, sd: np.ndarray):
+        self.hierarchy = hierarchy
+        self.method = method
+        self.point = point
+        self.sd = sd
+
+    def _frame(self, rows: np.ndarray) -> pd.DataFrame:
+        point, sd = self.point[rows], self.sd[rows]
+        return pd.DataFrame({
+            "forecast_units": point.ravel(),
+            "forecast_lower": np.maximum(point - Z_80 * sd, 0).ravel(),
+            "forecast_upper": (point + Z_80 * sd).ravel(),
+        })
+
+    @timed("analytics")
+    def node(self, **filters) -> pd.DataFrame:
+        """
+        Weekly forecast for one node, e.g. node(product_family="iPhone",
+        partner_id="PARTNER-001"). None-valued filters are ignored; a product
+        implies its family.
+        """
+        filters = {k: v for k, v in filters.items() if v is not None}
+        if "product_id" in filters:
+            filters.pop("product_family", None)
+        level = next((name for name, cols in self.hierarchy.levels.items()
+                      if set(cols) == set(filters)), None)
+        if level is None:
+            raise KeyError(f"No hierarchy level keyed by {sorted(filters)}")
+        key = pd.DataFrame([{"level": level, **filters}])
+        row = self.hierarchy._index.get_indexer(_node_index(key))[0]
+        if row < 0:
+            return pd.DataFrame(columns=["date", "forecast_units", "forecast_lower", "forecast_upper"])
+        out = self._frame(np.array([row]))
+        out.insert(0, "date", self.hierarchy.dates)
+        return out
+
+    def level(self, name: str) -> pd.DataFrame:
+        """Every node of one level, long format (node keys × week)."""
+        nodes = self.hierarchy.nodes
+        rows = np.flatnonzero(nodes["level"].to_numpy() == name)
+        n_weeks = len(self.hierarchy.dates)
+        keys = nodes.iloc[np.repeat(rows, n_weeks)][list(self.hierarchy.levels[name])]
+        out = pd.concat([keys.reset_index(drop=True), self._frame(rows)], axis=1)
+        out.insert(len(keys.columns), "date", np.tile(self.hierarchy.dates, len(rows)))
+        return out
+
+
+def aggregates_version(folder: str = None):
+    """
+    (path, mtime, forecasts signature) of the stored aggregate base forecasts, or
+    None when none exist. The signature is the (mtime_ns, size) of the `forecasts`
+    file the engine wrote in the same run (None when unrecorded).
+    """
+    from src.utils.helpers import PROC_DIR
+    from src.utils.storage import resolve_dataset
+
+    folder = folder or PROC_DIR
+    try:
+        path = resolve_dataset(AGGREGATES_NAME, folder)
+    except FileNotFoundError:
+        return None
+    try:
+        with open(os.path.join(folder, AGGREGATES_META)) as f:
+            fitted = tuple(json.load(f)["forecasts"])
+    except (OSError, ValueError, KeyError, TypeError):
+        fitted = None
+    return (path, os.stat(path).st_mtime_ns, fitted)
+
+
+def load_reconciled(method: str = "mint_wls", store=None, folder: str = None) -> ReconciledForecast:
+    """
+    Reconciled Ensemble forecasts for the dashboard, built once per data version.
+    MinT reconciles against the aggregate base forecasts written by
+    `src/forecasting/engine.py` (forecast_aggregates) in the run that wrote the
+    current forecasts; without them, or when they are stale, it is bottom-up.
+    """
+    from src.utils.data_store import get_store
+    from src.utils.helpers import PROC_DIR
+    from src.utils.storage import read_dataset
+
+    store = store or get_store()
+    token = aggregates_version(folder)
+    current = token is not None and token[2] == store.version("forecasts")[0]
+
+    def build(forecasts, products, partners, actuals):
+        base = None
+        if method == "mint_wls" and current:
+            base = read_dataset(AGGREGATES_NAME, folder or PROC_DIR, parse_dates=["date"])
+        hierarchy = ForecastHierarchy(forecasts, products, partners)
+        return hierarchy.reconcile(method, base=base, actuals=actuals)
+
+    return store.derived(f"reconciled_{method}", ("forecasts", "products", "partners", "actuals"),
+                         build, token=token)
@@ -0,0 +1,189 @@
+"""
+Aggregate Cube — Precomputed weekly totals for every dashboard filter combination.
+Product axis (all / family / product) × partner axis (all / country / tier /
+partner) × week, built once per data version; a filter change is an index
+lookup returning one row of weeks. Only node pairs that hold data are stored,
+as sparse rows, so size follows the observed series rather than the full grid.
+Author: Mohammed Kaif Ahmed
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.utils.fact_table import surrogate_keys
+
+# Axis levels: name → dimension column (None = the "all" node)
+PRODUCT_LEVELS = {"all": None, "family": "product_family", "product": "product_id"}
+PARTNER_LEVELS = {"all": None, "country": "country", "tier": "partner_tier", "partner": "partner_id"}
+
+ACTUAL_MEASURES = ["units_sold", "revenue"]
+# Variances add across independent series, so they roll up like any other sum
+FORECAST_MEASURES = ["forecast_units", "forecast_revenue", "forecast_units_var", "forecast_revenue_var"]
+Z_80 = 1.2816
+
+
+def axis_rollup(dim: pd.DataFrame, levels: dict) -> tuple:
+    """
+    Sparse 0/1 roll-up matrix (axis nodes × dimension rows) and the
+    {level: {label: node row}} lookup for one axis.
+    """
+    from scipy import sparse     # deferred: scipy is only needed once a cube is built
+
+    blocks, lookup, offset = [], {}, 0
+    for name, col in levels.items():
+        if col is None:
+            codes, labels = np.zeros(len(dim), dtype=np.int64), ["All"]
+        else:
+            codes, labels = pd.factorize(dim[col].astype(str), sort=True)
+        blocks.append(sparse.csr_matrix((np.ones(len(dim)), (codes, np.arange(len(dim)))),
+                                        shape=(len(labels), len(dim))))
+        lookup[name] = {label: offset + i for i, label in enumerate(labels)}
+        offset += len(labels)
+    return sparse.vstack(blocks, format="csr"), lookup
+
+
+def _base_cells(frame: pd.DataFrame, products: pd.DataFrame, partners: pd.DataFrame,
+                values: dict) -> tuple:
+    """
+    Sum `values` onto the observed (product, partner) series × week cells.
+    Returns (weeks, product keys, partner keys, {measure: sparse series × week}).
+    """
+    from scipy import sparse
+
+    weeks = np.sort(frame["date"].unique())
+    pkey = surrogate_keys(frame["product_id"], products["product_id"])
+    qkey = surrogate_keys(frame["partner_id"], partners["partner_id"])
+    widx = np.searchsorted(weeks, frame["date"].to_numpy())
+    ok = (pkey >= 0) & (qkey >= 0)
+    series, row = np.unique(pkey[ok].astype(np.int64) * len(partners) + qkey[ok], return_inverse=True)
+    shape = (len(series), len(weeks))
+    # Duplicate (series, week) entries are summed on conversion to CSR
+    cells = {m: sparse.csr_matrix((np.asarray(v, dtype=float)[ok], (row, widx[ok])), shape=shape)
+             for m, v in values.items()}
+    return pd.DatetimeIndex(weeks), series // len(partners), series % len(partners), cells
+
+
+class AggregateCube:
+    """
+    Weekly actuals (units, revenue) and Ensemble forecast (units, revenue and
+    their variances) rolled up to every observed product-node × partner-node pair.
+    """
+
+    def __init__(self, actuals: pd.DataFrame, forecasts: pd.DataFrame,
+                 products: pd.DataFrame, partners: pd.DataFrame):
+        self.product_rollup, self.product_nodes = axis_rollup(products, PRODUCT_LEVELS)
+        self.partner_rollup, self.partner_nodes = axis_rollup(partners, PARTNER_LEVELS)
+
+        self.dates, *base = _base_cells(actuals, products, partners,
+                                        {m: actuals[m] for m in ACTUAL_MEASURES})
+        self.actual_pairs, self.actual = self._roll(*base)
+
+        if "forecast_model" in forecasts:
+            forecasts = forecasts[forecasts["forecast_model"] == "Ensemble"]
+        asp = products["asp"].to_numpy(dtype=float)
+        pkey = surrogate_keys(forecasts["product_id"], products["product_id"])
+        price = np.where(pkey >= 0, asp[np.maximum(pkey, 0)], 0.0)
+        units = forecasts["forecast_units"].to_numpy(dtype=float)
+        sigma = np.maximum((forecasts["forecast_upper"] - forecasts["forecast_lower"])
+                           .to_numpy(dtype=float), 0) / (2 * Z_80)
+        self.forecast_dates, *base = _base_cells(forecasts, products, partners, {
+            "forecast_units": units, "forecast_revenue": units * price,
+            "forecast_units_var": sigma ** 2, "forecast_revenue_var": (sigma * price) ** 2})
+        self.forecast_pairs, self.forecast = self._roll(*base)
+
+    def _roll(self, pkey: np.ndarray, qkey: np.ndarray, cells: dict) -> tuple:
+        """
+        Series × week cells → node-pair × week cells for every node pair that
+        holds at least one series. Returns (sorted node-pair codes, {measure: matrix}).
+        """
+        from scipy import sparse
+
+        # Each dimension row sits in exactly one node per level, so every series
+        # column has one entry per level and the node lists reshape cleanly
+        p = self.product_rollup.tocsc()[:, pkey].sorted_indices().indices
+        q = self.partner_rollup.tocsc()[:, qkey].sorted_indices().indices
+        p, q = p.reshape(len(pkey), len(PRODUCT_LEVELS)), q.reshape(len(qkey), len(PARTNER_LEVELS))
+        codes = (p[:, :, None].astype(np.int64) * self.partner_rollup.shape[0] + q[:, None, :])
+        pairs, row = np.unique(codes.ravel(), return_inverse=True)
+        col = np.repeat(np.arange(len(pkey)), p.shape[1] * q.shape[1])
+        rollup = sparse.csr_matrix((np.ones(len(col)), (row, col)), shape=(len(pairs), len(pkey)))
+        return pairs, {m: (rollup @ c).tocsr() for m, c in cells.items()}
+
+    def _rows(self, pairs: np.ndarray, p, q) -> np.ndarray:
+        """Row of each (product node, partner node) pair in a rolled-up matrix; -1 = no data."""
+        codes = np.asarray(p, dtype=np.int64) * self.partner_rollup.shape[0] + q
+        pos = np.minimum(np.searchsorted(pairs, codes), max(len(pairs) - 1, 0))
+        found = (pairs[pos] == codes) if len(pairs) else np.zeros(codes.shape, dtype=bool)
+        return np.where(found, pos, -1)
+
+    @staticmethod
+    def _values(matrix, rows: np.ndarray) -> np.ndarray:
+        """Dense (rows × weeks) block; rows without data are zero."""
+        rows = np.atleast_1d(rows)
+        out = np.zeros((len(rows), matrix.shape[1]))
+        hit = rows >= 0
+        if hit.any():
+            out[hit] = matrix[rows[hit]].toarray()
+        return out
+
+    def _cell(self, family=None, product_id=None, partner_id=None, country=None, tier=None) -> tuple:
+        """Node rows for a filter; the most specific filter on each axis wins."""
+        if product_id is not None:
+            p = self.product_nodes["product"].get(str(product_id))
+        elif family is not None:
+            p = self.product_nodes["family"].get(str(family))
+        else:
+            p = 0
+        if partner_id is not None:
+            q = self.partner_nodes["partner"].get(str(partner_id))
+        elif country is not None and tier is not None:
+            raise ValueError("Filter the partner axis by country or tier, not both")
+        elif country is not None:
+            q = self.partner_nodes["country"].get(str(country))
+        elif tier is not None:
+            q = self.partner_nodes["tier"].get(str(tier))
+        else:
+            q = 0
+        return p, q
+
+    def frame(self, measures: list = ("units_sold",), **filters) -> pd.DataFrame:
+        """Weekly values of `measures` for one filter combination (one row lookup)."""
+        p, q = self._cell(**filters)
+        forecast = all(m in FORECAST_MEASURES for m in measures)
+        source, pairs, dates = ((self.forecast, self.forecast_pairs, self.forecast_dates) if forecast
+                                else (self.actual, self.actual_pairs, self.dates))
+        row = self._rows(pairs, p, q) if p is not None and q is not None else -1
+        out = pd.DataFrame({"date": dates})
+        for m in measures:
+            out[m] = self._values(source[m], row)[0]
+        return out
+
+    def forecast_band(self, measure: str = "forecast_units", **filters) -> pd.DataFrame:
+        """Forecast with an 80% band from the rolled-up variance."""
+        out = self.frame([measure, f"{measure}_var"], **filters)
+        half = Z_80 * np.sqrt(out.pop(f"{measure}_var"))
+        out["lower"] = np.maximum(out[measure] - half, 0)
+        out["upper"] = out[measure] + half
+        return out
+
+    def breakdown(self, measure: str = "units_sold", level: str = "family", **filters) -> pd.DataFrame:
+        """Every node of a product-axis `level` for one partner-axis filter, long format."""
+        _, q = self._cell(**filters)
+        nodes = self.product_nodes[level]
+        rows = np.fromiter(nodes.values(), dtype=np.int64)
+        rows = self._rows(self.actual_pairs, rows, q) if q is not None else np.full(len(rows), -1)
+        values = self._values(self.actual[measure], rows)
+        return pd.DataFrame({
+            "date":  np.tile(self.dates, len(rows)),
+            PRODUCT_LEVELS[level]: np.repeat(list(nodes), len(self.dates)),
+            measure: values.ravel(),
+        })
+
+
+def load_aggregate_cube(store=None) -> AggregateCube:
+    """Aggregate cube for the dashboard, built once per data version."""
+    from src.utils.data_store import get_store
+
+    store = store or get_store()
+    return store.derived("aggregate_cube", ("actuals", "forecasts", "products", "partners"),
+                         AggregateCube)
@@ -4,10 +4,16 @@ All chart functions return pre-styled go.Figure objects.
 Author: Mohammed Kaif Ahmed
 """
 
+import threading
+
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
 import numpy as np
 
+from src.utils.profiling import timed
+from src.utils.figure_cache import cached_figure
+
 # ─── Apple Design Tokens ───────────────────────────────────────────────────────
 
 APPLE_FONT = (
@@ -52,35 +58,38 @@ SERIES_COLORS = {
 }
 
 
-# ─── Internal base layout ─────────────────────────────────────────────────────
+# ─── Apple template ───────────────────────────────────────────────────────────
 
-def _apple_layout(fig: go.Figure, title: str = None, subtitle: str = None,
-                  height: int = 380, show_legend: bool = True) -> go.Figure:
-    """Apply full Apple design system to any Plotly figure."""
-    title_text = None
-    if title and subtitle:
-        title_text = (
-            f"<b>{title}</b><br>"
-            f"<span style='font-size:13px;color:{TEXT_SECONDARY};font-weight:400'>"
-            f"{subtitle}</span>"
-        )
-    elif title:
-        title_text = f"<b>{title}</b>"
+APPLE_TEMPLATE = "apple"
+_template_lock = threading.Lock()
 
-    fig.update_layout(
+
+def _register_template() -> None:
+    """
+    Register the Apple design system as a Plotly template (on top of "plotly").
+    Building it loads Plotly's layout validators, so it runs on first use rather
+    than at import.
+    """
+    if APPLE_TEMPLATE in pio.templates:
+        return
+    with _template_lock:
+        if APPLE_TEMPLATE in pio.templates:
+            return
+        _build_template()
+
+
+def _build_template() -> None:
+    template = go.layout.Template(pio.templates["plotly"])
+    template.layout.update(
         font=dict(family=APPLE_FONT, color=TEXT_PRIMARY, size=13),
         plot_bgcolor=BG_WHITE,
         paper_bgcolor=BG_WHITE,
-        height=height,
-        margin=dict(l=MARGIN_LEFT, r=MARGIN_RIGHT,
-                    t=72 if title else MARGIN_TOP, b=MARGIN_BOTTOM),
         hovermode="x unified",
         hoverlabel=dict(
             bgcolor="white",
             bordercolor=AXIS_COLOR,
             font=dict(family=APPLE_FONT, size=13, color=TEXT_PRIMARY),
         ),
-        showlegend=show_legend,
         legend=dict(
             title=dict(text=""),
             orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1,
@@ -88,22 +97,47 @@ def _apple_layout(fig: go.Figure, title: str = None, subtitle: str = None,
             bgcolor="rgba(0,0,0,0)", itemsizing="constant",
         ),
         title=dict(
-            text=title_text if title_text else "",
             font=dict(size=17, color=TEXT_PRIMARY),
             x=0.01, xanchor="left", y=0.97, yanchor="top",
         ),
+        xaxis=dict(
+            showgrid=False, linecolor=AXIS_COLOR, linewidth=1,
+            tickfont=dict(size=FONT_SIZE_AXIS, color=TEXT_TERTIARY, family=APPLE_FONT),
+            tickcolor=AXIS_COLOR, zeroline=False,
+        ),
+        yaxis=dict(
+            showgrid=True, gridcolor=GRID_COLOR, gridwidth=LINE_WIDTH_GRID,
+            griddash="dot", linecolor=AXIS_COLOR, linewidth=1,
+            tickfont=dict(size=FONT_SIZE_AXIS, color=TEXT_TERTIARY, family=APPLE_FONT),
+            zeroline=False,
+        ),
     )
+    pio.templates[APPLE_TEMPLATE] = template
 
-    fig.update_xaxes(
-        showgrid=False, linecolor=AXIS_COLOR, linewidth=1,
-        tickfont=dict(size=FONT_SIZE_AXIS, color=TEXT_TERTIARY, family=APPLE_FONT),
-        tickcolor=AXIS_COLOR, zeroline=False,
-    )
-    fig.update_yaxes(
-        showgrid=True, gridcolor=GRID_COLOR, gridwidth=LINE_WIDTH_GRID,
-        griddash="dot", linecolor=AXIS_COLOR, linewidth=1,
-        tickfont=dict(size=FONT_SIZE_AXIS, color=TEXT_TERTIARY, family=APPLE_FONT),
-        zeroline=False,
+
+# ─── Internal base layout ─────────────────────────────────────────────────────
+
+def _apple_layout(fig: go.Figure, title: str = None, subtitle: str = None,
+                  height: int = 380, show_legend: bool = True) -> go.Figure:
+    """Apply full Apple design system to any Plotly figure."""
+    title_text = None
+    if title and subtitle:
+        title_text = (
+            f"<b>{title}</b><br>"
+            f"<span style='font-size:13px;color:{TEXT_SECONDARY};font-weight:400'>"
+            f"{subtitle}</span>"
+        )
+    elif title:
+        title_text = f"<b>{title}</b>"
+
+    _register_template()
+    fig.update_layout(
+        template=APPLE_TEMPLATE,
+        height=height,
+        margin=dict(l=MARGIN_LEFT, r=MARGIN_RIGHT,
+                    t=72 if title else MARGIN_TOP, b=MARGIN_BOTTOM),
+        showlegend=show_legend,
+        title_text=title_text if title_text else "",
     )
     return fig
 
@@ -116,8 +150,98 @@ def apple_chart_layout(fig: go.Figure, title: str = None,
     return _apple_layout(fig, title=title, height=height)
 
 
+# ─── Large-data helpers ───────────────────────────────────────────────────────
+
+MAX_LINE_POINTS = 2000     # points kept per line series (LTTB / min-max downsampling)
+WEBGL_THRESHOLD = 2000     # traces with more points than this render with Scattergl
+HEATMAP_ROW_PX  = 16       # min pixel height per heatmap row before rows are collapsed
+HEATMAP_TEXT_CELLS = 600   # cell labels are dropped above this many cells
+
+
+def _numeric(values) -> np.ndarray:
+    """Float view of an x / y column (datetimes as ns since epoch)."""
+    arr = np.asarray(values)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype("datetime64[ns]").astype(np.int64).astype(float)
+    return arr.astype(float)
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `n_out` points preserving the line's shape."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x, y = _numeric(x), np.nan_to_num(_numeric(y))
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of every bucket (the last "bucket" is the final point)
+    sizes = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(x, edges) / sizes
+    avg_y = np.add.reduceat(y, edges) / sizes
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((x[a] - avg_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (avg_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out: int) -> np.ndarray:
+    """Min and max of each of n_out / 2 equal buckets (plus both ends), in order."""
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    y = _numeric(y)
+    n_buckets = n_out // 2
+    width = -(-n // n_buckets)
+    padded = np.full(n_buckets * width, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, width)
+    base = np.arange(n_buckets) * width
+    lo = base + np.argmin(np.where(np.isnan(blocks), np.inf, blocks), axis=1)
+    hi = base + np.argmax(np.where(np.isnan(blocks), -np.inf, blocks), axis=1)
+    idx = np.concatenate([[0, n - 1], lo, hi])
+    return np.unique(idx[idx < n])
+
+
+def downsample(df: pd.DataFrame, x_col: str, y_cols, max_points: int = MAX_LINE_POINTS) -> pd.DataFrame:
+    """
+    Rows of `df` to plot for long series: LTTB for a single y column, the union of
+    per-column min/max buckets when several columns share the x axis (e.g. CI bands).
+    """
+    if len(df) <= max_points:
+        return df
+    y_cols = [y_cols] if isinstance(y_cols, str) else list(y_cols)
+    if len(y_cols) == 1:
+        idx = lttb_indices(df[x_col].to_numpy(), df[y_cols[0]].to_numpy(), max_points)
+    else:
+        per_col = max(4, max_points // len(y_cols))
+        idx = np.unique(np.concatenate([minmax_indices(df[c].to_numpy(), per_col) for c in y_cols]))
+    return df.iloc[idx]
+
+
+def _scatter(n_points: int, **kwargs):
+    """go.Scatter, or go.Scattergl once a trace carries more than WEBGL_THRESHOLD points."""
+    return go.Scattergl(**kwargs) if n_points > WEBGL_THRESHOLD else go.Scatter(**kwargs)
+
+
+def _collapse(pivot: pd.DataFrame, max_rows: int, label: str) -> pd.DataFrame:
+    """Keep the `max_rows - 1` lowest-scoring rows and average the rest into one row."""
+    if len(pivot) <= max_rows:
+        return pivot
+    order = pivot.mean(axis=1).sort_values(kind="stable").index
+    keep, rest = order[:max_rows - 1], order[max_rows - 1:]
+    other = pivot.loc[rest].mean().to_frame(f"Other ({len(rest)} {label})").T
+    return pd.concat([pivot.loc[keep].sort_index(), other])
+
+
 # ─── Chart Functions ──────────────────────────────────────────────────────────
 
+@timed("chart")
+@cached_figure
 def revenue_trend_chart(actuals_df: pd.DataFrame,
                         forecast_df: pd.DataFrame = None,
                         title: str = None,
@@ -127,8 +251,10 @@ def revenue_trend_chart(actuals_df: pd.DataFrame,
         if actuals_df.empty:
             raise ValueError("actuals_df cannot be empty")
         fig = go.Figure()
+        actuals_df = downsample(actuals_df, "date", "revenue")
 
-        fig.add_trace(go.Scatter(
+        fig.add_trace(_scatter(
+            len(actuals_df),
             x=actuals_df["date"], y=actuals_df["revenue"],
             mode="lines", name="Actual Revenue",
             line=dict(color=SERIES_COLORS["actual"], width=LINE_WIDTH_PRIMARY),
@@ -139,6 +265,7 @@ def revenue_trend_chart(actuals_df: pd.DataFrame,
         if forecast_df is not None and not forecast_df.empty:
             req = ["date", "forecast_revenue", "lower", "upper"]
             if all(c in forecast_df.columns for c in req):
+                forecast_df = downsample(forecast_df, "date", ["forecast_revenue", "lower", "upper"])
                 fig.add_trace(go.Scatter(
                     x=pd.concat([forecast_df["date"], forecast_df["date"][::-1]]),
                     y=pd.concat([forecast_df["upper"], forecast_df["lower"][::-1]]),
@@ -146,7 +273,8 @@ def revenue_trend_chart(actuals_df: pd.DataFrame,
                     line=dict(color="rgba(0,0,0,0)"),
                     name="80% Confidence Interval", hoverinfo="skip",
                 ))
-                fig.add_trace(go.Scatter(
+                fig.add_trace(_scatter(
+                    len(forecast_df),
                     x=forecast_df["date"], y=forecast_df["forecast_revenue"],
                     mode="lines", name="Forecast",
                     line=dict(color=SERIES_COLORS["forecast"],
@@ -172,11 +300,13 @@ def revenue_trend_chart(actuals_df: pd.DataFrame,
         return fig
 
 
+@timed("chart")
+@cached_figure
 def product_mix_donut(df: pd.DataFrame, value_col: str = "revenue",
                       label_col: str = "product_family",
                       center_text: str = None, height: int = 380) -> go.Figure:
     """Donut chart for product family mix."""
-    grouped = df.groupby(label_col)[value_col].sum().reset_index()
+    grouped = df.groupby(label_col, observed=True)[value_col].sum().reset_index()
     colors = [APPLE_COLORS.get(f, "#8E8E93") for f in grouped[label_col]]
     total = grouped[value_col].sum()
     center = center_text or f"€{total/1e6:.0f}M"
@@ -202,6 +332,8 @@ def product_mix_donut(df: pd.DataFrame, value_col: str = "revenue",
     return fig
 
 
+@timed("chart")
+@cached_figure
 def partner_ranking_bar(df: pd.DataFrame, x_col: str = "revenue",
                         y_col: str = "partner_name",
                         color_col: str = "in_stock_rate",
@@ -243,6 +375,8 @@ def partner_ranking_bar(df: pd.DataFrame, x_col: str = "revenue",
     return fig
 
 
+@timed("chart")
+@cached_figure
 def forecast_accuracy_bar(df: pd.DataFrame, x_col: str = "product_family",
                           y_col: str = "accuracy", height: int = 340) -> go.Figure:
     """Bar chart: forecast accuracy by product family with 90% target line."""
@@ -256,7 +390,7 @@ def forecast_accuracy_bar(df: pd.DataFrame, x_col: str = "product_family",
     ))
     _apple_layout(fig, height=height, show_legend=False)
     fig.update_layout(
-        yaxis=dict(range=[75, 103], ticksuffix="%"),
+        yaxis=dict(range=[min(75, df[y_col].min() - 5), 103], ticksuffix="%"),
         xaxis=dict(title=None, tickangle=0),
         bargap=0.4,
         margin=dict(l=MARGIN_LEFT, r=MARGIN_RIGHT, t=MARGIN_TOP, b=56),
@@ -276,17 +410,23 @@ def forecast_accuracy_bar(df: pd.DataFrame, x_col: str = "product_family",
     return fig
 
 
+@timed("chart")
+@cached_figure
 def forecast_line_chart(actuals_df: pd.DataFrame, forecast_df: pd.DataFrame,
                         title: str = None, height: int = 420) -> go.Figure:
     """Actuals + Forecast + CI + today line. Used by Demand Forecast and Partner Deep Dive."""
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
+    actuals_df = downsample(actuals_df, "date", "units_sold")
+    fig.add_trace(_scatter(
+        len(actuals_df),
         x=actuals_df["date"], y=actuals_df["units_sold"],
         mode="lines", name="Actual",
         line=dict(color=SERIES_COLORS["actual"], width=LINE_WIDTH_PRIMARY),
         hovertemplate="<b>Actual</b>: %{y:,.0f} units<extra></extra>",
     ))
     if not forecast_df.empty:
+        forecast_df = downsample(forecast_df, "date",
+                                 ["forecast_units", "forecast_lower", "forecast_upper"])
         x_ci = list(forecast_df["date"]) + list(forecast_df["date"][::-1])
         y_ci = (list(forecast_df["forecast_upper"]) +
                 list(forecast_df["forecast_lower"][::-1]))
@@ -296,7 +436,8 @@ def forecast_line_chart(actuals_df: pd.DataFrame, forecast_df: pd.DataFrame,
             line=dict(color="rgba(0,0,0,0)"),
             name="80% CI", showlegend=True, hoverinfo="skip",
         ))
-        fig.add_trace(go.Scatter(
+        fig.add_trace(_scatter(
+            len(forecast_df),
             x=forecast_df["date"], y=forecast_df["forecast_units"],
             mode="lines", name="Forecast",
             line=dict(color=SERIES_COLORS["forecast"],
@@ -313,18 +454,23 @@ def forecast_line_chart(actuals_df: pd.DataFrame, forecast_df: pd.DataFrame,
     return _apple_layout(fig, title=title, height=height)
 
 
+@timed("chart")
+@cached_figure
 def instock_heatmap(df: pd.DataFrame, height: int = 400) -> go.Figure:
     """Heatmap: in-stock rates by partner × product family."""
-    pivot = (df.groupby(["partner_name", "product_family"])["in_stock_rate"]
+    pivot = (df.groupby(["partner_name", "product_family"], observed=True)["in_stock_rate"]
                .mean().unstack(fill_value=np.nan))
+    # More partners than the plot has pixel rows for: lowest in-stock first, rest averaged
+    pivot = _collapse(pivot, max(8, (height - 80) // HEATMAP_ROW_PX), "partners")
+    show_text = pivot.size <= HEATMAP_TEXT_CELLS
     color_scale = [[0.0, "#FF3B30"], [0.5, "#FF9500"],
                    [0.8, "#34C759"], [1.0, "#1B7D36"]]
     fig = go.Figure(go.Heatmap(
         z=pivot.values * 100, x=pivot.columns.tolist(), y=pivot.index.tolist(),
         colorscale=color_scale, zmin=60, zmax=100,
         text=[[f"{v:.1f}%" if not np.isnan(v) else "N/A" for v in row]
-              for row in pivot.values * 100],
-        texttemplate="%{text}",
+              for row in pivot.values * 100] if show_text else None,
+        texttemplate="%{text}" if show_text else None,
         textfont=dict(size=FONT_SIZE_ANNOTATION, family=APPLE_FONT, color="#1D1D1F"),
         hovertemplate="<b>%{y}</b> — <b>%{x}</b><br>In-Stock: %{z:.1f}%<extra></extra>",
         colorbar=dict(title="In-Stock %", ticksuffix="%",
@@ -337,6 +483,8 @@ def instock_heatmap(df: pd.DataFrame, height: int = 400) -> go.Figure:
     return fig
 
 
+@timed("chart")
+@cached_figure
 def wos_histogram(df: pd.DataFrame, height: int = 340) -> go.Figure:
     """Weeks of supply histogram with zone markers."""
     fig = go.Figure(go.Histogram(
@@ -363,6 +511,8 @@ def wos_histogram(df: pd.DataFrame, height: int = 340) -> go.Figure:
     return fig
 
 
+@timed("chart")
+@cached_figure
 def npi_velocity_chart(actual_df: pd.DataFrame, plan_df: pd.DataFrame,
                        prior_df: pd.DataFrame = None, height: int = 400) -> go.Figure:
     """Multi-line NPI velocity: actual vs plan vs prior gen."""
@@ -391,6 +541,8 @@ def npi_velocity_chart(actual_df: pd.DataFrame, plan_df: pd.DataFrame,
     return _apple_layout(fig, height=height)
 
 
+@timed("chart")
+@cached_figure
 def risk_matrix_scatter(df: pd.DataFrame, height: int = 420) -> go.Figure:
     """Risk matrix scatter with quadrant shading."""
     fig = go.Figure()
@@ -408,7 +560,8 @@ def risk_matrix_scatter(df: pd.DataFrame, height: int = 420) -> go.Figure:
         APPLE_COLORS.get(f, "#8E8E93")
         for f in df.get("product_family", ["Accessories"] * len(df))
     ]
-    fig.add_trace(go.Scatter(
+    fig.add_trace(_scatter(
+        len(df),
         x=df["likelihood"] * 100, y=df["revenue_impact"],
         mode="markers",
         marker=dict(size=11, color=family_colors,
@@ -442,6 +595,28 @@ def risk_matrix_scatter(df: pd.DataFrame, height: int = 420) -> go.Figure:
     return fig
 
 
+@timed("chart")
+@cached_figure
+def family_trend_chart(df: pd.DataFrame, value_col: str = "units_sold",
+                       family_col: str = "product_family", periods: int = 26,
+                       height: int = 360) -> go.Figure:
+    """One line per product family over its last `periods` dates (long-format input)."""
+    fig = go.Figure()
+    for fam, color in APPLE_COLORS.items():
+        fam_data = df[df[family_col] == fam].sort_values("date").tail(periods)
+        if not fam_data[value_col].any():
+            continue
+        fam_data = downsample(fam_data, "date", value_col)
+        fig.add_trace(_scatter(
+            len(fam_data),
+            x=fam_data["date"], y=fam_data[value_col],
+            name=fam, line=dict(color=color, width=2), mode="lines",
+        ))
+    return _apple_layout(fig, height=height)
+
+
+@timed("chart")
+@cached_figure
 def alert_resolution_trend(df: pd.DataFrame, height: int = 320) -> go.Figure:
     """Line chart: open vs resolved alerts over time."""
     fig = go.Figure()
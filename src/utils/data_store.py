@@ -0,0 +1,168 @@
+"""
+Data Store — Process-wide, load-once dataset cache shared by every dashboard page.
+Frames are handed out as private views and swapped atomically when files change.
+Author: Mohammed Kaif Ahmed
+"""
+
+import threading
+import time
+import pandas as pd
+
+from src.utils import helpers
+from src.utils.profiling import span
+from src.utils.fact_table import build_fact_table
+from src.utils.storage import dataset_signature, read_dataset
+
+
+# name (as in load_all) → (file stem, date columns)
+DATASETS = {
+    "products":   ("products",          ["launch_date"]),
+    "partners":   ("reseller_partners", None),
+    "actuals":    ("demand_actuals",    ["date"]),
+    "forecasts":  ("forecasts",         ["date"]),
+    "order_book": ("order_book",        ["date_placed","date_requested"]),
+    "npi":        ("npi_tracker",       None),
+    "alerts":     ("alerts",            ["date_generated"]),
+}
+
+
+def _copy_on_write() -> bool:
+    """True when pandas copy-on-write is active (pandas 3, or enabled by main.py)."""
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
+def _view(df: pd.DataFrame, columns: list = None) -> pd.DataFrame:
+    """
+    A caller's own handle on a shared frame. Under copy-on-write a shallow copy
+    is enough; otherwise the data is copied so in-place edits stay local.
+    Column projections are copies (or copy-on-write) either way.
+    """
+    if columns is not None:
+        return df[columns]
+    return df.copy(deep=not _copy_on_write())
+
+
+class DataStore:
+    """
+    Loads each dataset once per process and serves private views of it.
+
+    File signatures (path, mtime, size) are re-checked at most every
+    `check_interval` seconds; a changed file is re-read off-lock and the new
+    frame replaces the old one in a single assignment, so readers always see
+    a complete dataset.
+    """
+
+    def __init__(self, folder: str = None, check_interval: float = 2.0):
+        self.folder = folder or helpers.RAW_DIR
+        self.check_interval = check_interval
+        self._entries = {}     # name → (signature, frame, loaded_at)
+        self._checked = {}     # name → last signature check (monotonic)
+        self._derived = {}     # key → (dependency versions, value)
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in DATASETS}
+        self._build_locks = {}     # derived key → lock held while it is built
+
+    # ── File signatures ──────────────────────────────────────────────────────
+    def _signature(self, name: str) -> tuple:
+        return dataset_signature(DATASETS[name][0], self.folder)
+
+    def _is_stale(self, name: str, entry) -> bool:
+        now = time.monotonic()
+        if entry is not None and now - self._checked.get(name, 0.0) < self.check_interval:
+            return False
+        self._checked[name] = now
+        return entry is None or entry[0] != self._signature(name)
+
+    # ── Public API ───────────────────────────────────────────────────────────
+    def frame(self, name: str) -> pd.DataFrame:
+        """Return the shared frame itself (callers must not mutate it)."""
+        entry = self._entries.get(name)
+        if not self._is_stale(name, entry):
+            return entry[1]
+
+        with self._load_locks[name]:
+            entry = self._entries.get(name)
+            sig = self._signature(name)
+            if entry is not None and entry[0] == sig:
+                return entry[1]
+            stem, dates = DATASETS[name]
+            with span(f"load:{name}", "load"):
+                df = read_dataset(stem, self.folder, parse_dates=dates)
+            with self._lock:
+                self._entries[name] = (sig, df, time.time())
+            return df
+
+    def get(self, name: str, columns: list = None) -> pd.DataFrame:
+        """Return a private view of a dataset (see _view), optionally projected to `columns`."""
+        return _view(self.frame(name), columns)
+
+    def get_many(self, *names: str) -> tuple:
+        """Return views for several datasets, in order."""
+        return tuple(self.get(n) for n in names)
+
+    def facts(self, columns: list = None) -> pd.DataFrame:
+        """Dimension-enriched actuals (see fact_table), built once per data version."""
+        df = self.derived("facts", ("actuals", "products", "partners"), build_fact_table)
+        return _view(df, columns)
+
+    def version(self, *names: str) -> tuple:
+        """Data version token for the given datasets (changes when any file changes)."""
+        names = names or tuple(DATASETS)
+        for n in names:
+            self.frame(n)
+        return tuple(self._entries[n][0][1:] for n in names)
+
+    def loaded_at(self, name: str) -> float:
+        """Unix time the dataset was last (re)loaded."""
+        self.frame(name)
+        return self._entries[name][2]
+
+    def derived(self, key: str, deps: tuple, builder, token=None):
+        """
+        Memoise `builder(*frames)` against the versions of `deps`.
+        Used for structures built once per data version (joins, indexes, cubes).
+        `token` adds any other input version (e.g. a processed file) to the key.
+        """
+        version = (self.version(*deps), token)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        # One build per key: a concurrent caller (e.g. the launch warm-up) waits for it
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            cached = self._derived.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            with span(f"build:{key}", "derived"):
+                value = builder(*(self.frame(d) for d in deps))
+            with self._lock:
+                self._derived[key] = (version, value)
+        return value
+
+    def replace_derived(self, key: str, deps: tuple, value, token=None) -> None:
+        """Install an incrementally updated structure as current for `deps` / `token`."""
+        version = (self.version(*deps), token)
+        with self._lock:
+            self._derived[key] = (version, value)
+
+    def clear(self) -> None:
+        """Drop every cached frame (next access reloads from disk)."""
+        with self._lock:
+            self._entries.clear()
+            self._checked.clear()
+            self._derived.clear()
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> DataStore:
+    """Return the process-wide DataStore, creating it on first use."""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = DataStore()
+    return _STORE
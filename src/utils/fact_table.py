@@ -0,0 +1,95 @@
+"""
+Fact Table — Dimension-enriched demand actuals (star-schema join index).
+Built once per data version; analytics read dimension columns straight off it
+instead of re-merging products/partners on every call.
+Author: Mohammed Kaif Ahmed
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Dimension attributes carried on the fact table
+PRODUCT_DIMS = ["product_name", "product_family", "product_category",
+                "lifecycle_stage", "priority_tier", "asp"]
+PARTNER_DIMS = ["partner_name", "partner_tier", "country", "region"]
+
+
+def surrogate_keys(ids: pd.Series, dim_ids: pd.Series) -> np.ndarray:
+    """
+    int32 row positions of `ids` within the dimension key column (-1 when missing).
+    Categorical ids are resolved once per category, not once per row.
+    """
+    dim_index = pd.Index(dim_ids)
+    if isinstance(ids.dtype, pd.CategoricalDtype):
+        cat_pos = dim_index.get_indexer(ids.cat.categories)
+        codes = ids.cat.codes.to_numpy()
+        if not len(cat_pos):
+            return np.full(len(codes), -1, dtype=np.int32)
+        keys = np.where(codes >= 0, cat_pos[codes], -1)
+    else:
+        keys = dim_index.get_indexer(ids)
+    return keys.astype(np.int32)
+
+
+def take_dims(dim: pd.DataFrame, keys: np.ndarray, columns: list) -> dict:
+    """
+    Gather dimension columns by surrogate key. Labels come back categorical,
+    numerics as plain arrays; key -1 yields NaN (left-join semantics).
+    """
+    missing = keys < 0
+    out = {}
+    for col in columns:
+        values = dim[col]
+        if values.dtype == object or isinstance(values.dtype, pd.CategoricalDtype):
+            cat = pd.Categorical(values)
+            codes = cat.codes[keys] if len(cat) else np.full(len(keys), -1)
+            codes = np.where(missing, -1, codes)
+            out[col] = pd.Categorical.from_codes(codes, dtype=cat.dtype)
+        else:
+            out[col] = pd.api.extensions.take(values.to_numpy(), keys, allow_fill=True)
+    return out
+
+
+def attach_dims(df: pd.DataFrame, products: pd.DataFrame = None,
+                partners: pd.DataFrame = None,
+                product_cols: list = (), partner_cols: list = ()) -> pd.DataFrame:
+    """
+    Return `df` with the requested product/partner attributes.
+    Columns already on the frame (e.g. a fact-table slice) are not looked up
+    again, so enriched input passes straight through. Row order and index are kept.
+    """
+    need_prod = [c for c in product_cols if c not in df.columns]
+    need_part = [c for c in partner_cols if c not in df.columns]
+    if not need_prod and not need_part:
+        return df
+
+    out = df.copy(deep=False)
+    if need_prod:
+        keys = (out["product_key"].to_numpy() if "product_key" in out.columns
+                else surrogate_keys(out["product_id"], products["product_id"]))
+        for col, values in take_dims(products, keys, need_prod).items():
+            out[col] = values
+    if need_part:
+        keys = (out["partner_key"].to_numpy() if "partner_key" in out.columns
+                else surrogate_keys(out["partner_id"], partners["partner_id"]))
+        for col, values in take_dims(partners, keys, need_part).items():
+            out[col] = values
+    return out
+
+
+def build_fact_table(actuals: pd.DataFrame, products: pd.DataFrame,
+                     partners: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join actuals to every product and partner attribute in one pass.
+    Adds int32 `product_key` / `partner_key` (row positions in the dimension
+    frames) plus categorical dimension columns.
+    """
+    facts = actuals.copy(deep=False)
+    facts["product_key"] = surrogate_keys(actuals["product_id"], products["product_id"])
+    facts["partner_key"] = surrogate_keys(actuals["partner_id"], partners["partner_id"])
+    return attach_dims(
+        facts, products, partners,
+        product_cols=[c for c in PRODUCT_DIMS if c in products.columns],
+        partner_cols=[c for c in PARTNER_DIMS if c in partners.columns],
+    )
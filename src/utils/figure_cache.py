@@ -0,0 +1,142 @@
+"""
+Figure Cache — Memoised Plotly figures for the apple_charts builders.
+Figures are stored as serialised JSON keyed by the builder, a content fingerprint
+of its DataFrame / Series inputs and its remaining parameters, and evicted
+least-recently-used once the entry or byte budget is exceeded. A hit rebuilds
+the figure without Plotly's per-property validation, so a rerun that does not
+change a chart's inputs skips its construction cost.
+Author: Mohammed Kaif Ahmed
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+MAX_ENTRIES = int(os.environ.get("DEMAND_PLANNER_FIGURE_CACHE_ENTRIES", 256))
+MAX_BYTES = int(os.environ.get("DEMAND_PLANNER_FIGURE_CACHE_MB", 64)) * 1_000_000
+
+
+# ─── Input fingerprints ───────────────────────────────────────────────────────
+_FINGERPRINTS = {}     # id(frame) → (weakref, fingerprint); frames are treated as read-only
+_FP_LOCK = threading.Lock()
+
+
+def _hash_frame(obj) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr((type(obj).__name__, obj.shape,
+                   list(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name,
+                   [str(t) for t in (obj.dtypes if isinstance(obj, pd.DataFrame) else [obj.dtype])]
+                   )).encode())
+    h.update(np.ascontiguousarray(pd.util.hash_pandas_object(obj, index=True).to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+def fingerprint(obj):
+    """Hashable stand-in for a chart argument (content hash for frames / series / arrays)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        key = id(obj)
+        with _FP_LOCK:
+            hit = _FINGERPRINTS.get(key)
+        if hit is not None and hit[0]() is obj:
+            return hit[1]
+        fp = ("frame", _hash_frame(obj))
+        with _FP_LOCK:
+            _FINGERPRINTS[key] = (weakref.ref(obj, lambda _, k=key: _FINGERPRINTS.pop(k, None)), fp)
+        return fp
+    if isinstance(obj, np.ndarray):
+        return ("array", obj.dtype.str, obj.shape,
+                hashlib.blake2b(np.ascontiguousarray(obj).tobytes(), digest_size=16).hexdigest())
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,) + tuple(fingerprint(v) for v in obj)
+    if isinstance(obj, dict):
+        return ("dict",) + tuple(sorted((k, fingerprint(v)) for k, v in obj.items()))
+    try:
+        hash(obj)
+        return obj
+    except TypeError:
+        return ("repr", repr(obj))
+
+
+# ─── Cache ────────────────────────────────────────────────────────────────────
+class FigureCache:
+    """LRU of serialised figures bounded by entry count and total JSON bytes."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()     # key → figure JSON
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key) -> go.Figure:
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Cached JSON came from a validated figure: skip re-validation
+        return go.Figure(json.loads(payload), _validate=False)
+
+    def put(self, key, fig: go.Figure) -> None:
+        payload = fig.to_json()
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = payload
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries
+                                     or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+FIGURE_CACHE = FigureCache()
+
+
+def cached_figure(fn):
+    """
+    Memoise a figure builder on (builder, input fingerprints, parameters).
+    Every call returns a fresh go.Figure, so callers may keep updating it.
+    """
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (fn.__qualname__,) + tuple((name, fingerprint(value))
+                                         for name, value in bound.arguments.items())
+        fig = FIGURE_CACHE.get(key)
+        if fig is None:
+            fig = fn(*args, **kwargs)
+            FIGURE_CACHE.put(key, fig)
+        return fig
+
+    wrapper.uncached = fn
+    return wrapper
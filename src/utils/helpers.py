@@ -8,6 +8,9 @@ import numpy as np
 import os
 import sys
 
+from src.utils.storage import read_dataset
+from src.utils.profiling import timed
+
 # ─── Path helpers ──────────────────────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 RAW_DIR  = os.path.join(BASE_DIR, "data", "raw")
@@ -33,6 +36,21 @@ def format_eur(value: float, decimals: int = 1) -> str:
         return f"€{value:,.0f}"
 
 
+def format_eur_series(values, decimals: int = 1) -> pd.Series:
+    """
+    format_eur for a whole column: magnitude bucket, scale and format spec are
+    picked with array ops, then one formatting pass (same output per value).
+    """
+    v = pd.Series(values, dtype=float)
+    x = v.to_numpy()
+    a = np.abs(x)
+    bucket = (a >= 1e3).astype(np.int8) + (a >= 1e6) + (a >= 1e9)
+    fmts = np.array(["€{:,.0f}", f"€{{:.{decimals}f}}K", f"€{{:.{decimals}f}}M",
+                     f"€{{:.{decimals}f}}B"], dtype=object)[bucket]
+    scaled = x / np.array([1.0, 1e3, 1e6, 1e9])[bucket]
+    return pd.Series(list(map(str.format, fmts, scaled.tolist())), index=v.index, dtype=object)
+
+
 def format_pct(value: float, decimals: int = 1) -> str:
     """Format a decimal (0-1) or percentage value as a string."""
     if value <= 1.5:
@@ -76,44 +94,48 @@ def severity_badge_class(severity: str) -> str:
 
 
 # ─── Data loaders ─────────────────────────────────────────────────────────────
-def load_products() -> pd.DataFrame:
-    return pd.read_csv(get_data_path("products.csv"), parse_dates=["launch_date"])
+# Each loader reads Parquet when present (typed, column-pruned) and falls back to
+# CSV. Pass `columns` to read only what a page needs.
+def load_products(columns: list = None) -> pd.DataFrame:
+    return read_dataset("products", RAW_DIR, columns, parse_dates=["launch_date"])
 
 
-def load_partners() -> pd.DataFrame:
-    return pd.read_csv(get_data_path("reseller_partners.csv"))
+def load_partners(columns: list = None) -> pd.DataFrame:
+    return read_dataset("reseller_partners", RAW_DIR, columns)
 
 
-def load_actuals() -> pd.DataFrame:
-    return pd.read_csv(get_data_path("demand_actuals.csv"), parse_dates=["date"])
+def load_actuals(columns: list = None) -> pd.DataFrame:
+    return read_dataset("demand_actuals", RAW_DIR, columns, parse_dates=["date"])
 
 
-def load_forecasts() -> pd.DataFrame:
-    return pd.read_csv(get_data_path("forecasts.csv"), parse_dates=["date"])
+def load_forecasts(columns: list = None) -> pd.DataFrame:
+    return read_dataset("forecasts", RAW_DIR, columns, parse_dates=["date"])
 
 
-def load_order_book() -> pd.DataFrame:
-    return pd.read_csv(get_data_path("order_book.csv"), parse_dates=["date_placed","date_requested"])
+def load_order_book(columns: list = None) -> pd.DataFrame:
+    return read_dataset("order_book", RAW_DIR, columns,
+                        parse_dates=["date_placed","date_requested"])
 
 
-def load_npi_tracker() -> pd.DataFrame:
-    return pd.read_csv(get_data_path("npi_tracker.csv"))
+def load_npi_tracker(columns: list = None) -> pd.DataFrame:
+    return read_dataset("npi_tracker", RAW_DIR, columns)
 
 
-def load_alerts() -> pd.DataFrame:
-    return pd.read_csv(get_data_path("alerts.csv"), parse_dates=["date_generated"])
+def load_alerts(columns: list = None) -> pd.DataFrame:
+    return read_dataset("alerts", RAW_DIR, columns, parse_dates=["date_generated"])
 
 
-def load_all() -> dict:
-    """Load all datasets and return them keyed by name."""
+def load_all(columns: dict = None) -> dict:
+    """Load all datasets and return them keyed by name. `columns` maps name → column list."""
+    columns = columns or {}
     return {
-        "products": load_products(),
-        "partners": load_partners(),
-        "actuals":  load_actuals(),
-        "forecasts":load_forecasts(),
-        "order_book": load_order_book(),
-        "npi":      load_npi_tracker(),
-        "alerts":   load_alerts(),
+        "products": load_products(columns.get("products")),
+        "partners": load_partners(columns.get("partners")),
+        "actuals":  load_actuals(columns.get("actuals")),
+        "forecasts":load_forecasts(columns.get("forecasts")),
+        "order_book": load_order_book(columns.get("order_book")),
+        "npi":      load_npi_tracker(columns.get("npi")),
+        "alerts":   load_alerts(columns.get("alerts")),
     }
 
 
@@ -122,29 +144,21 @@ def calc_forecast_accuracy(actuals: pd.DataFrame, forecasts: pd.DataFrame,
                             model: str = "Ensemble") -> dict:
     """
     Calculate MAPE, WMAPE, Bias across product families for one model.
-    Uses matching on date + product_id + partner_id.
+    Uses matching on date + product_id + partner_id. For many models /
+    slices at once use the accuracy cube in src/analytics/forecast_accuracy.py.
     """
-    fcast = forecasts[forecasts["forecast_model"] == model].copy()
-    merged = actuals.merge(
-        fcast[["date","product_id","partner_id","forecast_units"]],
-        on=["date","product_id","partner_id"], how="inner"
-    )
-    if merged.empty:
-        return {"mape": 0, "wmape": 0, "bias": 0, "accuracy": 0}
-
-    merged["error"] = merged["forecast_units"] - merged["units_sold"]
-    merged["abs_error"] = merged["error"].abs()
-    merged["abs_pct_error"] = merged["abs_error"] / merged["units_sold"].replace(0, np.nan)
-
-    mape  = merged["abs_pct_error"].mean() * 100
-    wmape = merged["abs_error"].sum() / merged["units_sold"].sum() * 100
-    bias  = merged["error"].mean() / merged["units_sold"].mean() * 100
-    acc   = 100 - wmape
+    from src.analytics.forecast_accuracy import align_forecasts, accuracy_cube, accuracy_metrics
 
-    return {"mape": round(mape, 2), "wmape": round(wmape, 2),
-            "bias": round(bias, 2), "accuracy": round(acc, 1)}
+    aligned = align_forecasts(actuals, forecasts[forecasts["forecast_model"] == model])
+    if aligned.empty:
+        return {"mape": 0, "wmape": 0, "bias": 0, "accuracy": 0}
+    metrics = accuracy_metrics(accuracy_cube(aligned), model=model)
+    if metrics is None:
+        return {"mape": 0, "wmape": 0, "bias": 0, "accuracy": 0}
+    return {k: metrics[k] for k in ("mape", "wmape", "bias", "accuracy")}
 
 
+@timed("analytics")
 def calc_channel_kpis(actuals: pd.DataFrame, order_book: pd.DataFrame,
                        alerts: pd.DataFrame, products: pd.DataFrame) -> dict:
     """Compute the 6 Executive Overview KPIs."""
@@ -0,0 +1,58 @@
+"""
+Partner Index — Every partner-keyed dataset partitioned by partner once.
+Rows are stably sorted by partner with one offset range per partner, so a
+partner's rows in any dataset are a contiguous slice instead of a full scan.
+Author: Mohammed Kaif Ahmed
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Datasets carrying a partner_id column (actuals is the dimension-enriched fact table)
+PARTNER_DATASETS = ("actuals", "forecasts", "order_book", "npi", "alerts")
+
+
+class PartnerPartition:
+    """One dataset sorted by partner with [start, stop) offsets per partner."""
+
+    def __init__(self, df: pd.DataFrame):
+        codes, partners = pd.factorize(df["partner_id"].astype(str), sort=True)
+        order = np.argsort(codes, kind="stable")
+        self.frame = df.iloc[order]
+        bounds = np.r_[0, np.cumsum(np.bincount(codes[codes >= 0], minlength=len(partners)))]
+        self.offsets = {pid: (bounds[i], bounds[i + 1]) for i, pid in enumerate(partners)}
+
+    def rows(self, partner_id: str) -> pd.DataFrame:
+        start, stop = self.offsets.get(str(partner_id), (0, 0))
+        return self.frame.iloc[start:stop]
+
+
+class PartnerIndex:
+    """Partner partitions of several datasets; `partner()` returns all slices at once."""
+
+    def __init__(self, frames: dict):
+        self.partitions = {name: PartnerPartition(df) for name, df in frames.items()}
+
+    def rows(self, name: str, partner_id: str) -> pd.DataFrame:
+        return self.partitions[name].rows(partner_id)
+
+    def partner(self, partner_id: str) -> dict:
+        """{dataset: that partner's rows} for every indexed dataset."""
+        return {name: part.rows(partner_id) for name, part in self.partitions.items()}
+
+
+def load_partner_index(store=None) -> PartnerIndex:
+    """Partner index over the store's datasets, built once per data version."""
+    from src.utils.data_store import get_store
+
+    store = store or get_store()
+
+    def build(*_):
+        from src.analytics.chase_engine import load_scored_order_book
+
+        frames = {name: store.get(name) for name in PARTNER_DATASETS if name != "actuals"}
+        frames["order_book"] = load_scored_order_book(store)
+        return PartnerIndex({"actuals": store.facts(), **frames})
+
+    return store.derived("partner_index", PARTNER_DATASETS + ("products", "partners"), build)
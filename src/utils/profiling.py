@@ -0,0 +1,127 @@
+"""
+Profiling — Opt-in timing spans for dashboard reruns.
+Loaders, analytics builders, chart builders and table assembly record spans into
+the current rerun; cProfile and tracemalloc capture can be added per rerun.
+Enable with DEMAND_PLANNER_PROFILE=1 (or "cprofile", "tracemalloc", comma-separated).
+Author: Mohammed Kaif Ahmed
+"""
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+_MODES = {m.strip() for m in os.environ.get("DEMAND_PLANNER_PROFILE", "").lower().split(",") if m.strip()}
+ENABLED = bool(_MODES - {"0", "off", "false"})
+
+_local = threading.local()
+
+
+class RerunProfile:
+    """Spans (name, category, seconds, depth) recorded during one page rerun."""
+
+    def __init__(self, page: str, cprofile: bool = False, memory: bool = False):
+        self.page = page
+        self.spans = []
+        self.depth = 0
+        self.total = None
+        self.peak_bytes = None
+        self.top_allocations = []
+        self.stats_text = None
+        self._profiler = cProfile.Profile() if cprofile else None
+        self._memory = memory
+        self._own_tracing = memory and not tracemalloc.is_tracing()
+        self._started = time.perf_counter()
+        if self._own_tracing:
+            tracemalloc.start()
+        if memory:
+            tracemalloc.reset_peak()
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    def stop(self) -> "RerunProfile":
+        if self.total is not None:      # already stopped
+            return self
+        if self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(25)
+            self.stats_text = out.getvalue()
+        if self._memory and tracemalloc.is_tracing():
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            stats = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            self.top_allocations = [(str(s.traceback), s.size) for s in stats]
+            if self._own_tracing:
+                tracemalloc.stop()
+        self.total = time.perf_counter() - self._started
+        return self
+
+    def frame(self) -> pd.DataFrame:
+        """Spans as a frame, slowest first."""
+        df = pd.DataFrame(self.spans, columns=["span", "category", "seconds", "depth"])
+        return df.sort_values("seconds", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def current():
+    """The rerun being recorded on this thread, or None."""
+    return getattr(_local, "profile", None)
+
+
+def start(page: str) -> RerunProfile:
+    """
+    Begin recording a rerun of `page` (no-op unless profiling is enabled).
+    A rerun that never reached finish() (st.stop(), an exception) is stopped
+    first, so its profiler and tracemalloc tracing do not stay on.
+    """
+    if not ENABLED:
+        return None
+    abandoned = current()
+    if abandoned is not None:
+        abandoned.stop()
+    _local.profile = RerunProfile(page, cprofile="cprofile" in _MODES, memory="tracemalloc" in _MODES)
+    return _local.profile
+
+
+def finish() -> RerunProfile:
+    """Stop recording and return the finished rerun."""
+    profile = current()
+    _local.profile = None
+    return profile.stop() if profile is not None else None
+
+
+@contextmanager
+def span(name: str, category: str = "code"):
+    """Time a block into the current rerun."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    profile.depth += 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.depth -= 1
+        profile.spans.append((name, category, time.perf_counter() - t0, profile.depth))
+
+
+def timed(category: str = "code", name: str = None):
+    """Decorator form of `span`, named after the function by default."""
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if current() is None:
+                return fn(*args, **kwargs)
+            with span(label, category):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
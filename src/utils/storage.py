@@ -0,0 +1,256 @@
+"""
+Storage — Typed columnar persistence (Parquet) for all datasets, with CSV fallback.
+Author: Mohammed Kaif Ahmed
+"""
+
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV-only environments
+    pa = pq = None
+
+# Both formats of a dataset are written together; only a CSV that is newer by more
+# than this (seconds) is treated as edited after the Parquet copy
+MTIME_TOLERANCE = 60
+
+
+# ─── Dataset schemas ──────────────────────────────────────────────────────────
+# IDs and low-cardinality labels are categorical, unit counts int32.
+# Prices, rates and revenue stay float64 — they feed euro impacts and rounded
+# percentages, where float32 error shows up in the displayed figures.
+DATASET_SCHEMAS = {
+    "products": {
+        "launch_date": "datetime64[ns]",
+        "asp": "float64",
+    },
+    "reseller_partners": {
+        "store_count": "int32",
+        "digital_maturity_score": "int32",
+    },
+    "demand_actuals": {
+        "date": "datetime64[ns]",
+        "product_id": "category",
+        "partner_id": "category",
+        "units_ordered": "int32",
+        "units_shipped": "int32",
+        "units_sold": "int32",
+        "revenue": "float64",
+        "asp_actual": "float64",
+        "in_stock_rate": "float64",
+        "weeks_of_supply": "float64",
+    },
+    "forecasts": {
+        "date": "datetime64[ns]",
+        "product_id": "category",
+        "partner_id": "category",
+        "forecast_units": "int32",
+        "forecast_lower": "int32",
+        "forecast_upper": "int32",
+        "forecast_model": "category",
+        "forecast_accuracy_mape": "float64",
+    },
+    "order_book": {
+        "date_placed": "datetime64[ns]",
+        "date_requested": "datetime64[ns]",
+        "product_id": "category",
+        "partner_id": "category",
+        "units_ordered": "int32",
+        "units_confirmed": "int32",
+        "units_shipped": "int32",
+        "status": "category",
+        "chase_units_recommended": "int32",
+    },
+    "npi_tracker": {
+        "week_number": "int32",
+        "product_id": "category",
+        "partner_id": "category",
+        "units_planned": "int32",
+        "units_actual": "int32",
+        "velocity_vs_plan": "float64",
+        "sell_through_rate": "float64",
+        "risk_flag": "category",
+    },
+    "alerts": {
+        "date_generated": "datetime64[ns]",
+        "metric_value": "float64",
+        "threshold": "float64",
+    },
+}
+DATASET_SCHEMAS["forecast_results"] = DATASET_SCHEMAS["forecasts"]
+DATASET_SCHEMAS["npi_state"] = DATASET_SCHEMAS["npi_tracker"]
+DATASET_SCHEMAS["forecast_aggregates"] = {
+    **{c: t for c, t in DATASET_SCHEMAS["forecasts"].items()
+       if c not in ("product_id", "partner_id")},
+    "level": "category",
+}
+DATASET_SCHEMAS["backtest_forecasts"] = {
+    "fold": "int32",
+    "origin": "datetime64[ns]",
+    "date": "datetime64[ns]",
+    "product_id": "category",
+    "partner_id": "category",
+    "forecast_model": "category",
+    "forecast_units": "float64",
+    "actual_units": "float64",
+}
+DATASET_SCHEMAS["demand_features"] = {
+    **DATASET_SCHEMAS["demand_actuals"],
+    "product_family": "category",
+    "lifecycle_stage": "category",
+    "priority_tier": "category",
+    "asp": "float64",
+    "partner_name": "category",
+    "partner_tier": "category",
+    "country": "category",
+}
+
+
+def parquet_available() -> bool:
+    """True when pyarrow is installed and Parquet can be read/written."""
+    return pq is not None
+
+
+def dataset_path(name: str, folder: str, fmt: str) -> str:
+    """Return the on-disk path of a dataset in the given format ('parquet' | 'csv')."""
+    return os.path.join(folder, f"{name}.{fmt}")
+
+
+def to_storage_dtypes(df: pd.DataFrame, name: str,
+                      categories: dict = None) -> pd.DataFrame:
+    """
+    Cast a frame to its storage schema.
+    `categories` pins category sets per column so chunked writes share one dictionary.
+    """
+    schema = DATASET_SCHEMAS.get(name, {})
+    categories = categories or {}
+    out = {}
+    for col in df.columns:
+        dtype = schema.get(col)
+        if dtype is None:
+            out[col] = df[col]
+        elif dtype == "category":
+            cats = categories.get(col)
+            if cats is None:
+                cats = sorted(pd.unique(df[col].dropna()))
+            out[col] = pd.Categorical(df[col], categories=cats)
+        elif dtype.startswith("datetime"):
+            out[col] = pd.to_datetime(df[col])
+        else:
+            out[col] = df[col].astype(dtype)
+    return pd.DataFrame(out)
+
+
+def _wide_dictionaries(schema):
+    """Categorical columns with int32 codes, so later chunks may add categories."""
+    fields = [pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type), f.nullable)
+              if pa.types.is_dictionary(f.type) else f for f in schema]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def write_dataset(df: pd.DataFrame, name: str, folder: str,
+                  formats: tuple = ("parquet", "csv")) -> None:
+    """Write a dataset in one shot. Parquet is skipped when pyarrow is missing."""
+    writer = DatasetWriter(name, folder, formats=formats)
+    writer.write(df)
+    writer.close()
+
+
+class DatasetWriter:
+    """
+    Append-only chunked writer for one dataset.
+    Parquet chunks become row groups of a single file; CSV chunks are appended.
+    """
+
+    def __init__(self, name: str, folder: str, formats: tuple = ("parquet", "csv"),
+                 categories: dict = None):
+        self.name = name
+        self.folder = folder
+        self.formats = tuple(f for f in formats if f != "parquet" or parquet_available())
+        self.categories = categories or {}
+        self._pq_writer = None
+        self._csv_started = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        self._extend_categories(df)
+        typed = to_storage_dtypes(df, self.name, self.categories)
+        # Later chunks reuse (and extend) the first chunk's category sets
+        for col in typed.columns:
+            if isinstance(typed[col].dtype, pd.CategoricalDtype) and col not in self.categories:
+                self.categories[col] = list(typed[col].cat.categories)
+
+        if "parquet" in self.formats:
+            if self._pq_writer is None:
+                table = pa.Table.from_pandas(typed, preserve_index=False)
+                table = table.cast(_wide_dictionaries(table.schema))
+                self._pq_writer = pq.ParquetWriter(
+                    dataset_path(self.name, self.folder, "parquet"), table.schema)
+            else:
+                table = pa.Table.from_pandas(typed, schema=self._pq_writer.schema,
+                                             preserve_index=False)
+            self._pq_writer.write_table(table)
+
+        if "csv" in self.formats:
+            typed.to_csv(dataset_path(self.name, self.folder, "csv"),
+                         mode="a" if self._csv_started else "w",
+                         header=not self._csv_started, index=False)
+            self._csv_started = True
+
+    def _extend_categories(self, df: pd.DataFrame) -> None:
+        """Append values first seen in this chunk to the pinned category sets."""
+        schema = DATASET_SCHEMAS.get(self.name, {})
+        for col, cats in self.categories.items():
+            if col not in df.columns or schema.get(col) != "category":
+                continue
+            new = pd.Index(pd.unique(df[col].dropna())).difference(pd.Index(cats))
+            if len(new):
+                self.categories[col] = list(cats) + sorted(new)
+
+    def close(self) -> None:
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+            self._pq_writer = None
+
+
+def resolve_dataset(name: str, folder: str) -> str:
+    """
+    Path read_dataset() reads: the Parquet copy unless pyarrow is missing or a CSV
+    was written after it (edited or regenerated on its own).
+    """
+    pq_path = dataset_path(name, folder, "parquet")
+    csv_path = dataset_path(name, folder, "csv")
+    has_csv = os.path.exists(csv_path)
+    if parquet_available() and os.path.exists(pq_path):
+        if not has_csv or os.path.getmtime(csv_path) <= os.path.getmtime(pq_path) + MTIME_TOLERANCE:
+            return pq_path
+    if not has_csv:
+        raise FileNotFoundError(f"No parquet/csv file for dataset '{name}' in {folder}")
+    return csv_path
+
+
+def dataset_signature(name: str, folder: str) -> tuple:
+    """(path, mtime_ns, size) of the file read_dataset() reads; changes when it is rewritten."""
+    path = resolve_dataset(name, folder)
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def read_dataset(name: str, folder: str, columns: list = None,
+                 parse_dates: list = None) -> pd.DataFrame:
+    """
+    Read a dataset from the file resolve_dataset() picks (Parquet, else CSV).
+    Only `columns` are read when given; CSV reads are cast to the storage schema
+    so both paths return identical dtypes.
+    """
+    path = resolve_dataset(name, folder)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+
+    parse_dates = [c for c in (parse_dates or []) if columns is None or c in columns]
+    schema = DATASET_SCHEMAS.get(name, {})
+    dtypes = {c: t for c, t in schema.items()
+              if not t.startswith("datetime") and (columns is None or c in columns)}
+    df = pd.read_csv(path, usecols=columns, parse_dates=parse_dates, dtype=dtypes)
+    return df[columns] if columns is not None else df
@@ -0,0 +1,133 @@
+"""
+Warm-up — Precompute the dashboard's shared caches at launch.
+Loads every dataset into the process-wide store, builds the derived analytics
+structures the pages read, and renders the landing views' figures into the
+figure cache, so the first visitor after a restart is served from warm caches.
+Author: Mohammed Kaif Ahmed
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Columns the Executive Overview and Demand Forecast pages request from the store
+OVERVIEW_FACTS = ["date", "product_id", "partner_id", "revenue", "in_stock_rate",
+                  "units_ordered", "units_shipped", "product_family", "partner_name"]
+
+_status = {"state": "idle", "timings": {}, "error": None}
+
+
+def _analytics_steps(store) -> list:
+    from src.utils.data_store import DATASETS
+    from src.utils.aggregate_cube import load_aggregate_cube
+    from src.utils.partner_index import load_partner_index
+    from src.forecasting.reconciliation import load_reconciled
+    from src.analytics.chase_engine import load_scored_order_book
+    from src.analytics.order_book_analysis import load_order_book_analytics
+    from src.analytics.npi_tracker import load_npi_analytics
+    from src.analytics.launch_curves import load_launch_curves
+    from src.analytics.forecast_accuracy import load_accuracy_cube
+    from src.analytics.tracking_signal import load_tracking_monitor
+
+    return [
+        ("datasets",             lambda: [store.frame(name) for name in DATASETS]),
+        ("facts",                lambda: store.facts()),
+        ("aggregate_cube",       lambda: load_aggregate_cube(store)),
+        ("reconciled",           lambda: load_reconciled("mint_wls", store)),
+        ("scored_order_book",    lambda: load_scored_order_book(store)),
+        ("order_book_analytics", lambda: load_order_book_analytics(store)),
+        ("partner_index",        lambda: load_partner_index(store)),
+        ("npi_analytics",        lambda: load_npi_analytics(store)),
+        ("launch_curves",        lambda: load_launch_curves(store)),
+        ("accuracy_cube",        lambda: load_accuracy_cube(store)),
+        ("tracking_monitor",     lambda: load_tracking_monitor(store)),
+    ]
+
+
+def _warm_figures(store) -> None:
+    """Build the default-view charts of the landing pages (same inputs as the pages)."""
+    from src.utils.helpers import format_eur
+    from src.utils.aggregate_cube import load_aggregate_cube
+    from src.forecasting.reconciliation import load_reconciled
+    from src.analytics.forecast_accuracy import load_accuracy_cube, summarize_accuracy
+    from src.utils import apple_charts
+
+    cube = load_aggregate_cube(store)
+    actuals = store.facts(OVERVIEW_FACTS)
+
+    # Executive Overview
+    apple_charts.revenue_trend_chart(cube.frame(["revenue"]).tail(52),
+                                     cube.forecast_band("forecast_revenue"), height=380)
+    apple_charts.product_mix_donut(actuals, center_text=format_eur(actuals["revenue"].sum()),
+                                   height=380)
+    p_rev = (actuals.groupby("partner_name", observed=True)
+             .agg(revenue=("revenue", "sum"), in_stock_rate=("in_stock_rate", "mean"))
+             .reset_index())
+    apple_charts.partner_ranking_bar(p_rev, height=420)
+    acc_cube = load_accuracy_cube(store)
+    if acc_cube is not None:
+        family_acc = (summarize_accuracy(acc_cube, ["product_family"], forecast_model="Ensemble")
+                      .sort_values("accuracy", ascending=False))
+        if not family_acc.empty:
+            apple_charts.forecast_accuracy_bar(family_acc, height=420)
+
+    # Demand Forecast, all families / products / partners
+    apple_charts.forecast_line_chart(cube.frame(["units_sold"]).tail(52),
+                                     load_reconciled("mint_wls", store).node(), height=440)
+
+
+def warm_up(store=None, figures: bool = True) -> dict:
+    """
+    Run every warm-up step in order; returns step → seconds.
+    Steps that fail are logged and skipped (the page will build them on demand);
+    missing data files stop the warm-up.
+    """
+    from src.utils.data_store import get_store
+
+    store = store or get_store()
+    timings = _status["timings"] = {}
+    _status.update(state="running", error=None)
+    started = time.perf_counter()
+
+    def run(name, fn):
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            logger.warning("warm-up step %s failed: %s", name, e)
+        timings[name] = time.perf_counter() - t0
+
+    try:
+        import plotly.graph_objects as go
+        from src.utils.apple_charts import _register_template
+
+        run("plotly", lambda: (_register_template(), go.Figure(go.Scatter())))
+        for name, fn in _analytics_steps(store):
+            run(name, fn)
+        if figures:
+            run("figures", lambda: _warm_figures(store))
+    except FileNotFoundError as e:
+        _status.update(state="failed", error=str(e))
+        logger.warning("warm-up stopped, data not found: %s", e)
+        return timings
+
+    timings["total"] = time.perf_counter() - started
+    _status["state"] = "done"
+    logger.info("warm-up finished in %.1fs", timings["total"])
+    return timings
+
+
+def start_warm_up(store=None, figures: bool = True) -> threading.Thread:
+    """Run warm_up() on a daemon thread; pages that arrive first wait on the store's load locks."""
+    thread = threading.Thread(target=warm_up, args=(store, figures), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_status() -> dict:
+    """State ("idle" / "running" / "done" / "failed"), step timings and any error."""
+    return dict(_status, timings=dict(_status["timings"]))